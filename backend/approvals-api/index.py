@@ -6,9 +6,11 @@ from typing import Dict, Any
 from datetime import datetime
 from zoneinfo import ZoneInfo
 import jwt
-import psycopg2
 from psycopg2.extras import RealDictCursor
 from pydantic import BaseModel, Field
+from db_pool import get_connection
+from http_encoding import negotiate_encoding
+from perf import instrument, track_request
 
 # Environment
 SCHEMA = 't_p61788166_html_to_frontend'
@@ -109,7 +111,7 @@ def handle_approvals_list(event: Dict[str, Any], conn, user_id: int) -> Dict[str
     """Получение списка платежей на утверждение"""
     cur = conn.cursor(cursor_factory=RealDictCursor)
     
-    # Получаем платежи, где текущий пользователь - промежуточный или финальный утверждающий
+    # Платежи на согласовании вместе с промежуточным и финальным утверждающими сервиса
     cur.execute(f"""
         SELECT DISTINCT
             p.id, p.category_id, p.amount, p.description, p.payment_date,
@@ -122,7 +124,14 @@ def handle_approvals_list(event: Dict[str, Any], conn, user_id: int) -> Dict[str
             dep.name as department_name,
             s.name as service_name,
             u.username as created_by_username,
-            u.full_name as created_by_full_name
+            u.full_name as created_by_full_name,
+            s.id as approvers_service_id,
+            ia.id as intermediate_approver_id,
+            ia.username as intermediate_approver_username,
+            ia.full_name as intermediate_approver_full_name,
+            fa.id as final_approver_id,
+            fa.username as final_approver_username,
+            fa.full_name as final_approver_full_name
         FROM {SCHEMA}.payments p
         LEFT JOIN {SCHEMA}.categories c ON p.category_id = c.id
         LEFT JOIN {SCHEMA}.legal_entities le ON p.legal_entity_id = le.id
@@ -130,57 +139,49 @@ def handle_approvals_list(event: Dict[str, Any], conn, user_id: int) -> Dict[str
         LEFT JOIN {SCHEMA}.customer_departments dep ON p.department_id = dep.id
         LEFT JOIN {SCHEMA}.services s ON p.service_id = s.id
         LEFT JOIN {SCHEMA}.users u ON p.created_by = u.id
+        LEFT JOIN {SCHEMA}.users ia ON s.intermediate_approver_id = ia.id
+        LEFT JOIN {SCHEMA}.users fa ON s.final_approver_id = fa.id
         WHERE p.status IN ('pending_ceo', 'pending_tech_director', 'pending_ib', 'pending_cfo')
         ORDER BY p.created_at DESC
     """)
     
     payments_data = cur.fetchall()
-    payments = []
     
-    for payment in payments_data:
-        payment_dict = dict(payment)
-        
-        # Получаем историю утверждений
+    # История утверждений всех платежей одним запросом
+    history_map = {payment['id']: [] for payment in payments_data}
+    if history_map:
         cur.execute(f"""
             SELECT a.id, a.payment_id, a.approver_id, a.action, a.comment, a.created_at,
                    u.username as approver_username,
                    u.full_name as approver_full_name
             FROM {SCHEMA}.approvals a
             LEFT JOIN {SCHEMA}.users u ON a.approver_id = u.id
-            WHERE a.payment_id = %s
+            WHERE a.payment_id = ANY(%s)
             ORDER BY a.created_at DESC
-        """, (payment['id'],))
+        """, (list(history_map),))
         
-        approval_history = [dict(row) for row in cur.fetchall()]
-        payment_dict['approval_history'] = approval_history
+        for row in cur.fetchall():
+            history_map[row['payment_id']].append(dict(row))
+    
+    payments = []
+    
+    for payment in payments_data:
+        payment_dict = dict(payment)
+        approvers = {
+            role: {
+                'id': payment_dict.pop(f'{role}_id'),
+                'username': payment_dict.pop(f'{role}_username'),
+                'full_name': payment_dict.pop(f'{role}_full_name')
+            }
+            for role in ('intermediate_approver', 'final_approver')
+        }
         
-        # Получаем информацию об утверждающих через сервис
-        if payment['service_id']:
-            cur.execute(f"""
-                SELECT intermediate_approver_id, final_approver_id
-                FROM {SCHEMA}.services
-                WHERE id = %s
-            """, (payment['service_id'],))
-            service_info = cur.fetchone()
-            
-            if service_info:
-                # Получаем информацию о промежуточном утверждающем
-                cur.execute(f"""
-                    SELECT id, username, full_name
-                    FROM {SCHEMA}.users
-                    WHERE id = %s
-                """, (service_info['intermediate_approver_id'],))
-                intermediate_approver = cur.fetchone()
-                payment_dict['intermediate_approver'] = dict(intermediate_approver) if intermediate_approver else None
-                
-                # Получаем информацию о финальном утверждающем
-                cur.execute(f"""
-                    SELECT id, username, full_name
-                    FROM {SCHEMA}.users
-                    WHERE id = %s
-                """, (service_info['final_approver_id'],))
-                final_approver = cur.fetchone()
-                payment_dict['final_approver'] = dict(final_approver) if final_approver else None
+        payment_dict['approval_history'] = history_map[payment['id']]
+        
+        # Утверждающие есть только у платежей с существующим сервисом
+        if payment_dict.pop('approvers_service_id') is not None:
+            for role, approver in approvers.items():
+                payment_dict[role] = approver if approver['id'] is not None else None
         
         payments.append(payment_dict)
     
@@ -331,6 +332,8 @@ def handle_approvers_list(event: Dict[str, Any], conn) -> Dict[str, Any]:
     
     return response(200, {'approvers': approvers})
 
+@track_request
+@negotiate_encoding
 def handler(event: dict, context) -> dict:
     """
     API для управления согласованиями платежей.
@@ -347,7 +350,7 @@ def handler(event: dict, context) -> dict:
     if method == 'OPTIONS':
         return response(200, {})
     
-    conn = psycopg2.connect(DSN)
+    conn = instrument(get_connection(DSN))
     
     try:
         # Определяем endpoint из query параметров или пути
@@ -5,6 +5,7 @@ import jwt
 import bcrypt
 import psycopg2
 from psycopg2.extras import RealDictCursor
+from perf import instrument, track_request
 from typing import Dict, Any, Optional
 from datetime import datetime, timedelta
 from zoneinfo import ZoneInfo
@@ -29,7 +30,7 @@ def get_db_connection():
     dsn = os.environ.get('DATABASE_URL')
     if not dsn:
         raise ValueError('DATABASE_URL not set')
-    return psycopg2.connect(dsn)
+    return instrument(psycopg2.connect(dsn))
 
 def create_jwt_token(user_id: int, email: str) -> str:
     secret = os.environ.get('JWT_SECRET')
@@ -102,6 +103,7 @@ def get_user_with_permissions(conn, user_id: int) -> Optional[Dict[str, Any]]:
     
     return result
 
+@track_request
 def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     '''
     API для авторизации и получения данных текущего пользователя.
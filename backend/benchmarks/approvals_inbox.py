@@ -0,0 +1,153 @@
+"""
+Входящие согласования (GET backend/approvals-api) на заданном числе платежей
+в статусе pending_* - по умолчанию на 1000 и ровно на 10000.
+
+Работает на базе, подготовленной handlers.py --setup. Засеянные pending-платежи
+на время прогона переводятся в approved, вместо них добавляются платежи с одной
+записью истории согласования каждый; после прогона всё возвращается как было.
+Печатает JSON с p50/p95/p99, числом запросов и размером ответа по каждому
+объёму; код выхода 1, если число запросов зависит от объёма или ответ неполный.
+
+    python backend/benchmarks/approvals_inbox.py [--pending 1000,10000] [--iterations 10]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import handlers
+
+APPROVALS_DIR = os.path.join(handlers.BACKEND_DIR, 'approvals-api')
+SCHEMA = handlers.SCHEMA
+PENDING_STATUSES = ['pending_ceo', 'pending_tech_director', 'pending_ib', 'pending_cfo']
+BENCH_DESCRIPTION = 'approvals bench'
+
+ADD_PENDING_SQL = f'''
+    WITH added AS (
+        INSERT INTO {SCHEMA}.payments (
+            category, amount, description, payment_date, created_at, category_id, legal_entity_id,
+            contractor_id, department_id, status, created_by, service_id
+        )
+        SELECT 'servers', 1000 + i, %(description)s || ' ' || i, d, d,
+               ref.categories[1 + i %% cardinality(ref.categories)],
+               ref.legal_entities[1 + i %% cardinality(ref.legal_entities)],
+               ref.contractors[1 + i %% cardinality(ref.contractors)],
+               ref.departments[1 + i %% cardinality(ref.departments)],
+               (ARRAY['pending_tech_director', 'pending_ceo'])[1 + i %% 2],
+               ref.users[1 + i %% cardinality(ref.users)],
+               ref.services[1 + i %% cardinality(ref.services)]
+        FROM generate_series(%(start)s, %(stop)s) i
+        CROSS JOIN LATERAL (SELECT NOW() - i * INTERVAL '1 minute' AS d) dt
+        CROSS JOIN (
+            SELECT (SELECT array_agg(id) FROM {SCHEMA}.categories) AS categories,
+                   (SELECT array_agg(id) FROM {SCHEMA}.legal_entities) AS legal_entities,
+                   (SELECT array_agg(id) FROM {SCHEMA}.contractors) AS contractors,
+                   (SELECT array_agg(id) FROM {SCHEMA}.customer_departments) AS departments,
+                   (SELECT array_agg(id) FROM {SCHEMA}.users) AS users,
+                   (SELECT array_agg(id) FROM {SCHEMA}.services) AS services
+        ) ref
+        RETURNING id, created_at
+    )
+    INSERT INTO {SCHEMA}.approvals (payment_id, approver_id, approver_role, action, comment, created_at)
+    SELECT id, 1, 'tech_director', 'approved', 'Согласовано', created_at + INTERVAL '1 hour'
+    FROM added
+'''
+
+
+def park_pending(cur):
+    """Переводит засеянные pending-платежи в approved; возвращает (id, статус) для возврата"""
+    cur.execute(f'''
+        WITH parked AS (
+            SELECT id, status FROM {SCHEMA}.payments
+            WHERE status = ANY(%s) AND description NOT LIKE %s
+        )
+        UPDATE {SCHEMA}.payments p SET status = 'approved'
+        FROM parked WHERE p.id = parked.id
+        RETURNING parked.id, parked.status
+    ''', (PENDING_STATUSES, BENCH_DESCRIPTION + '%'))
+    return cur.fetchall()
+
+
+def restore(cur, parked):
+    cur.execute(f'''
+        DELETE FROM {SCHEMA}.approvals
+        WHERE payment_id IN (SELECT id FROM {SCHEMA}.payments WHERE description LIKE %s)
+    ''', (BENCH_DESCRIPTION + '%',))
+    cur.execute(f'DELETE FROM {SCHEMA}.payments WHERE description LIKE %s', (BENCH_DESCRIPTION + '%',))
+    if parked:
+        cur.execute(f'''
+            UPDATE {SCHEMA}.payments p SET status = parked.status
+            FROM unnest(%s::int[], %s::text[]) AS parked(id, status)
+            WHERE p.id = parked.id
+        ''', ([row[0] for row in parked], [row[1] for row in parked]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--dsn', default=os.environ.get('BENCH_DATABASE_URL'))
+    parser.add_argument('--pgdata', default=os.path.join(handlers.BENCH_DIR, '.pgdata'))
+    parser.add_argument('--pending', default='1000,10000', help='объёмы через запятую, по возрастанию')
+    parser.add_argument('--iterations', type=int, default=10)
+    args = parser.parse_args()
+
+    dsn = args.dsn or handlers.start_local_server(args.pgdata)
+    os.environ['DATABASE_URL'] = handlers.with_search_path(dsn, SCHEMA)
+    os.environ['JWT_SECRET'] = handlers.JWT_SECRET
+    sys.path.insert(0, APPROVALS_DIR)
+    import index
+    import perf
+
+    event = {
+        'httpMethod': 'GET',
+        'path': '/',
+        'headers': {'X-Auth-Token': handlers.make_token()},
+        'queryStringParameters': {},
+    }
+    sizes = sorted(int(size) for size in args.pending.split(','))
+
+    conn = handlers.connect(dsn)
+    conn.autocommit = True
+    cur = conn.cursor()
+    parked = park_pending(cur)
+    results = []
+    try:
+        seeded = 0
+        for size in sizes:
+            cur.execute(ADD_PENDING_SQL, {'description': BENCH_DESCRIPTION, 'start': seeded + 1, 'stop': size})
+            seeded = size
+            cur.execute(f'ANALYZE {SCHEMA}.payments')
+
+            samples = []
+            for i in range(args.iterations + 1):
+                t0 = time.perf_counter()
+                resp = index.handler(event, None)
+                if i:
+                    samples.append((time.perf_counter() - t0) * 1000)
+            stats = perf.current()
+            body = json.loads(resp['body'])
+            results.append({
+                'pending': size,
+                'status': resp['statusCode'],
+                'returned': len(body.get('payments', [])),
+                'p50_ms': round(handlers.percentile(samples, 50), 2),
+                'p95_ms': round(handlers.percentile(samples, 95), 2),
+                'p99_ms': round(handlers.percentile(samples, 99), 2),
+                'queries': stats.queries,
+                'db_ms': round(stats.db_ms, 2),
+                'bytes': perf.body_bytes(resp),
+            })
+    finally:
+        restore(cur, parked)
+        conn.close()
+
+    failed = (
+        len({result['queries'] for result in results}) > 1
+        or any(result['status'] != 200 or result['returned'] != result['pending'] for result in results)
+    )
+    print(json.dumps({'parked_pending': len(parked), 'results': results}, indent=2, ensure_ascii=False))
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
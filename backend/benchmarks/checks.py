@@ -0,0 +1,227 @@
+"""
+Проверки поведения backend/main на базе, подготовленной handlers.py --setup.
+
+Каждая проверка сама заводит нужные ей строки, вызывает handler(event, context)
+и убирает за собой. Печатает JSON по проверкам; код выхода 1, если хоть одна
+не прошла.
+
+    python backend/benchmarks/checks.py [--only delete-opened-ticket]
+"""
+import argparse
+import json
+import os
+import sys
+
+import handlers
+
+MAIN_DIR = os.path.join(handlers.BACKEND_DIR, 'main')
+SCHEMA = handlers.SCHEMA
+
+
+class Client:
+    """Вызовы handler backend/main от имени пользователя 1 и прямой доступ к базе"""
+
+    def __init__(self, dsn: str, index, perf):
+        self.conn = handlers.connect(dsn)
+        self.conn.autocommit = True
+        self.index = index
+        self.perf = perf
+        self.token = handlers.make_token()
+
+    def call(self, method: str, endpoint: str, params=None, body=None):
+        event = {
+            'httpMethod': method,
+            'headers': {'X-Auth-Token': self.token},
+            'queryStringParameters': dict(params or {}, endpoint=endpoint),
+            'body': json.dumps(body) if body is not None else None,
+        }
+        resp = self.index.handler(event, None)
+        return resp['statusCode'], json.loads(resp['body'] or 'null')
+
+    def query(self, sql: str, params=()):
+        cur = self.conn.cursor()
+        cur.execute(sql, params)
+        rows = cur.fetchall() if cur.description else []
+        cur.close()
+        return rows
+
+
+def check_delete_opened_ticket(client: Client):
+    """Заявку, ветку которой уже открывали (есть курсор прочтения), можно удалить"""
+    (ticket_id,), = client.query(
+        f"INSERT INTO {SCHEMA}.tickets (title, description, created_by) VALUES ('check', 'check', 1) RETURNING id"
+    )
+    try:
+        client.query(
+            f"INSERT INTO {SCHEMA}.ticket_comments (ticket_id, user_id, comment) VALUES (%s, 2, 'check')",
+            (ticket_id,)
+        )
+        status, _ = client.call('GET', 'ticket-comments-api', {'ticket_id': str(ticket_id)})
+        assert status == 200, f'GET ticket-comments-api: {status}'
+        reads = client.query(f"SELECT 1 FROM {SCHEMA}.ticket_comment_reads WHERE ticket_id = %s", (ticket_id,))
+        assert reads, 'курсор прочтения не записан'
+
+        status, body = client.call('POST', 'tickets-bulk-actions', body={'action': 'delete', 'ticket_ids': [ticket_id]})
+        assert status == 200 and body['successful'] == 1, f'bulk delete: {status} {body}'
+        left = client.query(f"SELECT 1 FROM {SCHEMA}.ticket_comment_reads WHERE ticket_id = %s", (ticket_id,))
+        assert not left, 'курсор прочтения остался после удаления заявки'
+    finally:
+        client.query(f"DELETE FROM {SCHEMA}.ticket_comment_reads WHERE ticket_id = %s", (ticket_id,))
+        client.query(f"DELETE FROM {SCHEMA}.ticket_comments WHERE ticket_id = %s", (ticket_id,))
+        client.query(f"DELETE FROM {SCHEMA}.tickets WHERE id = %s", (ticket_id,))
+
+
+def check_deactivated_user_rejected(client: Client):
+    """
+    Пользователь, отключённый в обход main (как это делает users-api), сразу
+    теряет доступ, хотя его права уже лежат в кэше авторизации
+    """
+    status, _ = client.call('GET', 'me')
+    assert status == 200, f'GET me: {status}'
+    try:
+        client.query(f"UPDATE {SCHEMA}.users SET is_active = FALSE WHERE id = 1")
+        status, _ = client.call('GET', 'me')
+        assert status != 200, 'GET me отключённым пользователем: 200 из кэша авторизации'
+    finally:
+        client.query(f"UPDATE {SCHEMA}.users SET is_active = TRUE WHERE id = 1")
+
+
+# Сколько платежей с дополнительными полями засевается для сравнения числа запросов
+PAYMENTS_QUERY_COUNTS = (1, 20, 200)
+
+
+def check_payments_query_count(client: Client):
+    """
+    Полный список платежей (без limit) делает одно и то же число запросов,
+    сколько бы платежей с дополнительными полями в него ни попало
+    """
+    (contractor_id,), = client.query(f"INSERT INTO {SCHEMA}.contractors (name) VALUES ('check') RETURNING id")
+    field_ids = [
+        row[0] for row in client.query(
+            f"INSERT INTO {SCHEMA}.custom_fields (name, field_type) VALUES ('check 1', 'text'), ('check 2', 'text') RETURNING id"
+        )
+    ]
+    queries = {}
+    try:
+        seeded = 0
+        for count in PAYMENTS_QUERY_COUNTS:
+            client.query(f"""
+                WITH added AS (
+                    INSERT INTO {SCHEMA}.payments (category, amount, description, contractor_id, created_by, status)
+                    SELECT 'servers', 100, 'check ' || i, %s, 1, 'draft'
+                    FROM generate_series(1, %s) i
+                    RETURNING id
+                )
+                INSERT INTO {SCHEMA}.custom_field_values (payment_id, custom_field_id, value)
+                SELECT added.id, f.id, 'value' FROM added CROSS JOIN unnest(%s::int[]) AS f(id)
+            """, (contractor_id, count - seeded, field_ids))
+            seeded = count
+
+            # Первый вызов ещё и загружает пользователя в кэш авторизации - меряем второй
+            client.call('GET', 'payments', {'contractor_id': str(contractor_id)})
+            status, body = client.call('GET', 'payments', {'contractor_id': str(contractor_id)})
+            assert status == 200, f'GET payments: {status}'
+            assert len(body) == count, f'GET payments: {len(body)} платежей вместо {count}'
+            assert all(len(payment['custom_fields']) == len(field_ids) for payment in body), 'не все custom_fields'
+            queries[count] = client.perf.current().queries
+        assert len(set(queries.values())) == 1, f'число запросов растёт с числом платежей: {queries}'
+        return {'queries': queries}
+    finally:
+        client.query(f"""
+            DELETE FROM {SCHEMA}.custom_field_values
+            WHERE payment_id IN (SELECT id FROM {SCHEMA}.payments WHERE contractor_id = %s)
+        """, (contractor_id,))
+        client.query(f"DELETE FROM {SCHEMA}.payments WHERE contractor_id = %s", (contractor_id,))
+        client.query(f"DELETE FROM {SCHEMA}.custom_fields WHERE id = ANY(%s)", (field_ids,))
+        client.query(f"DELETE FROM {SCHEMA}.contractors WHERE id = %s", (contractor_id,))
+
+
+BATCH_CHECK_TITLE = 'batch check'
+
+
+def check_batch_item_rolled_back(client: Client):
+    """
+    Записи подзапроса batch, который упал или вернул ошибку до commit, не
+    сохраняются, даже если следующий подзапрос на том же соединении коммитит
+    """
+    def insert_ticket(conn):
+        cur = conn.cursor()
+        cur.execute(
+            f"INSERT INTO {SCHEMA}.tickets (title, description, created_by) VALUES (%s, 'check', 1)",
+            (BATCH_CHECK_TITLE,)
+        )
+        cur.close()
+
+    def write_and_fail(method, event, conn, payload):
+        insert_ticket(conn)
+        raise RuntimeError('check')
+
+    def write_and_return(method, event, conn, payload):
+        insert_ticket(conn)
+        return client.index.response(400, {'error': 'check'})
+
+    def commit(method, event, conn, payload):
+        conn.commit()
+        return client.index.response(200, {'ok': True})
+
+    routes = {'check-fail': write_and_fail, 'check-return': write_and_return, 'check-commit': commit}
+    client.index.ROUTES.update(routes)
+    try:
+        status, body = client.call('POST', 'batch', body={'requests': [
+            {'id': 'fail', 'endpoint': 'check-fail', 'method': 'POST'},
+            {'id': 'return', 'endpoint': 'check-return', 'method': 'POST'},
+            {'id': 'commit', 'endpoint': 'check-commit', 'method': 'POST'},
+        ]})
+        assert status == 200, f'POST batch: {status} {body}'
+        statuses = {key: value['status'] for key, value in body['responses'].items()}
+        assert statuses == {'fail': 500, 'return': 400, 'commit': 200}, f'POST batch: {statuses}'
+        left = client.query(f"SELECT id FROM {SCHEMA}.tickets WHERE title = %s", (BATCH_CHECK_TITLE,))
+        assert not left, f'записи несостоявшихся подзапросов закоммичены: {len(left)}'
+    finally:
+        for endpoint in routes:
+            client.index.ROUTES.pop(endpoint, None)
+        client.query(f"DELETE FROM {SCHEMA}.tickets WHERE title = %s", (BATCH_CHECK_TITLE,))
+
+
+CHECKS = [
+    ('delete-opened-ticket', check_delete_opened_ticket),
+    ('deactivated-user-rejected', check_deactivated_user_rejected),
+    ('payments-query-count', check_payments_query_count),
+    ('batch-item-rolled-back', check_batch_item_rolled_back),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--dsn', default=os.environ.get('BENCH_DATABASE_URL'))
+    parser.add_argument('--pgdata', default=os.path.join(handlers.BENCH_DIR, '.pgdata'))
+    parser.add_argument('--only', help='проверки через запятую')
+    args = parser.parse_args()
+
+    dsn = args.dsn or handlers.start_local_server(args.pgdata)
+    os.environ['DATABASE_URL'] = handlers.with_search_path(dsn, SCHEMA)
+    os.environ['JWT_SECRET'] = handlers.JWT_SECRET
+    # Версия прав проверяется на каждом запросе, а не раз в несколько секунд
+    os.environ['AUTH_VERSION_CHECK_INTERVAL'] = '0'
+    sys.path.insert(0, MAIN_DIR)
+    import index
+    import perf
+
+    client = Client(dsn, index, perf)
+    only = set(args.only.split(',')) if args.only else None
+    results = []
+    for name, check in CHECKS:
+        if only and name not in only:
+            continue
+        try:
+            details = check(client)
+            results.append({'check': name, 'ok': True, **(details or {})})
+        except AssertionError as e:
+            results.append({'check': name, 'ok': False, 'error': str(e)})
+
+    print(json.dumps({'results': results}, indent=2, ensure_ascii=False, default=str))
+    sys.exit(0 if all(result['ok'] for result in results) else 1)
+
+
+if __name__ == '__main__':
+    main()
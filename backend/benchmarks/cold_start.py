@@ -0,0 +1,80 @@
+"""
+Бюджет времени импорта backend/main по эндпоинтам (холодный старт).
+
+Для каждого эндпоинта в отдельном интерпретаторе импортирует index и те модули,
+которые обработчик подгружает лениво при первом вызове, и сравнивает медиану
+с бюджетом. Код выхода 1, если хоть один эндпоинт вышел за бюджет.
+
+    python backend/benchmarks/cold_start.py [--runs 5]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+MAIN_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'main')
+
+# эндпоинт -> (модули, которые он импортирует лениво, бюджет в мс)
+ENDPOINT_BUDGETS = {
+    'health': ([], 200),
+    'payments GET': ([], 200),
+    'tickets GET': ([], 200),
+    'payments POST': (['models'], 400),
+    'categories POST': (['models'], 400),
+    'login': (['bcrypt'], 220),
+    'users POST': (['models', 'bcrypt'], 420),
+}
+
+PROBE = '''
+import json, sys, time
+sys.path.insert(0, {main_dir!r})
+started = time.perf_counter()
+import index
+imported = time.perf_counter()
+for name in {modules!r}:
+    __import__(name)
+finished = time.perf_counter()
+print(json.dumps({{'index_ms': (imported - started) * 1000, 'total_ms': (finished - started) * 1000}}))
+'''
+
+
+def probe(modules, runs: int):
+    code = PROBE.format(main_dir=MAIN_DIR, modules=modules)
+    samples = []
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True)
+        samples.append(json.loads(out.stdout))
+    return (
+        statistics.median(s['index_ms'] for s in samples),
+        statistics.median(s['total_ms'] for s in samples),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    results = []
+    over_budget = False
+    for endpoint, (modules, budget_ms) in ENDPOINT_BUDGETS.items():
+        index_ms, total_ms = probe(modules, args.runs)
+        ok = total_ms <= budget_ms
+        over_budget = over_budget or not ok
+        results.append({
+            'endpoint': endpoint,
+            'lazy_modules': modules,
+            'index_ms': round(index_ms, 1),
+            'total_ms': round(total_ms, 1),
+            'budget_ms': budget_ms,
+            'ok': ok,
+        })
+
+    print(json.dumps(results, indent=2, ensure_ascii=False))
+    sys.exit(1 if over_budget else 0)
+
+
+if __name__ == '__main__':
+    main()
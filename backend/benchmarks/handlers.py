@@ -0,0 +1,541 @@
+"""
+Нагрузочный прогон обработчиков облачных функций на локальной PostgreSQL.
+
+Накатывает db_migrations/ на чистую базу, заполняет её синтетическими данными
+в заданном масштабе и вызывает handler(event, context) функций main,
+payments-api, tickets-api, approvals-api, stats-api и events с подписанным JWT.
+По каждому эндпоинту пишет в JSON p50/p95/p99 времени ответа, число SQL-запросов,
+время в БД и размер ответа; с --baseline сравнивает с прошлым прогоном и
+выходит с кодом 1, если какой-то эндпоинт стал медленнее порога.
+
+    python backend/benchmarks/handlers.py --setup [--scale 0.1]
+    python backend/benchmarks/handlers.py [--iterations 20] [--output results.json]
+    python backend/benchmarks/handlers.py --baseline results.json [--threshold 1.25]
+
+База берётся из --dsn или BENCH_DATABASE_URL; без них поднимается локальный
+сервер через pgserver (pip install pgserver) в --pgdata. Каждая функция
+вызывается в своём интерпретаторе: у них одноимённые модули index, db_pool, perf.
+"""
+import argparse
+import glob
+import json
+import os
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta
+from urllib.parse import quote
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(BENCH_DIR)
+MIGRATIONS_DIR = os.path.join(BACKEND_DIR, '..', 'db_migrations')
+
+SCHEMA = 't_p61788166_html_to_frontend'
+# Миграции проекта стендов лежат в той же папке, но живут в своей схеме
+EVENTS_SCHEMA = 't_p5249081_event_stand_reservat'
+EVENTS_MIGRATIONS = ('V0001__create_initial_schema.sql',)
+
+JWT_SECRET = 'bench-secret'
+BENCH_USER_EMAIL = 'bench@example.com'
+
+# Объёмы при --scale 1
+SEED_SIZES = {
+    'users': 200,
+    'payments': 100000,
+    'approvals': 50000,
+    'tickets': 50000,
+    'ticket_comments': 500000,
+    'comment_attachments': 100000,
+    'comment_reactions': 200000,
+    'audit_logs': 1000000,
+}
+# Объёмы, которые от --scale не зависят
+SEED_FIXED = {
+    'events': 50,
+    'booths_per_event': 40,
+}
+
+FUNCTION_SCHEMAS = {
+    'main': SCHEMA,
+    'payments-api': SCHEMA,
+    'tickets-api': SCHEMA,
+    'approvals-api': SCHEMA,
+    'stats-api': SCHEMA,
+    'events': EVENTS_SCHEMA,
+}
+
+# (функция, имя сценария, метод, query-параметры, тело). В теле и параметрах
+# {ticket_ids}, {bulk_max_ticket_ids}, {ticket_id} и {event_id} подставляются из
+# засеянных данных. Если тело - список, итерации идут по нему по кругу.
+SCENARIOS = [
+    ('main', 'payments page', 'GET', {'endpoint': 'payments', 'limit': '50'}, None),
+    ('main', 'dashboard-stats', 'GET', {'endpoint': 'dashboard-stats'}, None),
+    ('main', 'budget-breakdown', 'GET', {'endpoint': 'budget-breakdown'}, None),
+    ('main', 'stats', 'GET', {'endpoint': 'stats'}, None),
+    ('main', 'tickets', 'GET', {'endpoint': 'tickets'}, None),
+    ('main', 'tickets page', 'GET', {'endpoint': 'tickets', 'limit': '50'}, None),
+    ('main', 'tickets page filtered', 'GET', {'endpoint': 'tickets', 'limit': '50', 'status_id': '1,2'}, None),
+    ('main', 'audit-logs', 'GET', {'endpoint': 'audit-logs', 'limit': '100'}, None),
+    ('main', 'me', 'GET', {'endpoint': 'me'}, None),
+    ('main', 'ticket-comments', 'GET', {'endpoint': 'ticket-comments-api', 'ticket_id': '{ticket_id}'}, None),
+    ('main', 'ticket-comments page', 'GET',
+     {'endpoint': 'ticket-comments-api', 'ticket_id': '{ticket_id}', 'limit': '50'}, None),
+    ('main', 'notifications', 'GET', {'endpoint': 'notifications'}, None),
+    # Опрос без новых уведомлений: курсор заведомо впереди последнего id
+    ('main', 'notifications idle poll', 'GET', {'endpoint': 'notifications', 'since': '2147483647'}, None),
+    ('main', 'tickets-bulk-actions', 'POST', {'endpoint': 'tickets-bulk-actions'},
+     {'action': 'change_priority', 'ticket_ids': '{ticket_ids}', 'priority_id': 2}),
+    # Предел BULK_TICKETS_MAX: значение меняется на каждой итерации, чтобы каждый
+    # вызов реально обновлял все заявки и писал аудит по каждой
+    ('main', 'tickets-bulk-actions max status', 'POST', {'endpoint': 'tickets-bulk-actions'}, [
+        {'action': 'change_status', 'ticket_ids': '{bulk_max_ticket_ids}', 'status_id': status_id}
+        for status_id in (1, 2)
+    ]),
+    ('main', 'tickets-bulk-actions max assign', 'POST', {'endpoint': 'tickets-bulk-actions'}, [
+        {'action': 'assign', 'ticket_ids': '{bulk_max_ticket_ids}', 'assigned_to': user_id}
+        for user_id in (1, 2)
+    ]),
+    ('main', 'batch payments page', 'POST', {'endpoint': 'batch'}, {'requests': [
+        {'id': endpoint, 'endpoint': endpoint, 'params': {'limit': 50} if endpoint == 'payments' else {}}
+        for endpoint in ('payments', 'categories', 'legal-entities', 'contractors',
+                         'customer-departments', 'services', 'custom-fields', 'stats')
+    ]}),
+    ('payments-api', 'payments page', 'GET', {'limit': '50'}, None),
+    ('payments-api', 'payments my', 'GET', {'scope': 'my', 'limit': '50'}, None),
+    ('tickets-api', 'tickets', 'GET', {'endpoint': 'tickets'}, None),
+    ('tickets-api', 'tickets page', 'GET', {'endpoint': 'tickets', 'limit': '50'}, None),
+    ('tickets-api', 'ticket-comments', 'GET', {'endpoint': 'ticket-comments-api', 'ticket_id': '{ticket_id}'}, None),
+    ('tickets-api', 'ticket-dictionaries', 'GET', {'endpoint': 'ticket-dictionaries-api'}, None),
+    ('approvals-api', 'pending approvals', 'GET', {}, None),
+    ('stats-api', 'stats', 'GET', {}, None),
+    ('events', 'events list', 'GET', {}, None),
+    ('events', 'event booths', 'GET', {'event_id': '{event_id}'}, None),
+]
+
+BULK_TICKETS = 500
+# Должно совпадать с BULK_TICKETS_MAX в backend/main/index.py
+BULK_TICKETS_MAX = 1000
+
+
+def connect(dsn: str):
+    import psycopg2
+    return psycopg2.connect(dsn)
+
+
+def start_local_server(pgdata: str) -> str:
+    try:
+        import pgserver
+    except ImportError:
+        sys.exit('Нужен --dsn, BENCH_DATABASE_URL или pip install pgserver')
+    return pgserver.get_server(pgdata, cleanup_mode=None).get_uri()
+
+
+def with_search_path(dsn: str, schema: str) -> str:
+    """DSN, у соединений которого search_path указывает на схему функции"""
+    options = quote(f'-c search_path={schema},public')
+    if '://' in dsn:
+        return dsn + ('&' if '?' in dsn else '?') + f'options={options}'
+    return f"{dsn} options='-c search_path={schema},public'"
+
+
+def migration_files():
+    def version(path):
+        name = os.path.basename(path)
+        return int(name[1:].split('__')[0]), name
+    return sorted(glob.glob(os.path.join(MIGRATIONS_DIR, 'V*.sql')), key=version)
+
+
+def apply_migrations(dsn: str):
+    """
+    Пересоздаёт обе схемы и накатывает миграции. Часть миграций - правки данных
+    боевой базы по конкретным id; их ошибки пишутся в отчёт и не прерывают прогон.
+    """
+    conn = connect(dsn)
+    conn.autocommit = True
+    cur = conn.cursor()
+    cur.execute(f'DROP SCHEMA IF EXISTS {SCHEMA} CASCADE')
+    cur.execute(f'DROP SCHEMA IF EXISTS {EVENTS_SCHEMA} CASCADE')
+    cur.execute(f'CREATE SCHEMA {SCHEMA}')
+    cur.execute(f'CREATE SCHEMA {EVENTS_SCHEMA}')
+
+    files = migration_files()
+    events_files = [
+        path for path in files
+        if os.path.basename(path) in EVENTS_MIGRATIONS or EVENTS_SCHEMA in read_file(path)
+    ]
+
+    cur.execute(f'SET search_path TO {EVENTS_SCHEMA}')
+    for path in events_files:
+        cur.execute(read_file(path))
+
+    cur.execute(f'SET search_path TO {SCHEMA}')
+    cur.execute(read_file(os.path.join(BENCH_DIR, 'schema_before_migrations.sql')))
+    failed = []
+    for path in files:
+        if path in events_files:
+            continue
+        try:
+            cur.execute(read_file(path))
+        except Exception as e:
+            failed.append({'migration': os.path.basename(path), 'error': str(e).split('\n')[0]})
+    cur.execute(read_file(os.path.join(BENCH_DIR, 'schema_after_migrations.sql')))
+    conn.close()
+    return failed
+
+
+def read_file(path: str) -> str:
+    with open(path, encoding='utf-8') as f:
+        return f.read()
+
+
+# random_pick(массив) - случайный элемент массива id
+SEED_SQL = [
+    '''
+    CREATE OR REPLACE FUNCTION pg_temp.random_pick(ids INTEGER[]) RETURNS INTEGER AS $$
+        SELECT ids[1 + floor(random() * cardinality(ids))::int]
+    $$ LANGUAGE sql VOLATILE
+    ''',
+    f'''
+    INSERT INTO {SCHEMA}.users (email, password_hash, full_name, username, position, is_active)
+    SELECT 'user' || i || '@bench.local', 'x', 'Пользователь ' || i, 'user' || i, 'Инженер', TRUE
+    FROM generate_series(1, %(users)s) i
+    ''',
+    f'''
+    INSERT INTO {SCHEMA}.user_roles (user_id, role_id)
+    SELECT u.id, (SELECT id FROM {SCHEMA}.roles WHERE name = 'Просмотр')
+    FROM {SCHEMA}.users u WHERE u.email LIKE '%%@bench.local'
+    ''',
+    f'''
+    UPDATE {SCHEMA}.services SET
+        intermediate_approver_id = pg_temp.random_pick((SELECT array_agg(id) FROM {SCHEMA}.users)),
+        final_approver_id = 1
+    ''',
+    f'''
+    INSERT INTO {SCHEMA}.payments (
+        category, amount, description, payment_date, created_at, category_id, legal_entity_id,
+        contractor_id, department_id, status, created_by, service_id, invoice_number, invoice_date
+    )
+    SELECT 'servers', round((100 + random() * 500000)::numeric, 2), 'Оплата счёта №' || i,
+           d, d, pg_temp.random_pick(ref.categories), pg_temp.random_pick(ref.legal_entities),
+           pg_temp.random_pick(ref.contractors), pg_temp.random_pick(ref.departments),
+           (ARRAY['draft', 'pending_tech_director', 'pending_ceo', 'approved', 'approved',
+                  'approved', 'approved', 'paid', 'paid', 'rejected'])[1 + i %% 10],
+           pg_temp.random_pick(ref.users), pg_temp.random_pick(ref.services), 'INV-' || i, d::date
+    FROM generate_series(1, %(payments)s) i
+    CROSS JOIN LATERAL (SELECT NOW() - random() * INTERVAL '1095 days' AS d) dt
+    CROSS JOIN (
+        SELECT (SELECT array_agg(id) FROM {SCHEMA}.categories) AS categories,
+               (SELECT array_agg(id) FROM {SCHEMA}.legal_entities) AS legal_entities,
+               (SELECT array_agg(id) FROM {SCHEMA}.contractors) AS contractors,
+               (SELECT array_agg(id) FROM {SCHEMA}.customer_departments) AS departments,
+               (SELECT array_agg(id) FROM {SCHEMA}.users) AS users,
+               (SELECT array_agg(id) FROM {SCHEMA}.services) AS services
+    ) ref
+    ''',
+    f'''
+    INSERT INTO {SCHEMA}.approvals (payment_id, approver_id, approver_role, action, comment, created_at)
+    SELECT p.id, 1, 'tech_director', 'approved', 'Согласовано', p.created_at + INTERVAL '1 hour'
+    FROM {SCHEMA}.payments p
+    ORDER BY p.id DESC
+    LIMIT %(approvals)s
+    ''',
+    f'''
+    INSERT INTO {SCHEMA}.tickets (
+        title, description, category_id, priority_id, status_id, department_id,
+        created_by, assigned_to, due_date, created_at, updated_at, service_id
+    )
+    SELECT 'Заявка №' || i, 'Описание проблемы по заявке ' || i || ': не работает доступ к сервису',
+           pg_temp.random_pick(ref.categories), pg_temp.random_pick(ref.priorities),
+           pg_temp.random_pick(ref.statuses), pg_temp.random_pick(ref.departments),
+           pg_temp.random_pick(ref.users), pg_temp.random_pick(ref.users),
+           (d + INTERVAL '14 days')::date, d, d, pg_temp.random_pick(ref.services)
+    FROM generate_series(1, %(tickets)s) i
+    CROSS JOIN LATERAL (SELECT NOW() - random() * INTERVAL '730 days' AS d) dt
+    CROSS JOIN (
+        SELECT (SELECT array_agg(id) FROM {SCHEMA}.ticket_categories) AS categories,
+               (SELECT array_agg(id) FROM {SCHEMA}.ticket_priorities) AS priorities,
+               (SELECT array_agg(id) FROM {SCHEMA}.ticket_statuses) AS statuses,
+               (SELECT array_agg(id) FROM {SCHEMA}.departments) AS departments,
+               (SELECT array_agg(id) FROM {SCHEMA}.users) AS users,
+               (SELECT array_agg(id) FROM {SCHEMA}.services) AS services
+    ) ref
+    ''',
+    f'''
+    INSERT INTO {SCHEMA}.ticket_comments (ticket_id, user_id, comment, is_internal, created_at, is_read)
+    SELECT pg_temp.random_pick(ref.tickets), pg_temp.random_pick(ref.users),
+           'Комментарий ' || i, random() < 0.1, NOW() - random() * INTERVAL '730 days', random() < 0.8
+    FROM generate_series(1, %(ticket_comments)s) i
+    CROSS JOIN (
+        SELECT (SELECT array_agg(id) FROM {SCHEMA}.tickets) AS tickets,
+               (SELECT array_agg(id) FROM {SCHEMA}.users) AS users
+    ) ref
+    ''',
+    f'''
+    INSERT INTO {SCHEMA}.comment_attachments (comment_id, filename, url, size)
+    SELECT pg_temp.random_pick(ref.comments), 'file_' || i || '.pdf',
+           'https://storage.example.com/files/' || i || '.pdf', 1024 + i %% 100000
+    FROM generate_series(1, %(comment_attachments)s) i
+    CROSS JOIN (SELECT (SELECT array_agg(id) FROM {SCHEMA}.ticket_comments) AS comments) ref
+    ''',
+    f'''
+    INSERT INTO {SCHEMA}.comment_reactions (comment_id, user_id, emoji)
+    SELECT pg_temp.random_pick(ref.comments), pg_temp.random_pick(ref.users),
+           (ARRAY['👍', '👀', '✅', '🔥'])[1 + i %% 4]
+    FROM generate_series(1, %(comment_reactions)s) i
+    CROSS JOIN (
+        SELECT (SELECT array_agg(id) FROM {SCHEMA}.ticket_comments) AS comments,
+               (SELECT array_agg(id) FROM {SCHEMA}.users) AS users
+    ) ref
+    ON CONFLICT (comment_id, user_id, emoji) DO NOTHING
+    ''',
+    f'''
+    INSERT INTO {SCHEMA}.audit_logs (entity_type, entity_id, action, user_id, username, changed_fields, created_at)
+    SELECT (ARRAY['payment', 'ticket', 'user'])[1 + i %% 3], 1 + i %% 50000,
+           (ARRAY['created', 'updated', 'status_changed'])[1 + i %% 3], 1, 'admin',
+           jsonb_build_object('status', jsonb_build_object('old', 'draft', 'new', 'approved')),
+           NOW() - random() * INTERVAL '730 days'
+    FROM generate_series(1, %(audit_logs)s) i
+    ''',
+    f'''
+    INSERT INTO {EVENTS_SCHEMA}.users (email, name) VALUES ('{BENCH_USER_EMAIL}', 'Bench')
+    ''',
+    f'''
+    INSERT INTO {EVENTS_SCHEMA}.events (user_id, name, date, location, description)
+    SELECT (SELECT id FROM {EVENTS_SCHEMA}.users WHERE email = '{BENCH_USER_EMAIL}'),
+           'Выставка ' || i, '2025-0' || (1 + i %% 9) || '-15', 'Москва', 'Описание выставки ' || i
+    FROM generate_series(1, %(events)s) i
+    ''',
+    f'''
+    INSERT INTO {EVENTS_SCHEMA}.booths (id, event_id, x, y, width, height, status, company)
+    SELECT 'B' || b, e.id, (b %% 10) * 12, (b / 10) * 12, 10, 10,
+           (ARRAY['available', 'booked', 'unavailable'])[1 + b %% 3], 'Компания ' || b
+    FROM {EVENTS_SCHEMA}.events e
+    CROSS JOIN generate_series(1, %(booths_per_event)s) b
+    ''',
+]
+
+
+def seed(dsn: str, scale: float):
+    sizes = {name: max(1, int(count * scale)) for name, count in SEED_SIZES.items()}
+    sizes.update(SEED_FIXED)
+    conn = connect(dsn)
+    cur = conn.cursor()
+    cur.execute('SELECT setseed(0.42)')
+    for sql in SEED_SQL:
+        cur.execute(sql, sizes)
+    conn.commit()
+    cur.execute('ANALYZE')
+    conn.close()
+    return sizes
+
+
+def seed_refs(dsn: str):
+    """id из засеянных данных для подстановки в сценарии"""
+    conn = connect(dsn)
+    cur = conn.cursor()
+    cur.execute(f'''
+        SELECT ticket_id FROM {SCHEMA}.ticket_comments
+        GROUP BY ticket_id ORDER BY COUNT(*) DESC LIMIT 1
+    ''')
+    row = cur.fetchone()
+    ticket_id = row[0] if row else 1
+    cur.execute(f'SELECT id FROM {SCHEMA}.tickets ORDER BY id LIMIT %s', (BULK_TICKETS,))
+    ticket_ids = [r[0] for r in cur.fetchall()]
+    cur.execute(f'SELECT id FROM {SCHEMA}.tickets ORDER BY id LIMIT %s', (BULK_TICKETS_MAX,))
+    bulk_max_ticket_ids = [r[0] for r in cur.fetchall()]
+    cur.execute(f'SELECT MIN(id) FROM {EVENTS_SCHEMA}.events')
+    event_id = cur.fetchone()[0] or 1
+    conn.close()
+    return {
+        'ticket_id': ticket_id,
+        'ticket_ids': ticket_ids,
+        'bulk_max_ticket_ids': bulk_max_ticket_ids,
+        'event_id': event_id,
+    }
+
+
+def substitute(value, refs):
+    if isinstance(value, dict):
+        return {key: substitute(item, refs) for key, item in value.items()}
+    if isinstance(value, list):
+        return [substitute(item, refs) for item in value]
+    if isinstance(value, str) and value.startswith('{') and value.endswith('}') and value[1:-1] in refs:
+        ref = refs[value[1:-1]]
+        return ref if isinstance(ref, list) else str(ref)
+    return value
+
+
+def percentile(samples, pct: float) -> float:
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def make_token() -> str:
+    import jwt
+    now = datetime.utcnow()
+    payload = {'user_id': 1, 'email': 'admin@example.com', 'exp': now + timedelta(hours=1), 'iat': now}
+    return jwt.encode(payload, JWT_SECRET, algorithm='HS256')
+
+
+def run_worker(function: str):
+    """
+    Режим дочернего процесса: сценарии одной функции приходят JSON в stdin,
+    результаты уходят JSON в stdout
+    """
+    job = json.load(sys.stdin)
+    function_dir = os.path.join(BACKEND_DIR, function)
+    sys.path.insert(0, function_dir)
+    import index
+    import perf
+
+    token = make_token()
+    results = []
+    for scenario in job['scenarios']:
+        bodies = scenario['body'] if isinstance(scenario['body'], list) else [scenario['body']]
+        event = {
+            'httpMethod': scenario['method'],
+            'path': '/',
+            'headers': {'X-Auth-Token': token, 'X-User-Email': BENCH_USER_EMAIL},
+            'queryStringParameters': scenario['params'],
+            'isBase64Encoded': False,
+        }
+        samples, resp, stats = [], None, None
+        for i in range(job['warmup'] + job['iterations']):
+            body = bodies[i % len(bodies)]
+            event['body'] = json.dumps(body) if body is not None else None
+            started = time.perf_counter()
+            resp = index.handler(event, None)
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            stats = perf.current()
+            if i >= job['warmup']:
+                samples.append(elapsed_ms)
+
+        results.append({
+            'function': function,
+            'endpoint': scenario['name'],
+            'method': scenario['method'],
+            'status': resp.get('statusCode'),
+            'iterations': len(samples),
+            'p50_ms': round(percentile(samples, 50), 2),
+            'p95_ms': round(percentile(samples, 95), 2),
+            'p99_ms': round(percentile(samples, 99), 2),
+            'queries': stats.queries,
+            'rows': stats.rows,
+            'db_ms': round(stats.db_ms, 2),
+            'bytes': perf.body_bytes(resp),
+        })
+    json.dump(results, sys.stdout)
+
+
+def run_function(function: str, scenarios, dsn: str, args):
+    env = dict(
+        os.environ,
+        DATABASE_URL=with_search_path(dsn, FUNCTION_SCHEMAS[function]),
+        JWT_SECRET=JWT_SECRET,
+        # В отчёт идут только итоги; медленные запросы видны с --verbose
+        SLOW_QUERY_MS=os.environ.get('SLOW_QUERY_MS', '200'),
+    )
+    job = json.dumps({'scenarios': scenarios, 'iterations': args.iterations, 'warmup': args.warmup})
+    out = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), '--worker', function],
+        input=job, capture_output=True, text=True, env=env, cwd=os.path.join(BACKEND_DIR, function)
+    )
+    if args.verbose and out.stderr:
+        sys.stderr.write(out.stderr)
+    if out.returncode != 0:
+        sys.stderr.write(out.stderr)
+        raise SystemExit(f'{function}: worker exited with {out.returncode}')
+    return json.loads(out.stdout)
+
+
+def compare(results, baseline_path: str, threshold: float):
+    """Эндпоинты, у которых p50 вырос больше чем в threshold раз или стало больше запросов"""
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = {(r['function'], r['endpoint']): r for r in json.load(f)['results']}
+    regressions = []
+    for result in results:
+        before = baseline.get((result['function'], result['endpoint']))
+        if before is None:
+            continue
+        slower = result['p50_ms'] > before['p50_ms'] * threshold
+        more_queries = result['queries'] > before['queries']
+        if slower or more_queries:
+            regressions.append({
+                'function': result['function'],
+                'endpoint': result['endpoint'],
+                'p50_ms': [before['p50_ms'], result['p50_ms']],
+                'queries': [before['queries'], result['queries']],
+            })
+    return regressions
+
+
+def git_commit() -> str:
+    out = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, cwd=BENCH_DIR)
+    return out.stdout.strip()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--dsn', default=os.environ.get('BENCH_DATABASE_URL'))
+    parser.add_argument('--pgdata', default=os.path.join(BENCH_DIR, '.pgdata'))
+    parser.add_argument('--setup', action='store_true', help='пересоздать схемы, накатить миграции и засеять')
+    parser.add_argument('--scale', type=float, default=1.0, help='множитель объёмов SEED_SIZES')
+    parser.add_argument('--iterations', type=int, default=20)
+    parser.add_argument('--warmup', type=int, default=2)
+    parser.add_argument('--only', help='функции через запятую, например main,tickets-api')
+    parser.add_argument('--output', help='куда записать JSON (по умолчанию stdout)')
+    parser.add_argument('--baseline', help='JSON прошлого прогона для сравнения')
+    parser.add_argument('--threshold', type=float, default=1.25)
+    parser.add_argument('--verbose', action='store_true')
+    parser.add_argument('--worker', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.worker)
+        return
+
+    dsn = args.dsn or start_local_server(args.pgdata)
+    report = {'commit': git_commit(), 'started_at': datetime.utcnow().isoformat() + 'Z'}
+
+    if args.setup:
+        started = time.perf_counter()
+        report['failed_migrations'] = apply_migrations(dsn)
+        report['seed'] = seed(dsn, args.scale)
+        report['setup_s'] = round(time.perf_counter() - started, 1)
+
+    refs = seed_refs(dsn)
+    only = set(args.only.split(',')) if args.only else None
+    by_function = {}
+    for function, name, method, params, body in SCENARIOS:
+        if only and function not in only:
+            continue
+        by_function.setdefault(function, []).append({
+            'name': name,
+            'method': method,
+            'params': substitute(params, refs),
+            'body': substitute(body, refs),
+        })
+
+    results = []
+    for function, scenarios in by_function.items():
+        results.extend(run_function(function, scenarios, dsn, args))
+    report['iterations'] = args.iterations
+    report['results'] = results
+
+    exit_code = 0
+    if args.baseline:
+        report['regressions'] = compare(results, args.baseline, args.threshold)
+        exit_code = 1 if report['regressions'] else 0
+
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+    sys.exit(exit_code)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,149 @@
+"""
+Пропускная способность разбора строк лога (backend/log-analyzer/log_parser.py).
+
+Генерирует выборку из --lines строк (по умолчанию 2M), поровну на каждый формат
+и одну смешанную, где форматы перемешаны. Каждая часть разбирается общим
+parse_log_line и LogLineParser с определением формата. Затем вся выборка одним
+файлом разбирается кусками, как при загрузке в log-analyzer, в этом процессе и
+в пуле из 2, 4, ... процессов до числа ядер (или --workers); по каждому
+варианту - строки в секунду и ускорение относительно одного процесса.
+Печатает JSON. Базы не нужно.
+
+    python backend/benchmarks/log_parsing.py [--lines 2000000] [--noise 0.02] [--workers 1,2,4]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+import handlers
+
+LOG_ANALYZER_DIR = os.path.join(handlers.BACKEND_DIR, 'log-analyzer')
+FORMATS = ['iso', 'standard', 'syslog', 'level_date', 'level']
+LEVELS = ['ERROR', 'WARN', 'INFO', 'DEBUG']
+MONTHS = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+MESSAGES = [
+    'Request completed in 42ms',
+    'User 1842 logged in from 10.0.3.17',
+    'Payment 99812 status changed: pending -> approved',
+    'Connection to postgres lost, retrying',
+    'Slow query: SELECT * FROM tickets WHERE status_id = 3',
+]
+
+
+def make_line(fmt: str, rnd: random.Random) -> str:
+    level = rnd.choice(LEVELS)
+    message = rnd.choice(MESSAGES)
+    day, hour, minute, second = rnd.randint(1, 28), rnd.randint(0, 23), rnd.randint(0, 59), rnd.randint(0, 59)
+    if fmt == 'iso':
+        return f'2024-03-{day:02d}T{hour:02d}:{minute:02d}:{second:02d}.{rnd.randint(0, 999):03d}Z [{level}] {message}'
+    if fmt == 'standard':
+        return f'2024-03-{day:02d} {hour:02d}:{minute:02d}:{second:02d} {level} {message}'
+    if fmt == 'syslog':
+        return f'{rnd.choice(MONTHS)} {day} {hour:02d}:{minute:02d}:{second:02d} app-01 {level.lower()}: {message}'
+    if fmt == 'level_date':
+        return f'{level}: 2024-03-{day:02d} {message}'
+    if fmt == 'level':
+        return f'{level} {message}'
+    return message
+
+
+def make_sample(fmt: str, count: int, noise: float, rnd: random.Random):
+    """count строк формата fmt; доля noise - строки других форматов и мусор"""
+    formats = FORMATS + ['plain']
+    lines = []
+    for _ in range(count):
+        line_fmt = fmt if fmt != 'mixed' and rnd.random() >= noise else rnd.choice(formats)
+        lines.append(make_line(line_fmt, rnd))
+    return lines
+
+
+def measure(parse, lines) -> float:
+    started = time.perf_counter()
+    for line_number, line in enumerate(lines, 1):
+        parse(line, line_number)
+    return len(lines) / (time.perf_counter() - started)
+
+
+def worker_counts(spec: str) -> list:
+    if spec:
+        return sorted({int(item) for item in spec.split(',')})
+    cores = os.cpu_count() or 1
+    counts = [1]
+    while counts[-1] * 2 < cores:
+        counts.append(counts[-1] * 2)
+    if cores > 1:
+        counts.append(cores)
+    return counts
+
+
+def measure_chunks(log_analyzer, file_data: bytes, workers: int) -> float:
+    started = time.perf_counter()
+    lines = sum(count for _, count, _, _, _ in log_analyzer.iter_parsed_chunks(0, file_data, workers))
+    return lines / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--lines', type=int, default=2000000)
+    parser.add_argument('--noise', type=float, default=0.02)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--workers', default='', help='через запятую; по умолчанию 1, 2, 4, ... до числа ядер')
+    args = parser.parse_args()
+
+    sys.path.insert(0, LOG_ANALYZER_DIR)
+    import log_parser
+    import index as log_analyzer
+    # Пул включается для любого размера: меряем сам разбор, а не порог
+    log_analyzer.LOG_PARALLEL_MIN_BYTES = 0
+
+    rnd = random.Random(args.seed)
+    parts = FORMATS + ['mixed']
+    per_part = max(1, args.lines // len(parts))
+
+    results = []
+    total_generic = total_detected = 0.0
+    file_parts = []
+    for fmt in parts:
+        lines = make_sample(fmt, per_part, args.noise, rnd)
+        file_parts.append('\n'.join(lines).encode())
+        line_parser = log_parser.LogLineParser(lines)
+        generic = measure(log_parser.parse_log_line, lines)
+        detected = measure(line_parser.parse, lines)
+        total_generic += per_part / generic
+        total_detected += per_part / detected
+        results.append({
+            'sample': fmt,
+            'lines': per_part,
+            'detected_format': line_parser.format,
+            'generic_lines_per_s': round(generic),
+            'detected_lines_per_s': round(detected),
+        })
+
+    file_data = b'\n'.join(file_parts)
+    del file_parts
+    parallel = []
+    for workers in worker_counts(args.workers):
+        lines_per_s = measure_chunks(log_analyzer, file_data, workers)
+        parallel.append({
+            'workers': workers,
+            'lines_per_s': round(lines_per_s),
+            'speedup': round(lines_per_s / parallel[0]['lines_per_s'], 2) if parallel else 1.0,
+        })
+
+    print(json.dumps({
+        'lines': per_part * len(parts),
+        'noise': args.noise,
+        'cpu_count': os.cpu_count(),
+        'generic_lines_per_s': round(per_part * len(parts) / total_generic),
+        'detected_lines_per_s': round(per_part * len(parts) / total_detected),
+        'results': results,
+        'file_mb': round(len(file_data) / 1024 / 1024, 1),
+        'parallel': parallel,
+    }, indent=2, ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()
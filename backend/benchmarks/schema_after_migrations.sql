@@ -0,0 +1,10 @@
+-- Колонки, добавленные в боевой БД вне db_migrations, к таблицам из миграций.
+
+ALTER TABLE t_p61788166_html_to_frontend.payments
+ADD COLUMN IF NOT EXISTS payment_type VARCHAR(50);
+
+ALTER TABLE t_p61788166_html_to_frontend.payments
+ADD COLUMN IF NOT EXISTS cash_receipt_url TEXT;
+
+ALTER TABLE t_p61788166_html_to_frontend.ticket_comments
+ADD COLUMN IF NOT EXISTS parent_id INTEGER;
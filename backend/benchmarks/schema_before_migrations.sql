@@ -0,0 +1,37 @@
+-- Таблицы, созданные в боевой БД вне db_migrations: без них миграции
+-- не накатываются на пустую базу. Только колонки, которые не добавляет
+-- ни одна миграция; колонки к таблицам из миграций - в schema_after_migrations.sql.
+
+CREATE TABLE IF NOT EXISTS t_p61788166_html_to_frontend.categories (
+    id SERIAL PRIMARY KEY,
+    name VARCHAR(255) NOT NULL,
+    icon VARCHAR(50),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS t_p61788166_html_to_frontend.services (
+    id SERIAL PRIMARY KEY,
+    name VARCHAR(255) NOT NULL,
+    description TEXT,
+    intermediate_approver_id INTEGER,
+    final_approver_id INTEGER,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS t_p61788166_html_to_frontend.payment_approval_history (
+    id SERIAL PRIMARY KEY,
+    payment_id INTEGER,
+    approver_id INTEGER,
+    action VARCHAR(50),
+    comment TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS t_p61788166_html_to_frontend.ticket_comment_attachments (
+    id SERIAL PRIMARY KEY,
+    comment_id INTEGER NOT NULL,
+    file_name VARCHAR(255),
+    file_url TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
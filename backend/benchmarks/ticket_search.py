@@ -0,0 +1,148 @@
+"""
+Поиск по заявкам на большом объёме (по умолчанию 1M заявок).
+
+Досеивает заявки со словарным текстом в базу, подготовленную handlers.py --setup,
+и вызывает список заявок backend/main с search по редким, частым и неполным
+словам. Печатает JSON с p50/p95/p99 по каждому запросу; код выхода 1, если p95
+хоть одного запроса выше бюджета. То, что полнотекстовый поиск не нашёл, ищется
+ILIKE; без pg_trgm это полный скан - наличие расширения попадает в отчёт.
+
+    python backend/benchmarks/ticket_search.py [--tickets 1000000] [--budget-ms 100]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import handlers
+
+MAIN_DIR = os.path.join(handlers.BACKEND_DIR, 'main')
+SCHEMA = handlers.SCHEMA
+
+# Частота слова падает с номером: первые встречаются почти везде, последние редко
+VOCABULARY = [
+    'доступ', 'ошибка', 'сервер', 'пароль', 'почта', 'принтер', 'сеть', 'ноутбук',
+    'монитор', 'обновление', 'лицензия', 'учётная', 'запись', 'телефон', 'роутер',
+    'картридж', 'битрикс', 'бухгалтерия', 'диск', 'резервное', 'копирование', 'камера',
+    'пропуск', 'видеоконференция', 'сертификат', 'антивирус', 'клавиатура', 'сканер',
+    'проектор', 'кофемашина',
+]
+
+SEARCHES = [
+    ('rare word', 'кофемашина'),
+    ('rare word, other form', 'кофемашины'),
+    ('medium word', 'сертификат'),
+    ('two words', 'сброс пароля почта'),
+    ('partial word', 'видеоконф'),
+    ('ticket number', 'Заявка №777'),
+]
+
+SEED_SQL = f'''
+    INSERT INTO {SCHEMA}.tickets (title, description, category_id, priority_id, status_id, created_by, created_at, updated_at)
+    SELECT
+        'Заявка №' || i || ': ' || w.words[1 + floor(power(random(), 3) * w.n)::int]
+            || ' ' || w.words[1 + floor(power(random(), 3) * w.n)::int],
+        (SELECT string_agg(w.words[1 + floor(power(random(), 3) * w.n)::int + g * 0], ' ')
+         FROM generate_series(1, 12 + i * 0) g),
+        1 + i %% 4, 1 + i %% 4, 1 + i %% 8, 1, d, d
+    FROM generate_series(%(start)s, %(stop)s) i
+    CROSS JOIN LATERAL (SELECT NOW() - random() * INTERVAL '1095 days' AS d) dt
+    CROSS JOIN (SELECT %(words)s::text[] AS words, %(n)s AS n) w
+'''
+
+SEED_BATCH = 100000
+
+
+def seed_tickets(dsn: str, target: int) -> int:
+    conn = handlers.connect(dsn)
+    cur = conn.cursor()
+    cur.execute(f'SELECT COUNT(*), COALESCE(MAX(id), 0) FROM {SCHEMA}.tickets')
+    count, max_id = cur.fetchone()
+    added = 0
+    while count + added < target:
+        batch = min(SEED_BATCH, target - count - added)
+        start = max_id + added + 1
+        cur.execute(SEED_SQL, {'start': start, 'stop': start + batch - 1, 'words': VOCABULARY, 'n': len(VOCABULARY)})
+        conn.commit()
+        added += batch
+    if added:
+        cur.execute(f'ANALYZE {SCHEMA}.tickets')
+        conn.commit()
+    conn.close()
+    return count + added
+
+
+def has_trigram(dsn: str) -> bool:
+    conn = handlers.connect(dsn)
+    cur = conn.cursor()
+    cur.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+    found = cur.fetchone() is not None
+    conn.close()
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--dsn', default=os.environ.get('BENCH_DATABASE_URL'))
+    parser.add_argument('--pgdata', default=os.path.join(handlers.BENCH_DIR, '.pgdata'))
+    parser.add_argument('--tickets', type=int, default=1000000)
+    parser.add_argument('--limit', type=int, default=50)
+    parser.add_argument('--iterations', type=int, default=20)
+    parser.add_argument('--budget-ms', type=float, default=100)
+    args = parser.parse_args()
+
+    dsn = args.dsn or handlers.start_local_server(args.pgdata)
+    started = time.perf_counter()
+    total = seed_tickets(dsn, args.tickets)
+    seed_s = time.perf_counter() - started
+
+    os.environ['DATABASE_URL'] = handlers.with_search_path(dsn, SCHEMA)
+    os.environ['JWT_SECRET'] = handlers.JWT_SECRET
+    sys.path.insert(0, MAIN_DIR)
+    import index
+    import perf
+
+    token = handlers.make_token()
+    results = []
+    over_budget = False
+    for name, term in SEARCHES:
+        event = {
+            'httpMethod': 'GET',
+            'headers': {'X-Auth-Token': token},
+            'queryStringParameters': {'endpoint': 'tickets', 'search': term, 'limit': str(args.limit)},
+        }
+        samples = []
+        for i in range(args.iterations + 1):
+            t0 = time.perf_counter()
+            resp = index.handler(event, None)
+            if i:
+                samples.append((time.perf_counter() - t0) * 1000)
+        body = json.loads(resp['body'])
+        p95 = handlers.percentile(samples, 95)
+        ok = resp['statusCode'] == 200 and p95 <= args.budget_ms
+        over_budget = over_budget or not ok
+        results.append({
+            'search': name,
+            'term': term,
+            'status': resp['statusCode'],
+            'returned': len(body.get('tickets', [])),
+            'p50_ms': round(handlers.percentile(samples, 50), 2),
+            'p95_ms': round(p95, 2),
+            'p99_ms': round(handlers.percentile(samples, 99), 2),
+            'db_ms': round(perf.current().db_ms, 2),
+            'ok': ok,
+        })
+
+    print(json.dumps({
+        'tickets': total,
+        'seed_s': round(seed_s, 1),
+        'pg_trgm': has_trigram(dsn),
+        'budget_ms': args.budget_ms,
+        'results': results,
+    }, indent=2, ensure_ascii=False))
+    sys.exit(1 if over_budget else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -4,6 +4,7 @@ import sys
 import jwt
 import psycopg2
 from psycopg2.extras import RealDictCursor
+from perf import instrument, track_request
 from typing import Dict, Any, Optional
 from datetime import datetime, timedelta
 from pydantic import BaseModel, Field
@@ -33,7 +34,7 @@ def get_db_connection():
     dsn = os.environ.get('DATABASE_URL')
     if not dsn:
         raise Exception('DATABASE_URL not found')
-    return psycopg2.connect(dsn)
+    return instrument(psycopg2.connect(dsn))
 
 def verify_token_and_permission(event: Dict[str, Any], conn, required_permission: str):
     token = event.get('headers', {}).get('X-Auth-Token') or event.get('headers', {}).get('x-auth-token')
@@ -82,6 +83,7 @@ def verify_token_and_permission(event: Dict[str, Any], conn, required_permission
     
     return payload, None
 
+@track_request
 def handler(event: dict, context) -> dict:
     '''API для управления категориями платежей'''
     
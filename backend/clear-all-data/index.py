@@ -56,6 +56,7 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             'log_files',
             'log_entries',
             'log_statistics',
+            'log_histogram',
             'dashboard_layouts'
         ]
         
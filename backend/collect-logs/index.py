@@ -5,8 +5,14 @@ from typing import Dict, Any, List
 from datetime import datetime
 import psycopg2
 from psycopg2.extras import RealDictCursor
+from log_parser import LogLineParser, SYSLOG_LINE
 
 TELEMETRY_API = "https://telemetry.poehali.dev"
+# Разрешения log_histogram - те же, что считает log-analyzer при загрузке
+LOG_HISTOGRAM_RESOLUTIONS = [
+    name.strip() for name in os.environ.get('LOG_HISTOGRAM_RESOLUTIONS', 'minute,hour').split(',')
+    if name.strip() in ('minute', 'hour', 'day')
+]
 
 def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     """
@@ -124,12 +130,17 @@ def save_logs_to_db(conn, source: str, logs: List[str]) -> int:
     # Парсим и сохраняем записи
     parsed_entries = []
     stats = {}
+    parser = LogLineParser(logs)
     
     for idx, line in enumerate(logs, 1):
         if not line.strip():
             continue
         
-        entry = parse_log_line(line, idx)
+        entry = parser.parse(line, idx)
+        # Год в syslog не пишется: время таких строк collect-logs, как и раньше, не
+        # сохраняет, чтобы в log_entries и гистограмму не попадал 1900 год
+        if SYSLOG_LINE.match(line):
+            entry['timestamp'] = None
         parsed_entries.append((
             file_id,
             entry['line_number'],
@@ -154,52 +165,16 @@ def save_logs_to_db(conn, source: str, logs: List[str]) -> int:
                 (file_id, level, count)
             )
         
+        # Гистограмма для action=histogram в log-analyzer - по только что записанным строкам
+        cur.execute("""
+            INSERT INTO log_histogram (file_id, resolution, bucket_start, level, count)
+            SELECT e.file_id, r.resolution, date_trunc(r.resolution, e.timestamp), COALESCE(e.level, 'UNKNOWN'), COUNT(*)
+            FROM log_entries e
+            CROSS JOIN unnest(%s::text[]) AS r(resolution)
+            WHERE e.file_id = %s AND e.timestamp IS NOT NULL
+            GROUP BY 1, 2, 3, 4
+        """, (LOG_HISTOGRAM_RESOLUTIONS, file_id))
+        
         conn.commit()
     
     return file_id
-
-
-def parse_log_line(line: str, line_number: int) -> Dict[str, Any]:
-    """
-    Парсит строку лога и извлекает timestamp, level, message.
-    """
-    import re
-    from datetime import datetime
-    
-    patterns = [
-        r'^(\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}(?:\.\d+)?Z?)\s*\[(\w+)\]\s*(.+)$',
-        r'^(\d{4}-\d{2}-\d{2}\s+\d{2}:\d{2}:\d{2})\s+(\w+)\s+(.+)$',
-        r'^(\w+\s+\d+\s+\d{2}:\d{2}:\d{2})\s+\S+\s+(\w+):\s*(.+)$',
-    ]
-    
-    timestamp = None
-    level = None
-    message = line
-    
-    for pattern in patterns:
-        match = re.match(pattern, line)
-        if match:
-            groups = match.groups()
-            if len(groups) == 3:
-                try:
-                    ts_str = groups[0]
-                    for fmt in ['%Y-%m-%dT%H:%M:%S.%fZ', '%Y-%m-%dT%H:%M:%SZ', '%Y-%m-%d %H:%M:%S']:
-                        try:
-                            timestamp = datetime.strptime(ts_str, fmt)
-                            break
-                        except:
-                            continue
-                    
-                    level = groups[1].upper()
-                    message = groups[2]
-                    break
-                except:
-                    pass
-    
-    return {
-        'line_number': line_number,
-        'timestamp': timestamp,
-        'level': level,
-        'message': message.strip(),
-        'raw_line': line
-    }
\ No newline at end of file
@@ -0,0 +1,159 @@
+"""Разбор строк лога: timestamp, уровень, сообщение"""
+import re
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+# Форматы в порядке приоритета: строка относится к первому подошедшему
+ISO_LINE = re.compile(r'^(\d{4})-(\d{2})-(\d{2})T(\d{2}):(\d{2}):(\d{2})(\.\d+)?(Z?)\s*\[(\w+)\]\s*(.+)$')
+STANDARD_LINE = re.compile(r'^(\d{4})-(\d{2})-(\d{2})\s+(\d{2}):(\d{2}):(\d{2})\s+(\w+)\s+(.+)$')
+SYSLOG_LINE = re.compile(r'^(\w+)\s+(\d+)\s+(\d{2}):(\d{2}):(\d{2})\s+\S+\s+(\w+):\s*(.+)$')
+LEVEL_DATE_LINE = re.compile(r'^(\w+):\s*(\d{4})-(\d{2})-(\d{2})\s+(.+)$')
+LEVEL_LINE = re.compile(r'^(\w+)\s+(.+)$')
+
+KNOWN_LEVELS = frozenset(['ERROR', 'WARN', 'INFO', 'DEBUG', 'TRACE', 'FATAL'])
+MONTHS = {name: number for number, name in enumerate(
+    ['jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec'], 1)}
+
+# Сколько первых строк смотрим, чтобы определить формат файла, и какая доля
+# строк должна быть в одном формате, чтобы включить быстрый путь
+DETECT_SAMPLE_LINES = 200
+DETECT_MIN_SHARE = 0.9
+
+# (timestamp, уровень, сообщение) из совпавшей строки
+Fields = Tuple[Optional[datetime], Optional[str], str]
+
+
+def _iso(match) -> Fields:
+    year, month, day, hour, minute, second, fraction, zulu, level, message = match.groups()
+    timestamp = None
+    # Как и раньше, без Z и с дробью длиннее микросекунд время не разбирается
+    if zulu and (fraction is None or len(fraction) <= 7):
+        microsecond = int(fraction[1:].ljust(6, '0')) if fraction else 0
+        timestamp = _datetime(int(year), int(month), int(day), int(hour), int(minute), int(second), microsecond)
+    return timestamp, level.upper(), message
+
+
+def _standard(match) -> Fields:
+    year, month, day, hour, minute, second, level, message = match.groups()
+    timestamp = _datetime(int(year), int(month), int(day), int(hour), int(minute), int(second))
+    return timestamp, level.upper(), message
+
+
+def _syslog(match) -> Fields:
+    month_name, day, hour, minute, second, level, message = match.groups()
+    # Год в syslog не пишется - 1900, как у strptime('%b %d %H:%M:%S')
+    month = MONTHS.get(month_name.lower()) if len(month_name) == 3 else None
+    timestamp = None
+    if month and len(day) <= 2:
+        timestamp = _datetime(1900, month, int(day), int(hour), int(minute), int(second))
+    return timestamp, level.upper(), message
+
+
+def _level_date(match) -> Fields:
+    level, year, month, day, message = match.groups()
+    return _datetime(int(year), int(month), int(day)), level.upper(), message
+
+
+def _level(match) -> Optional[Fields]:
+    level = match.group(1).upper()
+    if level not in KNOWN_LEVELS:
+        return None
+    return None, level, match.group(2)
+
+
+def _datetime(*fields: int) -> Optional[datetime]:
+    try:
+        return datetime(*fields)
+    except ValueError:
+        return None
+
+
+# (имя, шаблон, разбор совпадения). Разбор возвращает None, если строка
+# формату всё-таки не подходит (уровень без даты, но неизвестное слово)
+LOG_FORMATS = [
+    ('iso', ISO_LINE, _iso),
+    ('standard', STANDARD_LINE, _standard),
+    ('syslog', SYSLOG_LINE, _syslog),
+    ('level_date', LEVEL_DATE_LINE, _level_date),
+    ('level', LEVEL_LINE, _level),
+]
+
+# Более приоритетные форматы, которые могут совпасть с той же строкой. Только
+# syslog пересекается с "уровень сообщение"; остальные различаются по началу строки
+OVERLAPS = {'level': ('syslog',)}
+
+
+def _build(line: str, line_number: int, fields: Optional[Fields]) -> Dict[str, Any]:
+    if fields is None:
+        return {'line_number': line_number, 'timestamp': None, 'level': None, 'message': line.strip(), 'raw_line': line}
+    timestamp, level, message = fields
+    return {'line_number': line_number, 'timestamp': timestamp, 'level': level, 'message': message.strip(), 'raw_line': line}
+
+
+def _match_any(line: str) -> Optional[Tuple[str, Fields]]:
+    """(имя формата, поля) по первому подошедшему формату или None"""
+    for name, pattern, parse in LOG_FORMATS:
+        match = pattern.match(line)
+        if match:
+            fields = parse(match)
+            if fields is not None:
+                return name, fields
+    return None
+
+
+def parse_log_line(line: str, line_number: int) -> Dict[str, Any]:
+    """
+    Парсит строку лога и извлекает timestamp, level, message.
+    Поддерживает различные форматы логов.
+    """
+    found = _match_any(line)
+    return _build(line, line_number, found[1] if found else None)
+
+
+def detect_log_format(lines: Iterable[str]) -> Optional[str]:
+    """Формат, в котором записано не меньше DETECT_MIN_SHARE первых непустых строк"""
+    counts: Counter = Counter()
+    total = 0
+    for line in lines:
+        if not line.strip():
+            continue
+        found = _match_any(line)
+        counts[found[0] if found else None] += 1
+        total += 1
+        if total == DETECT_SAMPLE_LINES:
+            break
+    if not total:
+        return None
+    name, count = counts.most_common(1)[0]
+    return name if name and count >= total * DETECT_MIN_SHARE else None
+
+
+class LogLineParser:
+    """
+    Парсер для одного файла: если по первым строкам формат определился, каждая
+    строка сначала проверяется только им, а остальные форматы пробуются лишь
+    для строк, которые в него не попали. Результат тот же, что у parse_log_line.
+    """
+
+    def __init__(self, sample_lines: Iterable[str] = ()):
+        self.format = detect_log_format(sample_lines)
+        self._match = None
+        self._parse = None
+        self._guard = None
+        if self.format:
+            formats = {name: (pattern, parse) for name, pattern, parse in LOG_FORMATS}
+            pattern, self._parse = formats[self.format]
+            self._match = pattern.match
+            guards = OVERLAPS.get(self.format)
+            if guards:
+                self._guard = re.compile('|'.join(formats[name][0].pattern for name in guards)).match
+
+    def parse(self, line: str, line_number: int) -> Dict[str, Any]:
+        if self._match is not None:
+            match = self._match(line)
+            if match is not None and (self._guard is None or self._guard(line) is None):
+                fields = self._parse(match)
+                if fields is not None:
+                    return _build(line, line_number, fields)
+        return parse_log_line(line, line_number)
@@ -1,9 +1,11 @@
 import json
 import os
 import sys
+import time
 import jwt
 import psycopg2
 from psycopg2.extras import RealDictCursor
+from perf import instrument, track_request
 from typing import Dict, Any, Optional, Union
 from pydantic import BaseModel, Field, model_validator, field_validator, ValidationError
 
@@ -109,7 +111,7 @@ def get_db_connection():
     dsn = os.environ.get('DATABASE_URL')
     if not dsn:
         raise ValueError('DATABASE_URL not set')
-    return psycopg2.connect(dsn)
+    return instrument(psycopg2.connect(dsn))
 
 def verify_token(event: Dict[str, Any]) -> Optional[Dict[str, Any]]:
     headers = event.get('headers', {})
@@ -165,6 +167,101 @@ def is_admin_user(conn, user_id: int) -> bool:
     finally:
         cur.close()
 
+# Набор справочников живёт в памяти контейнера, пока не изменилась версия в
+# dictionaries_version (её повышают триггеры на таблицах справочников)
+DICTIONARIES_VERSION_CHECK_INTERVAL = float(os.environ.get('DICTIONARIES_VERSION_CHECK_INTERVAL', '5'))
+
+BUNDLE_QUERIES = {
+    'categories': f'SELECT id, name, icon FROM {SCHEMA}.categories ORDER BY name',
+    'legal_entities': f'SELECT id, name, inn, kpp, address FROM {SCHEMA}.legal_entities ORDER BY name',
+    'contractors': f"""
+        SELECT id, name, inn, kpp, ogrn, legal_address, actual_address, 
+               phone, email, contact_person, bank_name, bank_bik, 
+               bank_account, correspondent_account, notes 
+        FROM {SCHEMA}.contractors WHERE is_active = true ORDER BY name
+    """,
+    'customer_departments': f'SELECT id, name, description FROM {SCHEMA}.customer_departments ORDER BY name',
+    'services': f"""
+        SELECT s.id, s.name, s.description, s.intermediate_approver_id, s.final_approver_id,
+               s.customer_department_id, s.category_id, s.legal_entity_id, s.contractor_id,
+               c.name as category_name, c.icon as category_icon,
+               cd.name as customer_department_name,
+               u1.username as intermediate_approver_name,
+               u2.username as final_approver_name,
+               le.name as legal_entity_name,
+               ct.name as contractor_name
+        FROM {SCHEMA}.services s
+        LEFT JOIN {SCHEMA}.categories c ON s.category_id = c.id
+        LEFT JOIN {SCHEMA}.customer_departments cd ON s.customer_department_id = cd.id
+        LEFT JOIN {SCHEMA}.users u1 ON s.intermediate_approver_id = u1.id
+        LEFT JOIN {SCHEMA}.users u2 ON s.final_approver_id = u2.id
+        LEFT JOIN {SCHEMA}.legal_entities le ON s.legal_entity_id = le.id
+        LEFT JOIN {SCHEMA}.contractors ct ON s.contractor_id = ct.id
+        ORDER BY s.name
+    """,
+    'custom_fields': f'SELECT id, name, field_type, options FROM {SCHEMA}.custom_fields ORDER BY name',
+}
+
+_dictionaries_version: Dict[str, Any] = {'value': None, 'checked_at': 0.0}
+_bundle_cache: Dict[str, Any] = {'version': None, 'data': None, 'body': None}
+
+def get_dictionaries_version(conn) -> int:
+    """Текущая версия справочников; из БД читается не чаще DICTIONARIES_VERSION_CHECK_INTERVAL"""
+    now = time.monotonic()
+    if _dictionaries_version['value'] is not None and now - _dictionaries_version['checked_at'] < DICTIONARIES_VERSION_CHECK_INTERVAL:
+        return _dictionaries_version['value']
+    
+    cur = conn.cursor()
+    cur.execute(f"SELECT version FROM {SCHEMA}.dictionaries_version WHERE id = 1")
+    row = cur.fetchone()
+    cur.close()
+    
+    _dictionaries_version['value'] = row[0] if row else 0
+    _dictionaries_version['checked_at'] = now
+    return _dictionaries_version['value']
+
+def get_bundle(conn) -> Dict[str, Any]:
+    """Все справочники одной версии: {'version', 'data', 'body'}, body - готовый JSON ответа"""
+    version = get_dictionaries_version(conn)
+    if _bundle_cache['version'] == version:
+        return _bundle_cache
+    
+    cur = conn.cursor(cursor_factory=RealDictCursor)
+    data = {}
+    for key, query in BUNDLE_QUERIES.items():
+        cur.execute(query)
+        data[key] = [dict(row) for row in cur.fetchall()]
+    cur.close()
+    
+    _bundle_cache.update(
+        version=version,
+        data=data,
+        body=json.dumps({'version': version, **data}, ensure_ascii=False, default=str)
+    )
+    return _bundle_cache
+
+def bundle_response(event: Dict[str, Any], conn) -> Dict[str, Any]:
+    """Набор справочников с ETag по версии; на совпавший If-None-Match - 304 без чтения таблиц"""
+    version = get_dictionaries_version(conn)
+    etag = f'"dictionaries-{version}"'
+    headers = {
+        'Content-Type': 'application/json',
+        'Access-Control-Allow-Origin': '*',
+        'Access-Control-Expose-Headers': 'ETag',
+        'ETag': etag,
+        'Cache-Control': 'no-cache'
+    }
+    
+    request_headers = {k.lower(): v for k, v in (event.get('headers') or {}).items()}
+    if_none_match = request_headers.get('if-none-match') or ''
+    if etag in [tag.strip().replace('W/', '', 1) for tag in if_none_match.split(',')]:
+        return {'statusCode': 304, 'headers': headers, 'body': '', 'isBase64Encoded': False}
+    
+    bundle = get_bundle(conn)
+    headers['ETag'] = f'"dictionaries-{bundle["version"]}"'
+    return {'statusCode': 200, 'headers': headers, 'body': bundle['body'], 'isBase64Encoded': False}
+
+@track_request
 def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     '''
     API для управления справочниками: категории, юрлица, контрагенты, подразделения, сервисы, кастомные поля.
@@ -200,6 +297,25 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         is_admin = is_admin_user(conn, user_id)
         cur = conn.cursor(cursor_factory=RealDictCursor)
         
+        # Триггеры повысят версию справочников; следующее чтение в этом контейнере её перечитает
+        if method in ('POST', 'PUT', 'DELETE'):
+            _dictionaries_version['checked_at'] = 0.0
+        
+        # Все справочники одним запросом, с ETag по версии
+        if endpoint == 'bundle':
+            if method != 'GET':
+                conn.close()
+                return response(405, {'error': 'Method not allowed'})
+            
+            if not is_admin and not check_user_permission(conn, user_id, 'payments.read'):
+                conn.close()
+                return response(403, {'error': 'Forbidden'})
+            
+            result = bundle_response(event, conn)
+            cur.close()
+            conn.close()
+            return result
+        
         # Categories
         if endpoint == 'categories':
             if method == 'GET':
@@ -207,8 +323,7 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                     conn.close()
                     return response(403, {'error': 'Forbidden'})
                 
-                cur.execute(f'SELECT id, name, icon FROM {SCHEMA}.categories ORDER BY name')
-                categories = [dict(row) for row in cur.fetchall()]
+                categories = get_bundle(conn)['data']['categories']
                 
                 cur.close()
                 conn.close()
@@ -287,8 +402,7 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                     conn.close()
                     return response(403, {'error': 'Forbidden'})
                 
-                cur.execute(f'SELECT id, name, inn, kpp, address FROM {SCHEMA}.legal_entities ORDER BY name')
-                entities = [dict(row) for row in cur.fetchall()]
+                entities = get_bundle(conn)['data']['legal_entities']
                 
                 cur.close()
                 conn.close()
@@ -367,13 +481,7 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                     conn.close()
                     return response(403, {'error': 'Forbidden'})
                 
-                cur.execute(f"""
-                    SELECT id, name, inn, kpp, ogrn, legal_address, actual_address, 
-                           phone, email, contact_person, bank_name, bank_bik, 
-                           bank_account, correspondent_account, notes 
-                    FROM {SCHEMA}.contractors WHERE is_active = true ORDER BY name
-                """)
-                contractors = [dict(row) for row in cur.fetchall()]
+                contractors = get_bundle(conn)['data']['contractors']
                 
                 cur.close()
                 conn.close()
@@ -467,8 +575,7 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                     conn.close()
                     return response(403, {'error': 'Forbidden'})
                 
-                cur.execute(f'SELECT id, name, description FROM {SCHEMA}.customer_departments ORDER BY name')
-                departments = [dict(row) for row in cur.fetchall()]
+                departments = get_bundle(conn)['data']['customer_departments']
                 
                 cur.close()
                 conn.close()
@@ -547,25 +654,7 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                     conn.close()
                     return response(403, {'error': 'Forbidden'})
                 
-                cur.execute(f"""
-                    SELECT s.id, s.name, s.description, s.intermediate_approver_id, s.final_approver_id,
-                           s.customer_department_id, s.category_id, s.legal_entity_id, s.contractor_id,
-                           c.name as category_name, c.icon as category_icon,
-                           cd.name as customer_department_name,
-                           u1.username as intermediate_approver_name,
-                           u2.username as final_approver_name,
-                           le.name as legal_entity_name,
-                           ct.name as contractor_name
-                    FROM {SCHEMA}.services s
-                    LEFT JOIN {SCHEMA}.categories c ON s.category_id = c.id
-                    LEFT JOIN {SCHEMA}.customer_departments cd ON s.customer_department_id = cd.id
-                    LEFT JOIN {SCHEMA}.users u1 ON s.intermediate_approver_id = u1.id
-                    LEFT JOIN {SCHEMA}.users u2 ON s.final_approver_id = u2.id
-                    LEFT JOIN {SCHEMA}.legal_entities le ON s.legal_entity_id = le.id
-                    LEFT JOIN {SCHEMA}.contractors ct ON s.contractor_id = ct.id
-                    ORDER BY s.name
-                """)
-                services = [dict(row) for row in cur.fetchall()]
+                services = get_bundle(conn)['data']['services']
                 
                 cur.close()
                 conn.close()
@@ -685,8 +774,7 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                     conn.close()
                     return response(403, {'error': 'Forbidden'})
                 
-                cur.execute(f'SELECT id, name, field_type, options FROM {SCHEMA}.custom_fields ORDER BY name')
-                fields = [dict(row) for row in cur.fetchall()]
+                fields = get_bundle(conn)['data']['custom_fields']
                 
                 cur.close()
                 conn.close()
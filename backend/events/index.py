@@ -8,12 +8,16 @@ Returns: HTTP response dict с данными мероприятий/стенд
 import json
 import os
 from typing import Dict, Any
-import psycopg2
 from psycopg2.extras import RealDictCursor
+from db_pool import get_connection
+from http_encoding import negotiate_encoding
+from perf import instrument, track_request
 
 def get_db_connection():
-    return psycopg2.connect(os.environ['DATABASE_URL'])
+    return instrument(get_connection(os.environ['DATABASE_URL']))
 
+@track_request
+@negotiate_encoding
 def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     method: str = event.get('httpMethod', 'GET')
     
@@ -1,11 +1,12 @@
 import json
 import os
 import base64
+import time
 import boto3
 import requests
-import psycopg2
 from psycopg2.extras import RealDictCursor
 from datetime import datetime
+from db_pool import get_connection
 
 SCHEMA = os.environ.get('MAIN_DB_SCHEMA', 't_p61788166_html_to_frontend')
 HEADERS = {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'}
@@ -196,26 +197,46 @@ def resolve_folder_id(api_key: str) -> str:
     return ''
 
 
+# Справочники для промпта живут в памяти контейнера, пока не изменилась версия
+# в dictionaries_version; версия перечитывается не чаще раза в интервал
+DICTIONARIES_VERSION_CHECK_INTERVAL = float(os.environ.get('DICTIONARIES_VERSION_CHECK_INTERVAL', '5'))
+_reference_cache = {'version': None, 'checked_at': 0.0, 'data': None}
+
+
 def load_reference_data() -> dict:
-    conn = psycopg2.connect(os.environ['DATABASE_URL'])
+    now = time.monotonic()
+    if _reference_cache['data'] is not None and now - _reference_cache['checked_at'] < DICTIONARIES_VERSION_CHECK_INTERVAL:
+        return _reference_cache['data']
+
+    # Соединение из пула контейнера: проверка версии не открывает новое
+    conn = get_connection(os.environ['DATABASE_URL'])
     cur = conn.cursor(cursor_factory=RealDictCursor)
 
-    ref = {}
-    queries = {
-        'categories': f'SELECT id, name FROM {SCHEMA}.categories ORDER BY name',
-        'services': f'SELECT id, name, category_id FROM {SCHEMA}.services ORDER BY name',
-        'departments': f'SELECT id, name FROM {SCHEMA}.customer_departments ORDER BY name',
-        'legal_entities': f'SELECT id, name, inn, kpp FROM {SCHEMA}.legal_entities ORDER BY name',
-        'contractors': f'SELECT id, name, inn, kpp FROM {SCHEMA}.contractors ORDER BY name',
-    }
+    cur.execute(f'SELECT version FROM {SCHEMA}.dictionaries_version WHERE id = 1')
+    row = cur.fetchone()
+    version = row['version'] if row else 0
+
+    if _reference_cache['data'] is None or _reference_cache['version'] != version:
+        ref = {}
+        queries = {
+            'categories': f'SELECT id, name FROM {SCHEMA}.categories ORDER BY name',
+            'services': f'SELECT id, name, category_id FROM {SCHEMA}.services ORDER BY name',
+            'departments': f'SELECT id, name FROM {SCHEMA}.customer_departments ORDER BY name',
+            'legal_entities': f'SELECT id, name, inn, kpp FROM {SCHEMA}.legal_entities ORDER BY name',
+            'contractors': f'SELECT id, name, inn, kpp FROM {SCHEMA}.contractors ORDER BY name',
+        }
+
+        for key, query in queries.items():
+            cur.execute(query)
+            ref[key] = [dict(row) for row in cur.fetchall()]
 
-    for key, query in queries.items():
-        cur.execute(query)
-        ref[key] = [dict(row) for row in cur.fetchall()]
+        _reference_cache['version'] = version
+        _reference_cache['data'] = ref
 
+    _reference_cache['checked_at'] = now
     cur.close()
     conn.close()
-    return ref
+    return _reference_cache['data']
 
 
 def call_yandex_gpt(api_key: str, folder_id: str, prompt: str, image_base64: str) -> dict | None:
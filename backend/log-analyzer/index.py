@@ -1,12 +1,49 @@
 import json
 import os
-import re
+import io
 import base64
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain, islice
 from datetime import datetime
-from typing import Dict, Any, List, Optional
-import psycopg2
+from typing import Callable, Dict, Any, Iterator, List, Tuple
 from psycopg2.extras import RealDictCursor
+from db_pool import get_connection
+from http_encoding import negotiate_encoding
+from perf import instrument, track_request
+from log_parser import DETECT_SAMPLE_LINES, LogLineParser
 
+# Файл режется по границам строк на куски примерно такого размера; каждый кусок
+# уходит в базу одним COPY, после него обновляется прогресс
+LOG_CHUNK_BYTES = 1024 * 1024
+# Файлы от этого размера разбираются в пуле процессов, меньшие - в этом же
+LOG_PARALLEL_MIN_BYTES = int(os.environ.get('LOG_PARALLEL_MIN_BYTES', str(8 * 1024 * 1024)))
+LOG_PARSE_WORKERS = int(os.environ.get('LOG_PARSE_WORKERS') or os.cpu_count() or 1)
+# Дальше этого записи по фильтру не считаются: в ответе total_capped
+LOG_ENTRIES_COUNT_CAP = 10000
+
+# Начало интервала гистограммы по timestamp записи, от мелких к крупным; имена
+# совпадают с date_trunc
+HISTOGRAM_TRUNCATE: Dict[str, Callable[[datetime], datetime]] = {
+    'minute': lambda ts: datetime(ts.year, ts.month, ts.day, ts.hour, ts.minute),
+    'hour': lambda ts: datetime(ts.year, ts.month, ts.day, ts.hour),
+    'day': lambda ts: datetime(ts.year, ts.month, ts.day),
+}
+# Разрешения, которые считаются при загрузке в log_histogram
+LOG_HISTOGRAM_RESOLUTIONS = [
+    name.strip() for name in os.environ.get('LOG_HISTOGRAM_RESOLUTIONS', 'minute,hour').split(',')
+    if name.strip() in HISTOGRAM_TRUNCATE
+]
+# Больше интервалов за один запрос не отдаём: дальше - по next_from
+LOG_HISTOGRAM_MAX_BUCKETS = 1500
+
+# (разрешение, начало интервала, уровень) -> число записей
+Histogram = Dict[Tuple[str, datetime, str], int]
+# Разобранный кусок: (текст для COPY, число записей, число строк, статистика, гистограмма)
+ParsedChunk = Tuple[str, int, int, Dict[str, int], Histogram]
+
+@track_request
+@negotiate_encoding
 def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     """
     Анализатор логов: загружает файлы логов, парсит их и сохраняет в базу данных.
@@ -28,7 +65,7 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         }
     
     # Подключение к БД
-    conn = psycopg2.connect(os.environ['DATABASE_URL'])
+    conn = instrument(get_connection(os.environ['DATABASE_URL']))
     
     try:
         if method == 'POST':
@@ -42,69 +79,45 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                     'body': json.dumps({'error': 'file_content и filename обязательны'})
                 }
             
-            # Декодируем base64 контент
-            file_content = base64.b64decode(body_data['file_content']).decode('utf-8')
+            # Декодируем base64 контент: дальше строки читаются из этого буфера по одной
+            file_data = base64.b64decode(body_data['file_content'])
             filename = body_data['filename']
             
             # Создаём запись о файле
             with conn.cursor(cursor_factory=RealDictCursor) as cur:
                 cur.execute(
                     "INSERT INTO log_files (filename, file_size, total_lines, status) VALUES (%s, %s, %s, %s) RETURNING id",
-                    (filename, len(file_content), file_content.count('\n'), 'processing')
+                    (filename, len(file_data), count_log_lines(file_data), 'processing')
                 )
                 file_id = cur.fetchone()['id']
                 conn.commit()
             
-            # Парсим логи
-            lines = file_content.split('\n')
-            parsed_entries = []
-            stats = {}
-            
-            for idx, line in enumerate(lines, 1):
-                if not line.strip():
-                    continue
-                
-                entry = parse_log_line(line, idx)
-                parsed_entries.append((
-                    file_id,
-                    entry['line_number'],
-                    entry['timestamp'],
-                    entry['level'],
-                    entry['message'],
-                    entry['raw_line']
-                ))
-                
-                # Статистика
-                level = entry['level'] or 'UNKNOWN'
-                stats[level] = stats.get(level, 0) + 1
-            
-            # Сохраняем записи логов
-            with conn.cursor() as cur:
-                cur.executemany(
-                    "INSERT INTO log_entries (file_id, line_number, timestamp, level, message, raw_line) VALUES (%s, %s, %s, %s, %s, %s)",
-                    parsed_entries
-                )
-                
-                # Сохраняем статистику
-                for level, count in stats.items():
+            try:
+                total_lines, stats = ingest_log_entries(conn, file_id, file_data)
+            except Exception as e:
+                # Куски до ошибки уже закоммичены: убираем их, чтобы у failed-файла
+                # не оставалось записей без статистики
+                conn.rollback()
+                with conn.cursor() as cur:
+                    cur.execute("DELETE FROM log_entries WHERE file_id = %s", (file_id,))
+                    cur.execute("DELETE FROM log_histogram WHERE file_id = %s", (file_id,))
                     cur.execute(
-                        "INSERT INTO log_statistics (file_id, level, count) VALUES (%s, %s, %s)",
-                        (file_id, level, count)
+                        "UPDATE log_files SET status = %s, processed_lines = 0 WHERE id = %s",
+                        ('failed', file_id)
                     )
-                
-                # Обновляем статус файла
-                cur.execute(
-                    "UPDATE log_files SET status = %s WHERE id = %s",
-                    ('completed', file_id)
-                )
-                conn.commit()
+                    conn.commit()
+                return {
+                    'statusCode': 500,
+                    'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                    'body': json.dumps({'error': str(e), 'file_id': file_id})
+                }
             
             return {
                 'statusCode': 200,
                 'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
                 'body': json.dumps({
                     'file_id': file_id,
-                    'total_lines': len(parsed_entries),
+                    'total_lines': total_lines,
                     'statistics': stats
                 })
             }
@@ -135,42 +148,48 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                 }
             
             elif action == 'entries':
-                # Получить записи из конкретного файла
+                # Получить записи из конкретного файла. Страницы - по курсору
+                # after (line_number последней показанной записи); offset
+                # оставлен для старых клиентов
                 file_id = params.get('file_id')
                 level_filter = params.get('level')
                 search = params.get('search')
                 limit = int(params.get('limit', 100))
                 offset = int(params.get('offset', 0))
+                after = params.get('after')
                 
-                query = "SELECT * FROM log_entries WHERE file_id = %s"
-                query_params = [file_id]
+                where = "file_id = %s"
+                where_params = [file_id]
                 
                 if level_filter:
-                    query += " AND level = %s"
-                    query_params.append(level_filter)
+                    where += " AND level = %s"
+                    where_params.append(level_filter)
                 
                 if search:
-                    query += " AND message ILIKE %s"
-                    query_params.append(f'%{search}%')
+                    escaped = search.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+                    where += " AND message ILIKE %s"
+                    where_params.append(f'%{escaped}%')
                 
-                query += " ORDER BY line_number LIMIT %s OFFSET %s"
-                query_params.extend([limit, offset])
+                query = f"SELECT * FROM log_entries WHERE {where}"
+                query_params = list(where_params)
+                if after:
+                    query += " AND line_number > %s ORDER BY line_number LIMIT %s"
+                    query_params.extend([int(after), limit + 1])
+                else:
+                    query += " ORDER BY line_number LIMIT %s OFFSET %s"
+                    query_params.extend([limit + 1, offset])
                 
                 with conn.cursor(cursor_factory=RealDictCursor) as cur:
                     cur.execute(query, query_params)
                     entries = cur.fetchall()
+                    has_more = len(entries) > limit
+                    entries = entries[:limit]
                     
-                    # Получаем общее количество
-                    count_query = f"SELECT COUNT(*) as total FROM log_entries WHERE file_id = %s"
-                    count_params = [file_id]
-                    if level_filter:
-                        count_query += " AND level = %s"
-                        count_params.append(level_filter)
-                    if search:
-                        count_query += " AND message ILIKE %s"
-                        count_params.append(f'%{search}%')
-                    
-                    cur.execute(count_query, count_params)
+                    # Точное число не нужно: считаем не дальше LOG_ENTRIES_COUNT_CAP
+                    cur.execute(
+                        f"SELECT COUNT(*) as total FROM (SELECT 1 FROM log_entries WHERE {where} LIMIT %s) capped",
+                        where_params + [LOG_ENTRIES_COUNT_CAP + 1]
+                    )
                     total = cur.fetchone()['total']
                 
                 return {
@@ -178,12 +197,77 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                     'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
                     'body': json.dumps({
                         'entries': [dict(e) for e in entries],
-                        'total': total,
+                        'total': min(total, LOG_ENTRIES_COUNT_CAP),
+                        'total_capped': total > LOG_ENTRIES_COUNT_CAP,
+                        'has_more': has_more,
+                        'next_cursor': entries[-1]['line_number'] if has_more else None,
                         'limit': limit,
                         'offset': offset
                     }, default=str)
                 }
             
+            elif action == 'histogram':
+                # Записи по интервалам времени и уровням из log_histogram.
+                # from/to - границы по началу интервала, to не включается
+                file_id = params.get('file_id')
+                resolution = params.get('resolution') or (LOG_HISTOGRAM_RESOLUTIONS or ['hour'])[-1]
+                level_filter = params.get('level')
+                
+                if resolution not in LOG_HISTOGRAM_RESOLUTIONS:
+                    return {
+                        'statusCode': 400,
+                        'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                        'body': json.dumps({'error': f"resolution: одно из {', '.join(LOG_HISTOGRAM_RESOLUTIONS)}"})
+                    }
+                
+                where = "file_id = %s AND resolution = %s"
+                where_params = [file_id, resolution]
+                if level_filter:
+                    where += " AND level = %s"
+                    where_params.append(level_filter)
+                if params.get('from'):
+                    where += " AND bucket_start >= %s"
+                    where_params.append(params['from'])
+                if params.get('to'):
+                    where += " AND bucket_start < %s"
+                    where_params.append(params['to'])
+                
+                with conn.cursor(cursor_factory=RealDictCursor) as cur:
+                    # Первый интервал за пределом страницы, если он есть
+                    cur.execute(
+                        f"SELECT DISTINCT bucket_start FROM log_histogram WHERE {where} ORDER BY bucket_start OFFSET %s LIMIT 1",
+                        where_params + [LOG_HISTOGRAM_MAX_BUCKETS]
+                    )
+                    row = cur.fetchone()
+                    next_from = row['bucket_start'] if row else None
+                    if next_from is not None:
+                        where += " AND bucket_start < %s"
+                        where_params.append(next_from)
+                    
+                    cur.execute(
+                        f"SELECT bucket_start, level, count FROM log_histogram WHERE {where} ORDER BY bucket_start, level",
+                        where_params
+                    )
+                    rows = cur.fetchall()
+                
+                buckets: List[Dict[str, Any]] = []
+                for row in rows:
+                    if not buckets or buckets[-1]['bucket_start'] != row['bucket_start']:
+                        buckets.append({'bucket_start': row['bucket_start'], 'total': 0, 'levels': {}})
+                    buckets[-1]['levels'][row['level']] = row['count']
+                    buckets[-1]['total'] += row['count']
+                
+                return {
+                    'statusCode': 200,
+                    'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                    'body': json.dumps({
+                        'resolution': resolution,
+                        'buckets': buckets,
+                        'has_more': next_from is not None,
+                        'next_from': next_from
+                    }, default=str)
+                }
+            
             elif action == 'stats':
                 # Статистика по файлу
                 file_id = params.get('file_id')
@@ -211,70 +295,195 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         conn.close()
 
 
-def parse_log_line(line: str, line_number: int) -> Dict[str, Any]:
+
+def ingest_log_entries(conn, file_id: int, file_data: bytes) -> Tuple[int, Dict[str, int]]:
     """
-    Парсит строку лога и извлекает timestamp, level, message.
-    Поддерживает различные форматы логов.
+    Разбирает файл кусками и пишет каждый кусок через COPY в порядке строк.
+    После каждого куска коммитит и обновляет log_files.processed_lines - число
+    прочитанных строк, включая пустые, как и total_lines, - так что прогресс
+    виден из списка файлов. Статистика по уровням и гистограмма пишутся в конце.
+    Возвращает число записей и статистику по уровням.
     """
-    # Паттерны для парсинга
-    patterns = [
-        # ISO timestamp with level: 2024-01-15T10:30:45.123Z [ERROR] Message
-        r'^(\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}(?:\.\d+)?Z?)\s*\[(\w+)\]\s*(.+)$',
-        # Standard format: 2024-01-15 10:30:45 ERROR Message
-        r'^(\d{4}-\d{2}-\d{2}\s+\d{2}:\d{2}:\d{2})\s+(\w+)\s+(.+)$',
-        # Syslog format: Jan 15 10:30:45 hostname ERROR: Message
-        r'^(\w+\s+\d+\s+\d{2}:\d{2}:\d{2})\s+\S+\s+(\w+):\s*(.+)$',
-        # Level first: ERROR: 2024-01-15 Message
-        r'^(\w+):\s*(\d{4}-\d{2}-\d{2})\s+(.+)$',
-        # Just level: ERROR Message
-        r'^(\w+)\s+(.+)$'
-    ]
+    stats: Dict[str, int] = {}
+    histogram: Histogram = {}
+    entries = 0
+    processed_lines = 0
     
-    timestamp = None
-    level = None
-    message = line
+    with conn.cursor() as cur:
+        for copy_text, count, lines, chunk_stats, chunk_histogram in iter_parsed_chunks(file_id, file_data, LOG_PARSE_WORKERS):
+            entries += count
+            processed_lines += lines
+            copy_log_chunk(cur, file_id, copy_text, processed_lines)
+            conn.commit()
+            for level, level_count in chunk_stats.items():
+                stats[level] = stats.get(level, 0) + level_count
+            # Соседние куски могут делить интервал на границе
+            for key, bucket_count in chunk_histogram.items():
+                histogram[key] = histogram.get(key, 0) + bucket_count
+        
+        # Сохраняем статистику
+        for level, count in stats.items():
+            cur.execute(
+                "INSERT INTO log_statistics (file_id, level, count) VALUES (%s, %s, %s)",
+                (file_id, level, count)
+            )
+        
+        copy_log_histogram(cur, file_id, histogram)
+        
+        # Обновляем статус файла
+        cur.execute(
+            "UPDATE log_files SET status = %s WHERE id = %s",
+            ('completed', file_id)
+        )
+        conn.commit()
     
-    for pattern in patterns:
-        match = re.match(pattern, line)
-        if match:
-            groups = match.groups()
-            if len(groups) == 3:
-                try:
-                    timestamp = parse_timestamp(groups[0])
-                    level = groups[1].upper()
-                    message = groups[2]
-                except:
-                    pass
-            elif len(groups) == 2:
-                level = groups[0].upper() if groups[0].upper() in ['ERROR', 'WARN', 'INFO', 'DEBUG', 'TRACE', 'FATAL'] else None
-                message = groups[1] if level else line
-            
-            if level or timestamp:
-                break
+    return entries, stats
+
+
+def iter_parsed_chunks(file_id: int, file_data: bytes, workers: int) -> Iterator[ParsedChunk]:
+    """
+    Разобранные куски файла по порядку строк. Большие файлы разбираются в
+    ProcessPoolExecutor: в работе не больше двух кусков на процесс, результаты
+    отдаются в порядке отправки. Если пул не поднимается (нет семафоров в
+    окружении), разбор идёт в этом процессе.
+    """
+    chunks = split_log_data(file_data, LOG_CHUNK_BYTES)
+    if workers < 2 or len(file_data) < LOG_PARALLEL_MIN_BYTES:
+        for first_line, data in chunks:
+            yield parse_log_chunk(file_id, first_line, data)
+        return
+    
+    try:
+        executor = ProcessPoolExecutor(max_workers=workers)
+    except (OSError, NotImplementedError) as e:
+        print(f"Process pool unavailable, parsing in-process: {e}")
+        for first_line, data in chunks:
+            yield parse_log_chunk(file_id, first_line, data)
+        return
     
-    return {
-        'line_number': line_number,
-        'timestamp': timestamp,
-        'level': level,
-        'message': message.strip(),
-        'raw_line': line
-    }
+    with executor:
+        pending = deque()
+        for first_line, data in chunks:
+            pending.append(executor.submit(parse_log_chunk, file_id, first_line, data))
+            if len(pending) >= workers * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
 
+def split_log_data(file_data: bytes, chunk_bytes: int) -> Iterator[Tuple[int, bytes]]:
+    """(номер первой строки, байты) - куски из целых строк"""
+    size = len(file_data)
+    start = 0
+    first_line = 1
+    while start < size:
+        end = start + chunk_bytes
+        if end >= size:
+            end = size
+        else:
+            newline = file_data.find(b'\n', end)
+            end = size if newline == -1 else newline + 1
+        data = file_data[start:end]
+        yield first_line, data
+        first_line += data.count(b'\n')
+        start = end
 
-def parse_timestamp(ts_str: str) -> Optional[datetime]:
-    """Пытается распарсить различные форматы timestamp"""
-    formats = [
-        '%Y-%m-%dT%H:%M:%S.%fZ',
-        '%Y-%m-%dT%H:%M:%SZ',
-        '%Y-%m-%d %H:%M:%S',
-        '%Y-%m-%d',
-        '%b %d %H:%M:%S'
-    ]
+
+def parse_log_chunk(file_id: int, first_line: int, data: bytes) -> ParsedChunk:
+    """
+    Кусок из целых строк -> (текст для COPY, число записей, число строк, статистика, гистограмма).
+    Выполняется и в процессах пула, поэтому формат определяется по самому куску.
+    """
+    lines = iter_log_lines(data, first_line)
+    sample = list(islice(lines, DETECT_SAMPLE_LINES))
+    parser = LogLineParser(line for _, line in sample)
+    out = io.StringIO()
+    count = 0
+    stats: Dict[str, int] = {}
+    # По строкам считается только самое мелкое разрешение, крупные - из него
+    resolutions = [name for name in HISTOGRAM_TRUNCATE if name in LOG_HISTOGRAM_RESOLUTIONS]
+    truncate = HISTOGRAM_TRUNCATE[resolutions[0]] if resolutions else None
+    buckets: Dict[Tuple[datetime, str], int] = {}
     
-    for fmt in formats:
-        try:
-            return datetime.strptime(ts_str, fmt)
-        except:
+    for line_number, line in chain(sample, lines):
+        if not line.strip():
             continue
+        
+        entry = parser.parse(line, line_number)
+        out.write(copy_row((
+            file_id,
+            entry['line_number'],
+            entry['timestamp'],
+            entry['level'],
+            entry['message'],
+            entry['raw_line']
+        )))
+        count += 1
+        
+        # Статистика
+        level = entry['level'] or 'UNKNOWN'
+        stats[level] = stats.get(level, 0) + 1
+        
+        timestamp = entry['timestamp']
+        if timestamp is not None and truncate is not None:
+            key = (truncate(timestamp), level)
+            buckets[key] = buckets.get(key, 0) + 1
+    
+    histogram: Histogram = {}
+    for name in resolutions:
+        coarser = HISTOGRAM_TRUNCATE[name]
+        for (bucket_start, level), bucket_count in buckets.items():
+            key = (name, coarser(bucket_start), level)
+            histogram[key] = histogram.get(key, 0) + bucket_count
     
-    return None
\ No newline at end of file
+    return out.getvalue(), count, count_log_lines(data), stats, histogram
+
+
+def count_log_lines(data: bytes) -> int:
+    """Число строк так, как их читает iter_log_lines: последняя может быть без \\n"""
+    return data.count(b'\n') + (1 if data and not data.endswith(b'\n') else 0)
+
+
+def iter_log_lines(file_data: bytes, first_line: int = 1) -> Iterator[Tuple[int, str]]:
+    """(номер, строка) без перевода строки; текст декодируется по ходу чтения"""
+    stream = io.TextIOWrapper(io.BytesIO(file_data), encoding='utf-8', newline='\n')
+    for line_number, line in enumerate(stream, first_line):
+        yield line_number, line[:-1] if line.endswith('\n') else line
+
+
+def copy_row(values: Tuple[Any, ...]) -> str:
+    """Строка в текстовом формате COPY: табуляция между полями, \\N для NULL"""
+    fields = []
+    for value in values:
+        if value is None:
+            fields.append('\\N')
+        else:
+            fields.append(str(value).replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n').replace('\r', '\\r'))
+    return '\t'.join(fields) + '\n'
+
+
+def copy_log_chunk(cur, file_id: int, copy_text: str, processed: int):
+    """Отправляет разобранный кусок одним COPY и отмечает прогресс"""
+    if copy_text:
+        cur.copy_expert(
+            "COPY log_entries (file_id, line_number, timestamp, level, message, raw_line) FROM STDIN",
+            io.StringIO(copy_text)
+        )
+    cur.execute(
+        "UPDATE log_files SET processed_lines = %s WHERE id = %s",
+        (processed, file_id)
+    )
+
+
+def copy_log_histogram(cur, file_id: int, histogram: Histogram):
+    """Гистограмма файла в log_histogram одним COPY"""
+    if not histogram:
+        return
+    out = io.StringIO()
+    for (resolution, bucket_start, level), count in histogram.items():
+        out.write(copy_row((file_id, resolution, bucket_start, level, count)))
+    out.seek(0)
+    cur.copy_expert(
+        "COPY log_histogram (file_id, resolution, bucket_start, level, count) FROM STDIN",
+        out
+    )
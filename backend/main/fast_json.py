@@ -0,0 +1,32 @@
+"""
+Сериализация ответов строками курсора как есть. Быстрее прежней пересборки
+строк только с orjson (он в requirements.txt); без него stdlib json даёт тот же
+результат примерно за то же время, что и пересборка.
+"""
+import json
+from datetime import date, datetime, time
+from decimal import Decimal
+from typing import Any
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _default(obj: Any) -> Any:
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, (datetime, date, time)):
+        return obj.isoformat()
+    return str(obj)
+
+
+def dumps(data: Any) -> str:
+    """
+    JSON-строка для тела ответа. Строки курсора RealDictCursor можно отдавать
+    без пересборки: datetime/date - в ISO 8601 (как .isoformat()), Decimal - числом.
+    """
+    if orjson is not None:
+        return orjson.dumps(data, default=_default, option=orjson.OPT_NON_STR_KEYS).decode('utf-8')
+    return json.dumps(data, ensure_ascii=False, default=_default)
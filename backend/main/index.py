@@ -1,112 +1,31 @@
 import json
 import os
+import base64
 import sys
+import time
 import jwt 
-import bcrypt
 import psycopg2
-from psycopg2.extras import RealDictCursor
-from typing import Dict, Any, Optional
+from psycopg2.extras import RealDictCursor, execute_values
+from typing import Callable, Dict, Any, Optional, List, Tuple
 from datetime import datetime, timedelta
-from zoneinfo import ZoneInfo
-from pydantic import BaseModel, Field
+from db_pool import get_connection
+from http_encoding import negotiate_encoding
+from perf import instrument, track_request
+import fast_json
 # Deploy version: v2.5.2 - fixed approvers endpoint handlers
 
 SCHEMA = 't_p61788166_html_to_frontend'
 VERSION = '2.5.2'
 
+# Кэш авторизации: пользователь с ролями и правами живёт AUTH_CACHE_TTL секунд
+# и сбрасывается, как только меняется версия прав в permissions_version
+AUTH_CACHE_TTL = float(os.environ.get('AUTH_CACHE_TTL', '60'))
+AUTH_VERSION_CHECK_INTERVAL = float(os.environ.get('AUTH_VERSION_CHECK_INTERVAL', '5'))
+AUTH_CACHE_MAX_ENTRIES = 1000
+
 def log(msg):
     print(msg, file=sys.stderr, flush=True)
 
-# Pydantic models for validation
-class PaymentRequest(BaseModel):
-    category_id: int = Field(..., gt=0)
-    amount: float = Field(..., gt=0)
-    description: str = Field(default='')
-    payment_date: str = Field(default='')
-    legal_entity_id: Optional[int] = None
-    contractor_id: Optional[int] = None
-    department_id: Optional[int] = None
-    service_id: Optional[int] = None
-    invoice_number: Optional[str] = None
-    invoice_date: Optional[str] = None
-    is_planned: Optional[bool] = False
-
-class CategoryRequest(BaseModel):
-    name: str = Field(..., min_length=1)
-    icon: str = Field(default='Tag')
-
-class LegalEntityRequest(BaseModel):
-    name: str = Field(..., min_length=1)
-    inn: str = Field(default='')
-    kpp: str = Field(default='')
-    address: str = Field(default='')
-
-class CustomFieldRequest(BaseModel):
-    name: str = Field(..., min_length=1)
-    field_type: str = Field(..., pattern='^(text|select|file|toggle)$')
-    options: str = Field(default='')
-
-class ContractorRequest(BaseModel):
-    name: str = Field(..., min_length=1)
-    inn: str = Field(default='')
-    kpp: str = Field(default='')
-    ogrn: str = Field(default='')
-    legal_address: str = Field(default='')
-    actual_address: str = Field(default='')
-    phone: str = Field(default='')
-    email: str = Field(default='')
-    contact_person: str = Field(default='')
-    bank_name: str = Field(default='')
-    bank_bik: str = Field(default='')
-    bank_account: str = Field(default='')
-    correspondent_account: str = Field(default='')
-    notes: str = Field(default='')
-
-class CustomerDepartmentRequest(BaseModel):
-    name: str = Field(..., min_length=1)
-    description: Optional[str] = Field(default='')
-
-    def model_post_init(self, __context):
-        if self.description is None:
-            self.description = ''
-
-class RoleRequest(BaseModel):
-    name: str = Field(..., min_length=1)
-    description: str = Field(default='')
-    permission_ids: list[int] = Field(default=[])
-
-class PermissionRequest(BaseModel):
-    name: str = Field(..., min_length=1)
-    resource: str = Field(..., min_length=1)
-    action: str = Field(..., min_length=1)
-    description: str = Field(default='')
-
-class ApprovalActionRequest(BaseModel):
-    payment_id: int = Field(..., gt=0)
-    action: str = Field(..., pattern='^(approve|reject)$')
-    comment: str = Field(default='')
-
-class ServiceRequest(BaseModel):
-    name: str = Field(..., min_length=1)
-    description: str = Field(default='')
-    intermediate_approver_id: int = Field(..., gt=0)
-    final_approver_id: int = Field(..., gt=0)
-    customer_department_id: Optional[int] = None
-    category_id: Optional[int] = None
-
-class SavingRequest(BaseModel):
-    service_id: int = Field(..., gt=0)
-    description: str = Field(..., min_length=1)
-    amount: float = Field(..., gt=0)
-    frequency: str = Field(..., pattern='^(once|monthly|quarterly|yearly)$')
-    currency: str = Field(default='RUB')
-    employee_id: int = Field(..., gt=0)
-    saving_reason_id: Optional[int] = None
-
-class SavingReasonRequest(BaseModel):
-    name: str = Field(..., min_length=1)
-    icon: str = Field(default='Target')
-
 # Utility functions
 def response(status_code: int, body: Any) -> Dict[str, Any]:
     return {
@@ -121,11 +40,17 @@ def response(status_code: int, body: Any) -> Dict[str, Any]:
         'isBase64Encoded': False
     }
 
+def json_response(status_code: int, body: Any) -> Dict[str, Any]:
+    """response() для больших списков строк курсора (через fast_json): Decimal - числом, даты - в ISO 8601"""
+    result = response(status_code, None)
+    result['body'] = fast_json.dumps(body)
+    return result
+
 def get_db_connection():
     dsn = os.environ.get('DATABASE_URL')
     if not dsn:
         raise Exception('DATABASE_URL not found')
-    return psycopg2.connect(dsn)
+    return instrument(get_connection(dsn))
 
 def create_jwt_token(user_id: int, email: str) -> str:
     secret = os.environ.get('JWT_SECRET')
@@ -154,7 +79,36 @@ def verify_jwt_token(token: str) -> Optional[Dict[str, Any]]:
     except jwt.InvalidTokenError:
         return None
 
-def get_user_with_permissions(conn, user_id: int) -> Optional[Dict[str, Any]]:
+_principal_cache: Dict[int, tuple] = {}
+_permissions_version: Dict[str, Any] = {'value': None, 'checked_at': 0.0}
+# Пользователь, разрешённый один раз на весь batch-запрос: user_id -> principal
+_batch_principal: Dict[int, Dict[str, Any]] = {}
+
+def get_permissions_version(conn) -> int:
+    """Текущая версия прав; из БД перечитывается не чаще AUTH_VERSION_CHECK_INTERVAL"""
+    now = time.monotonic()
+    if _permissions_version['value'] is not None and now - _permissions_version['checked_at'] < AUTH_VERSION_CHECK_INTERVAL:
+        return _permissions_version['value']
+    
+    cur = conn.cursor()
+    cur.execute(f"SELECT version FROM {SCHEMA}.permissions_version WHERE id = 1")
+    row = cur.fetchone()
+    cur.close()
+    
+    _permissions_version['value'] = row[0] if row else 0
+    _permissions_version['checked_at'] = now
+    return _permissions_version['value']
+
+def reset_principal_cache():
+    """
+    Сбрасывает кэш авторизации этого процесса после правки прав. Версию в
+    permissions_version повышают триггеры в той же транзакции, что и правка,
+    так что остальные контейнеры увидят её при следующей проверке версии.
+    """
+    _principal_cache.clear()
+    _permissions_version['value'] = None
+
+def load_principal(conn, user_id: int) -> Optional[Dict[str, Any]]:
     cur = conn.cursor(cursor_factory=RealDictCursor)
     
     cur.execute(f"""
@@ -189,17 +143,56 @@ def get_user_with_permissions(conn, user_id: int) -> Optional[Dict[str, Any]]:
     
     cur.close()
     
+    role_names = [r['name'] for r in roles]
+    
     return {
-        'id': user['id'],
-        'username': user['username'],
-        'email': user['email'],
-        'full_name': user['full_name'],
-        'is_active': user['is_active'],
-        'last_login': user['last_login'],
-        'roles': roles,
-        'permissions': permissions
+        'user': {
+            'id': user['id'],
+            'username': user['username'],
+            'email': user['email'],
+            'full_name': user['full_name'],
+            'is_active': user['is_active'],
+            'last_login': user['last_login'],
+            'roles': roles,
+            'permissions': permissions
+        },
+        'permission_names': frozenset(p['name'] for p in permissions),
+        'is_admin': 'Администратор' in role_names or 'Admin' in role_names
     }
 
+def get_principal(conn, user_id: int) -> Optional[Dict[str, Any]]:
+    """Пользователь с ролями и правами из кэша процесса, если версия прав не менялась"""
+    pinned = _batch_principal.get(user_id)
+    if pinned is not None:
+        return pinned
+    
+    version = get_permissions_version(conn)
+    now = time.monotonic()
+    
+    cached = _principal_cache.get(user_id)
+    if cached and cached[0] == version and cached[1] > now:
+        return cached[2]
+    
+    principal = load_principal(conn, user_id)
+    if principal is None:
+        _principal_cache.pop(user_id, None)
+        return None
+    
+    if len(_principal_cache) >= AUTH_CACHE_MAX_ENTRIES:
+        _principal_cache.clear()
+    _principal_cache[user_id] = (version, now + AUTH_CACHE_TTL, principal)
+    return principal
+
+def get_user_with_permissions(conn, user_id: int) -> Optional[Dict[str, Any]]:
+    principal = get_principal(conn, user_id)
+    if not principal:
+        return None
+    # Копия со своими списками: вызывающий код не должен менять закэшированное
+    user = dict(principal['user'])
+    user['roles'] = [dict(role) for role in user['roles']]
+    user['permissions'] = [dict(permission) for permission in user['permissions']]
+    return user
+
 def authenticate_request(event: Dict[str, Any], conn) -> tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
     """Извлекает токен, проверяет и возвращает payload и user. Возвращает (payload, user) или (None, None)"""
     token = event.get('headers', {}).get('X-Auth-Token') or event.get('headers', {}).get('x-auth-token')
@@ -232,37 +225,17 @@ def verify_token_and_permission(event: Dict[str, Any], conn, required_permission
     except jwt.InvalidTokenError:
         return None, response(401, {'error': 'Недействительный токен'})
     
-    cur = conn.cursor(cursor_factory=RealDictCursor)
-    
-    # Проверяем, является ли пользователь администратором
-    cur.execute(f"""
-        SELECT r.name
-        FROM {SCHEMA}.roles r
-        JOIN {SCHEMA}.user_roles ur ON r.id = ur.role_id
-        WHERE ur.user_id = %s
-    """, (payload['user_id'],))
-    
-    roles = [row['name'] for row in cur.fetchall()]
+    principal = get_principal(conn, payload['user_id'])
+    if not principal:
+        return None, response(403, {'error': 'Недостаточно прав'})
     
     # Если у пользователя роль администратора - даём полный доступ
-    if 'Администратор' in roles or 'Admin' in roles:
-        cur.close()
+    if principal['is_admin']:
         payload['is_admin'] = True
         return payload, None
     
     # Иначе проверяем конкретное разрешение
-    cur.execute(f"""
-        SELECT DISTINCT p.name
-        FROM {SCHEMA}.permissions p
-        JOIN {SCHEMA}.role_permissions rp ON p.id = rp.permission_id
-        JOIN {SCHEMA}.user_roles ur ON rp.role_id = ur.role_id
-        WHERE ur.user_id = %s
-    """, (payload['user_id'],))
-    
-    permissions = [row['name'] for row in cur.fetchall()]
-    cur.close()
-    
-    if required_permission not in permissions:
+    if required_permission not in principal['permission_names']:
         return None, response(403, {'error': 'Недостаточно прав'})
     
     return payload, None
@@ -334,95 +307,6 @@ def get_user_role(conn, user_id: int) -> str:
     cur.close()
     return result['name'] if result else 'user'
 
-# Main handler
-def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
-    """Главный обработчик всех API эндпоинтов"""
-    log(f"[HANDLER START] Event keys: {list(event.keys())}")
-    method = event.get('httpMethod', 'GET')
-    params = event.get('queryStringParameters') or {}
-    endpoint = params.get('endpoint', '')
-    
-    log(f"[DEBUG v2.4] Method={method} Endpoint={endpoint} Params={params}")
-    
-    if method == 'OPTIONS':
-        return response(200, {})
-    
-    conn = get_db_connection()
-    
-    try:
-        # Auth endpoints
-        if endpoint == 'login':
-            return handle_login(event, conn)
-        elif endpoint == 'register':
-            return handle_register(event, conn)
-        elif endpoint == 'me':
-            return handle_me(event, conn)
-        
-        # User management
-        elif endpoint == 'users':
-            return handle_users(method, event, conn)
-        elif endpoint == 'approvers':
-            return handle_approvers(event, conn)
-        
-        # API endpoints
-        elif endpoint == 'payments':
-            return handle_payments(method, event, conn)
-        elif endpoint == 'ticket_service_categories':
-            return handle_ticket_service_categories(method, event, conn)
-        elif endpoint == 'stats':
-            return handle_stats(event, conn)
-        elif endpoint == 'legal-entities':
-            return handle_legal_entities(method, event, conn)
-        elif endpoint == 'custom-fields':
-            return handle_custom_fields(method, event, conn)
-        elif endpoint == 'contractors':
-            return handle_contractors(method, event, conn)
-        elif endpoint in ('customer_departments', 'customer-departments'):
-            return handle_customer_departments(method, event, conn)
-        elif endpoint == 'roles':
-            return handle_roles(method, event, conn)
-        elif endpoint == 'permissions':
-            return handle_permissions(method, event, conn)
-        elif endpoint == 'approvals':
-            return handle_approvals(method, event, conn)
-        elif endpoint == 'services':
-            return handle_services(method, event, conn)
-        elif endpoint == 'savings':
-            return handle_savings(method, event, conn)
-        elif endpoint == 'saving-reasons':
-            return handle_saving_reasons(method, event, conn)
-        elif endpoint == 'planned-payments':
-            return handle_planned_payments(method, event, conn)
-        elif endpoint == 'payment-views':
-            return handle_payment_views(method, event, conn)
-        # Endpoints requiring auth
-        auth_endpoints = {
-            'comments': lambda p, u: handle_comments(method, event, conn, u),
-            'comment-likes': lambda p, u: handle_comment_likes(method, event, conn, u),
-            'audit-logs': lambda p, u: handle_audit_logs(method, event, conn, p),
-            'tickets-api': lambda p, u: handle_tickets_api(method, event, conn, p),
-            'ticket-dictionaries-api': lambda p, u: handle_ticket_dictionaries_api(method, event, conn, p),
-            'ticket-comments-api': lambda p, u: handle_ticket_comments_api(method, event, conn, p),
-            'comment-reactions': lambda p, u: handle_comment_reactions(method, event, conn, p),
-            'upload-file': lambda p, u: handle_upload_file(event, conn, p),
-            'notifications': lambda p, u: handle_notifications(method, event, conn, p),
-            'dashboard-layout': lambda p, u: handle_dashboard_layout(method, event, conn, p),
-            'dashboard-stats': lambda p, u: handle_dashboard_stats(method, event, conn, p),
-            'budget-breakdown': lambda p, u: handle_budget_breakdown(method, event, conn, p),
-            'savings-dashboard': lambda p, u: handle_savings_dashboard(method, event, conn, p),
-        }
-        
-        if endpoint in auth_endpoints:
-            payload, user = authenticate_request(event, conn)
-            if not payload or not user:
-                return response(401, {'error': 'Authentication required'})
-            return auth_endpoints[endpoint](payload, user)
-        
-        return response(404, {'error': 'Endpoint not found'})
-    
-    finally:
-        conn.close()
-
 # Auth handlers
 def handle_login(event: Dict[str, Any], conn) -> Dict[str, Any]:
     body_data = json.loads(event.get('body', '{}'))
@@ -448,6 +332,7 @@ def handle_login(event: Dict[str, Any], conn) -> Dict[str, Any]:
     if not user['is_active']:
         return response(403, {'error': 'Пользователь деактивирован'})
     
+    import bcrypt
     if not bcrypt.checkpw(password.encode('utf-8'), user['password_hash'].encode('utf-8')):
         return response(401, {'error': 'Неверный логин или пароль'})
     
@@ -496,6 +381,7 @@ def handle_register(event: Dict[str, Any], conn) -> Dict[str, Any]:
     if len(password) < 4:
         return response(400, {'error': 'Пароль должен быть не менее 4 символов'})
     
+    import bcrypt
     password_hash = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
     
     cur = conn.cursor(cursor_factory=RealDictCursor)
@@ -624,6 +510,7 @@ def handle_users(method: str, event: Dict[str, Any], conn) -> Dict[str, Any]:
         if len(password) < 4:
             return response(400, {'error': 'Пароль должен быть не менее 4 символов'})
         
+        import bcrypt
         password_hash = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
         
         cur = conn.cursor(cursor_factory=RealDictCursor)
@@ -644,6 +531,7 @@ def handle_users(method: str, event: Dict[str, Any], conn) -> Dict[str, Any]:
                         VALUES (%s, %s, %s)
                     """, (new_user['id'], role_id, user_payload['user_id']))
             
+            reset_principal_cache()
             conn.commit()
             
             cur.execute("""
@@ -693,6 +581,7 @@ def handle_users(method: str, event: Dict[str, Any], conn) -> Dict[str, Any]:
             """, (body_data['is_active'], user_id))
             
             updated_user = cur.fetchone()
+            reset_principal_cache()
             conn.commit()
             cur.close()
             
@@ -716,6 +605,7 @@ def handle_users(method: str, event: Dict[str, Any], conn) -> Dict[str, Any]:
             """, (username, full_name, position, photo_url, user_id))
             
             if password and len(password) >= 4:
+                import bcrypt
                 password_hash = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
                 cur.execute("UPDATE users SET password_hash = %s WHERE id = %s", (password_hash, user_id))
             
@@ -727,6 +617,7 @@ def handle_users(method: str, event: Dict[str, Any], conn) -> Dict[str, Any]:
                         VALUES (%s, %s, %s)
                     """, (user_id, role_id, user_payload['user_id']))
             
+            reset_principal_cache()
             conn.commit()
             
             cur.execute("""
@@ -778,6 +669,7 @@ def handle_users(method: str, event: Dict[str, Any], conn) -> Dict[str, Any]:
                 cur.close()
                 return response(404, {'error': 'Пользователь не найден'})
             
+            reset_principal_cache()
             conn.commit()
             cur.close()
             
@@ -789,29 +681,6 @@ def handle_users(method: str, event: Dict[str, Any], conn) -> Dict[str, Any]:
     
     return response(405, {'error': 'Метод не поддерживается'})
 
-def handle_users_list(method: str, event: Dict[str, Any], conn, payload: Dict[str, Any]) -> Dict[str, Any]:
-    """Упрощённый endpoint для получения списка пользователей (без проверки прав)"""
-    if method != 'GET':
-        return response(405, {'error': 'Метод не поддерживается'})
-    
-    cur = conn.cursor(cursor_factory=RealDictCursor)
-    try:
-        cur.execute(f"""
-            SELECT id, username, full_name
-            FROM {SCHEMA}.users
-            WHERE is_active = true
-            ORDER BY full_name
-        """)
-        
-        users_data = cur.fetchall()
-        users = [dict(row) for row in users_data]
-        
-        return response(200, {'users': users})
-    except Exception as e:
-        return response(500, {'error': str(e)})
-    finally:
-        cur.close()
-
 def handle_get_approvers(conn, payload: Dict[str, Any], user: Dict[str, Any]) -> Dict[str, Any]:
     """Получение списка пользователей-согласантов (доступно всем авторизованным)"""
     cur = conn.cursor(cursor_factory=RealDictCursor)
@@ -853,6 +722,7 @@ def handle_ticket_service_categories(method: str, event: Dict[str, Any], conn) -
         
         elif method == 'POST':
             body = json.loads(event.get('body', '{}'))
+            from models import CategoryRequest
             cat_req = CategoryRequest(**body)
             
             cur.execute(
@@ -872,6 +742,7 @@ def handle_ticket_service_categories(method: str, event: Dict[str, Any], conn) -
         elif method == 'PUT':
             body = json.loads(event.get('body', '{}'))
             category_id = body.get('id')
+            from models import CategoryRequest
             cat_req = CategoryRequest(**body)
             
             if not category_id:
@@ -912,100 +783,62 @@ def handle_ticket_service_categories(method: str, event: Dict[str, Any], conn) -
     finally:
         cur.close()
 
-def handle_saving_reasons(method: str, event: Dict[str, Any], conn) -> Dict[str, Any]:
-    cur = conn.cursor()
+PAYMENTS_PAGE_DEFAULT = 50
+PAYMENTS_PAGE_MAX = 500
+PAYMENT_FILTER_FIELDS = ('category_id', 'legal_entity_id', 'contractor_id', 'department_id', 'service_id')
+
+def encode_payments_cursor(payment_date: datetime, payment_id: int) -> str:
+    raw = f"{payment_date.isoformat()}|{payment_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_payments_cursor(cursor: str) -> Tuple[datetime, int]:
+    raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+    date_part, id_part = raw.rsplit('|', 1)
+    return datetime.fromisoformat(date_part), int(id_part)
+
+def build_payments_query(query_params: Dict[str, Any]) -> Tuple[List[str], List[Any], Optional[int]]:
+    """
+    Условия WHERE и лимит списка платежей из query-параметров.
+    Лимит None - старый режим без пагинации. ValueError при неверных значениях.
+    """
+    conditions: List[str] = []
+    values: List[Any] = []
+    
+    status = query_params.get('status')
+    if status:
+        conditions.append("p.status = ANY(%s)")
+        values.append([s for s in status.split(',') if s])
+    
+    for field in PAYMENT_FILTER_FIELDS:
+        if query_params.get(field):
+            conditions.append(f"p.{field} = %s")
+            values.append(int(query_params[field]))
+    
+    if query_params.get('date_from'):
+        conditions.append("p.payment_date >= %s")
+        values.append(datetime.fromisoformat(query_params['date_from']))
+    
+    date_to = query_params.get('date_to')
+    if date_to:
+        # Дата без времени включает весь день
+        if len(date_to) == 10:
+            conditions.append("p.payment_date < %s")
+            values.append(datetime.fromisoformat(date_to) + timedelta(days=1))
+        else:
+            conditions.append("p.payment_date <= %s")
+            values.append(datetime.fromisoformat(date_to))
     
-    try:
-        if method == 'GET':
-            payload, error = verify_token_and_permission(event, conn, 'categories.read')
-            if error:
-                return error
-            
-            cur.execute('SELECT id, name, icon, created_at FROM saving_reasons WHERE is_active = true ORDER BY name')
-            rows = cur.fetchall()
-            reasons = [
-                {
-                    'id': row[0],
-                    'name': row[1],
-                    'icon': row[2],
-                    'created_at': row[3].isoformat() if row[3] else None
-                }
-                for row in rows
-            ]
-            return response(200, reasons)
-        
-        elif method == 'POST':
-            payload, error = verify_token_and_permission(event, conn, 'categories.create')
-            if error:
-                return error
-            
-            body = json.loads(event.get('body', '{}'))
-            reason_req = SavingReasonRequest(**body)
-            
-            cur.execute(
-                "INSERT INTO saving_reasons (name, icon) VALUES (%s, %s) RETURNING id, name, icon, created_at",
-                (reason_req.name, reason_req.icon)
-            )
-            row = cur.fetchone()
-            conn.commit()
-            
-            return response(201, {
-                'id': row[0],
-                'name': row[1],
-                'icon': row[2],
-                'created_at': row[3].isoformat() if row[3] else None
-            })
-        
-        elif method == 'PUT':
-            payload, error = verify_token_and_permission(event, conn, 'categories.update')
-            if error:
-                return error
-            
-            body = json.loads(event.get('body', '{}'))
-            reason_id = body.get('id')
-            reason_req = SavingReasonRequest(**body)
-            
-            if not reason_id:
-                return response(400, {'error': 'ID is required'})
-            
-            cur.execute(
-                "UPDATE saving_reasons SET name = %s, icon = %s WHERE id = %s RETURNING id, name, icon, created_at",
-                (reason_req.name, reason_req.icon, reason_id)
-            )
-            row = cur.fetchone()
-            
-            if not row:
-                return response(404, {'error': 'Saving reason not found'})
-            
-            conn.commit()
-            
-            return response(200, {
-                'id': row[0],
-                'name': row[1],
-                'icon': row[2],
-                'created_at': row[3].isoformat() if row[3] else None
-            })
-        
-        elif method == 'DELETE':
-            payload, error = verify_token_and_permission(event, conn, 'categories.delete')
-            if error:
-                return error
-            
-            params = event.get('queryStringParameters', {})
-            reason_id = params.get('id')
-            
-            if not reason_id:
-                return response(400, {'error': 'ID is required'})
-            
-            cur.execute('DELETE FROM saving_reasons WHERE id = %s', (reason_id,))
-            conn.commit()
-            
-            return response(200, {'success': True})
-        
-        return response(405, {'error': 'Method not allowed'})
+    if not query_params.get('limit') and not query_params.get('cursor'):
+        return conditions, values, None
     
-    finally:
-        cur.close()
+    limit = min(max(int(query_params.get('limit') or PAYMENTS_PAGE_DEFAULT), 1), PAYMENTS_PAGE_MAX)
+    
+    if query_params.get('cursor'):
+        cursor_date, cursor_id = decode_payments_cursor(query_params['cursor'])
+        conditions.append("(p.payment_date, p.id) < (%s, %s)")
+        values.extend([cursor_date, cursor_id])
+    
+    return conditions, values, limit
 
 def handle_payments(method: str, event: Dict[str, Any], conn) -> Dict[str, Any]:
     cur = conn.cursor()
@@ -1016,7 +849,21 @@ def handle_payments(method: str, event: Dict[str, Any], conn) -> Dict[str, Any]:
             if error:
                 return error
             
-            cur.execute(f"""
+            query_params = event.get('queryStringParameters') or {}
+            try:
+                conditions, values, limit = build_payments_query(query_params)
+            except ValueError as e:
+                return response(400, {'error': f'Invalid query parameters: {str(e)}'})
+            
+            where_clause = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+            limit_clause = ""
+            if limit is not None:
+                limit_clause = "LIMIT %s"
+                values.append(limit + 1)
+            
+            # Строки отдаём сериализатору как есть: даты и Decimal кодирует fast_json
+            dict_cur = conn.cursor(cursor_factory=RealDictCursor)
+            dict_cur.execute(f"""
                 SELECT 
                     p.id, 
                     p.category_id,
@@ -1053,63 +900,42 @@ def handle_payments(method: str, event: Dict[str, Any], conn) -> Dict[str, Any]:
                 LEFT JOIN {SCHEMA}.customer_departments cd ON p.department_id = cd.id
                 LEFT JOIN {SCHEMA}.users u ON p.created_by = u.id
                 LEFT JOIN {SCHEMA}.services s ON p.service_id = s.id
-                ORDER BY p.payment_date DESC
-            """)
-            rows = cur.fetchall()
-            payments = [
-                {
-                    'id': row[0],
-                    'category_id': row[1],
-                    'category_name': row[2],
-                    'category_icon': row[3],
-                    'amount': float(row[4]),
-                    'description': row[5],
-                    'payment_date': row[6].isoformat() if row[6] else None,
-                    'created_at': row[7].isoformat() if row[7] else None,
-                    'legal_entity_id': row[8],
-                    'legal_entity_name': row[9],
-                    'contractor_id': row[10],
-                    'contractor_name': row[11],
-                    'department_id': row[12],
-                    'department_name': row[13],
-                    'status': row[14],
-                    'created_by': row[15],
-                    'created_by_name': row[16],
-                    'submitted_at': row[17].isoformat() if row[17] else None,
-                    'tech_director_approved_at': row[18].isoformat() if row[18] else None,
-                    'tech_director_approved_by': row[19],
-                    'ceo_approved_at': row[20].isoformat() if row[20] else None,
-                    'ceo_approved_by': row[21],
-                    'service_id': row[22],
-                    'service_name': row[23],
-                    'service_description': row[24],
-                    'invoice_number': row[25],
-                    'invoice_date': row[26].isoformat() if row[26] else None,
-                    'is_planned': row[27] if len(row) > 27 else False
-                }
-                for row in rows
-            ]
-            
-            # Load custom fields for each payment
-            for payment in payments:
+                {where_clause}
+                ORDER BY p.payment_date DESC, p.id DESC
+                {limit_clause}
+            """, values)
+            payments = dict_cur.fetchall()
+            dict_cur.close()
+            
+            next_cursor = None
+            if limit is not None and len(payments) > limit:
+                payments = payments[:limit]
+                next_cursor = encode_payments_cursor(payments[-1]['payment_date'], payments[-1]['id'])
+            
+            # Дополнительные поля всех платежей одним запросом
+            custom_fields_map = {payment['id']: [] for payment in payments}
+            if custom_fields_map:
                 cur.execute(f"""
-                    SELECT cf.id, cf.name, cf.field_type, cfv.value
+                    SELECT cfv.payment_id, cf.id, cf.name, cf.field_type, cfv.value
                     FROM {SCHEMA}.custom_field_values cfv
                     JOIN {SCHEMA}.custom_fields cf ON cfv.custom_field_id = cf.id
-                    WHERE cfv.payment_id = %s
-                """, (payment['id'],))
-                custom_fields = cur.fetchall()
-                payment['custom_fields'] = [
-                    {
-                        'id': cf[0],
-                        'name': cf[1],
-                        'field_type': cf[2],
-                        'value': cf[3]
-                    }
-                    for cf in custom_fields
-                ]
+                    WHERE cfv.payment_id = ANY(%s)
+                """, (list(custom_fields_map),))
+                for cf in cur.fetchall():
+                    custom_fields_map[cf[0]].append({
+                        'id': cf[1],
+                        'name': cf[2],
+                        'field_type': cf[3],
+                        'value': cf[4]
+                    })
+            
+            for payment in payments:
+                payment['custom_fields'] = custom_fields_map[payment['id']]
+            
+            if limit is not None:
+                return json_response(200, {'items': payments, 'next_cursor': next_cursor, 'has_more': next_cursor is not None})
             
-            return response(200, payments)
+            return json_response(200, payments)
         
         elif method == 'POST':
             payload, error = verify_token_and_permission(event, conn, 'payments.create')
@@ -1118,6 +944,7 @@ def handle_payments(method: str, event: Dict[str, Any], conn) -> Dict[str, Any]:
             
             try:
                 body = json.loads(event.get('body', '{}'))
+                from models import PaymentRequest
                 pay_req = PaymentRequest(**body)
             except Exception as e:
                 return response(400, {'error': f'Validation error: {str(e)}'})
@@ -1215,6 +1042,7 @@ def handle_payments(method: str, event: Dict[str, Any], conn) -> Dict[str, Any]:
             if not payment_id:
                 return response(400, {'error': 'ID is required'})
             
+            from models import PaymentRequest
             pay_req = PaymentRequest(**body)
             
             cur = conn.cursor(cursor_factory=RealDictCursor)
@@ -1349,185 +1177,41 @@ def handle_payments(method: str, event: Dict[str, Any], conn) -> Dict[str, Any]:
     finally:
         cur.close()
 
-def handle_planned_payments(method: str, event: Dict[str, Any], conn) -> Dict[str, Any]:
-    """Управление запланированными платежами: GET, PUT, DELETE"""
-    cur = conn.cursor(cursor_factory=RealDictCursor)
-
+def handle_categories(method: str, event: Dict[str, Any], conn) -> Dict[str, Any]:
+    '''Обработка запросов к категориям'''
+    cur = conn.cursor()
+    
     try:
         if method == 'GET':
-            payload, error = verify_token_and_permission(event, conn, 'payments.read')
+            payload, error = verify_token_and_permission(event, conn, 'categories.read')
             if error:
                 return error
-
-            cur.execute(f"""
-                SELECT pp.id, pp.category_id, c.name as category_name, c.icon as category_icon,
-                       pp.description, pp.amount, pp.planned_date, pp.legal_entity_id,
-                       le.name as legal_entity_name, pp.contractor_id, co.name as contractor_name,
-                       pp.department_id, cd.name as department_name, pp.service_id, s.name as service_name,
-                       pp.invoice_number, pp.invoice_date, pp.recurrence_type, pp.recurrence_end_date,
-                       pp.is_active, pp.created_by, pp.created_at, pp.converted_to_payment_id, pp.converted_at
-                FROM {SCHEMA}.planned_payments pp
-                LEFT JOIN {SCHEMA}.categories c ON pp.category_id = c.id
-                LEFT JOIN {SCHEMA}.legal_entities le ON pp.legal_entity_id = le.id
-                LEFT JOIN {SCHEMA}.contractors co ON pp.contractor_id = co.id
-                LEFT JOIN {SCHEMA}.customer_departments cd ON pp.department_id = cd.id
-                LEFT JOIN {SCHEMA}.services s ON pp.service_id = s.id
-                WHERE pp.created_by = %s
-                ORDER BY pp.planned_date ASC
-            """, (payload['user_id'],))
-
+            
+            cur.execute(f'SELECT id, name, icon, created_at FROM {SCHEMA}.categories ORDER BY name')
             rows = cur.fetchall()
-            result = []
-            for row in rows:
-                d = dict(row)
-                d['amount'] = float(d['amount'])
-                if d.get('planned_date'):
-                    d['planned_date'] = d['planned_date'].isoformat()
-                if d.get('invoice_date'):
-                    d['invoice_date'] = d['invoice_date'].isoformat()
-                if d.get('recurrence_end_date'):
-                    d['recurrence_end_date'] = d['recurrence_end_date'].isoformat()
-                if d.get('created_at'):
-                    d['created_at'] = d['created_at'].isoformat()
-                if d.get('converted_at'):
-                    d['converted_at'] = d['converted_at'].isoformat()
-                result.append(d)
-            return response(200, result)
-
-        elif method == 'PUT':
-            payload, error = verify_token_and_permission(event, conn, 'payments.update')
+            categories = [
+                {
+                    'id': row[0],
+                    'name': row[1],
+                    'icon': row[2],
+                    'created_at': row[3].isoformat() if row[3] else None
+                }
+                for row in rows
+            ]
+            return response(200, categories)
+        
+        elif method == 'POST':
+            payload, error = verify_token_and_permission(event, conn, 'categories.create')
             if error:
                 return error
-
+            
             body = json.loads(event.get('body', '{}'))
-            pp_id = body.get('id')
-            if not pp_id:
-                return response(400, {'error': 'ID is required'})
-
-            cur.execute(f"SELECT created_by FROM {SCHEMA}.planned_payments WHERE id = %s", (pp_id,))
-            row = cur.fetchone()
-            if not row:
-                return response(404, {'error': 'Запланированный платёж не найден'})
-            if not payload.get('is_admin', False) and row['created_by'] != payload['user_id']:
-                return response(403, {'error': 'Нет доступа'})
-
-            fields = ['category_id', 'amount', 'description', 'planned_date', 'legal_entity_id',
-                      'contractor_id', 'department_id', 'service_id', 'invoice_number',
-                      'invoice_date', 'recurrence_type', 'recurrence_end_date']
-            updates = {f: body[f] for f in fields if f in body}
-            if not updates:
-                return response(400, {'error': 'No fields to update'})
-
-            set_clause = ', '.join(f"{k} = %s" for k in updates)
+            from models import CategoryRequest
+            cat_req = CategoryRequest(**body)
+            
             cur.execute(
-                f"UPDATE {SCHEMA}.planned_payments SET {set_clause} WHERE id = %s RETURNING id",
-                list(updates.values()) + [pp_id]
-            )
-            conn.commit()
-            return response(200, {'success': True, 'id': pp_id})
-
-        elif method == 'DELETE':
-            payload, error = verify_token_and_permission(event, conn, 'payments.delete')
-            if error:
-                return error
-
-            params = event.get('queryStringParameters') or {}
-            pp_id = params.get('id')
-            if not pp_id:
-                return response(400, {'error': 'ID is required'})
-
-            cur.execute(f"SELECT created_by FROM {SCHEMA}.planned_payments WHERE id = %s", (pp_id,))
-            row = cur.fetchone()
-            if not row:
-                return response(404, {'error': 'Запланированный платёж не найден'})
-            if not payload.get('is_admin', False) and row['created_by'] != payload['user_id']:
-                return response(403, {'error': 'Нет доступа'})
-
-            cur.execute(f"DELETE FROM {SCHEMA}.planned_payments WHERE id = %s", (pp_id,))
-            conn.commit()
-            return response(200, {'success': True})
-
-        return response(405, {'error': 'Method not allowed'})
-
-    finally:
-        cur.close()
-
-
-def handle_stats(method: str, conn) -> Dict[str, Any]:
-    if method != 'GET':
-        return response(405, {'error': 'Method not allowed'})
-    
-    cur = conn.cursor()
-    
-    try:
-        cur.execute("""
-            SELECT 
-                c.id,
-                c.name,
-                c.icon,
-                COALESCE(SUM(p.amount), 0) as total
-            FROM categories c
-            LEFT JOIN payments p ON c.id = p.category_id
-            GROUP BY c.id, c.name, c.icon
-            ORDER BY total DESC
-        """)
-        
-        rows = cur.fetchall()
-        stats = [
-            {
-                'id': row[0],
-                'name': row[1],
-                'icon': row[2],
-                'total': float(row[3])
-            }
-            for row in rows
-        ]
-        
-        cur.execute('SELECT COALESCE(SUM(amount), 0) as grand_total FROM payments')
-        grand_total = float(cur.fetchone()[0])
-        
-        return response(200, {
-            'categories': stats,
-            'grand_total': grand_total
-        })
-    
-    finally:
-        cur.close()
-
-def handle_categories(method: str, event: Dict[str, Any], conn) -> Dict[str, Any]:
-    '''Обработка запросов к категориям'''
-    cur = conn.cursor()
-    
-    try:
-        if method == 'GET':
-            payload, error = verify_token_and_permission(event, conn, 'categories.read')
-            if error:
-                return error
-            
-            cur.execute(f'SELECT id, name, icon, created_at FROM {SCHEMA}.categories ORDER BY name')
-            rows = cur.fetchall()
-            categories = [
-                {
-                    'id': row[0],
-                    'name': row[1],
-                    'icon': row[2],
-                    'created_at': row[3].isoformat() if row[3] else None
-                }
-                for row in rows
-            ]
-            return response(200, categories)
-        
-        elif method == 'POST':
-            payload, error = verify_token_and_permission(event, conn, 'categories.create')
-            if error:
-                return error
-            
-            body = json.loads(event.get('body', '{}'))
-            cat_req = CategoryRequest(**body)
-            
-            cur.execute(
-                f"INSERT INTO {SCHEMA}.categories (name, icon) VALUES (%s, %s) RETURNING id, name, icon, created_at",
-                (cat_req.name, cat_req.icon)
+                f"INSERT INTO {SCHEMA}.categories (name, icon) VALUES (%s, %s) RETURNING id, name, icon, created_at",
+                (cat_req.name, cat_req.icon)
             )
             row = cur.fetchone()
             conn.commit()
@@ -1546,6 +1230,7 @@ def handle_categories(method: str, event: Dict[str, Any], conn) -> Dict[str, Any
             
             body = json.loads(event.get('body', '{}'))
             category_id = body.get('id')
+            from models import CategoryRequest
             cat_req = CategoryRequest(**body)
             
             if not category_id:
@@ -1590,206 +1275,6 @@ def handle_categories(method: str, event: Dict[str, Any], conn) -> Dict[str, Any
     finally:
         cur.close()
 
-def handle_contractors(method: str, event: Dict[str, Any], conn) -> Dict[str, Any]:
-    '''Обработка запросов к контрагентам'''
-    cur = conn.cursor()
-    
-    try:
-        if method == 'GET':
-            payload, error = verify_token_and_permission(event, conn, 'contractors.read')
-            if error:
-                return error
-            
-            cur.execute(f'SELECT id, name, inn, kpp, created_at FROM {SCHEMA}.contractors WHERE is_active = true ORDER BY name')
-            rows = cur.fetchall()
-            contractors = [
-                {
-                    'id': row[0],
-                    'name': row[1],
-                    'inn': row[2] or '',
-                    'kpp': row[3] or '',
-                    'created_at': row[4].isoformat() if row[4] else None
-                }
-                for row in rows
-            ]
-            return response(200, contractors)
-        
-        elif method == 'POST':
-            payload, error = verify_token_and_permission(event, conn, 'contractors.create')
-            if error:
-                return error
-            
-            body = json.loads(event.get('body', '{}'))
-            contractor_req = ContractorRequest(**body)
-            
-            cur.execute(
-                f"INSERT INTO {SCHEMA}.contractors (name, inn, kpp) VALUES (%s, %s, %s) RETURNING id, name, inn, kpp, created_at",
-                (contractor_req.name, contractor_req.inn, contractor_req.kpp)
-            )
-            row = cur.fetchone()
-            conn.commit()
-            
-            return response(201, {
-                'id': row[0],
-                'name': row[1],
-                'inn': row[2] or '',
-                'kpp': row[3] or '',
-                'created_at': row[4].isoformat() if row[4] else None
-            })
-        
-        elif method == 'PUT':
-            payload, error = verify_token_and_permission(event, conn, 'contractors.update')
-            if error:
-                return error
-            
-            body = json.loads(event.get('body', '{}'))
-            contractor_id = body.get('id')
-            contractor_req = ContractorRequest(**body)
-            
-            if not contractor_id:
-                return response(400, {'error': 'ID is required'})
-            
-            cur.execute(
-                f"UPDATE {SCHEMA}.contractors SET name = %s, inn = %s, kpp = %s WHERE id = %s RETURNING id, name, inn, kpp, created_at",
-                (contractor_req.name, contractor_req.inn, contractor_req.kpp, contractor_id)
-            )
-            row = cur.fetchone()
-            
-            if not row:
-                return response(404, {'error': 'Contractor not found'})
-            
-            conn.commit()
-            
-            return response(200, {
-                'id': row[0],
-                'name': row[1],
-                'inn': row[2] or '',
-                'kpp': row[3] or '',
-                'created_at': row[4].isoformat() if row[4] else None
-            })
-        
-        elif method == 'DELETE':
-            payload, error = verify_token_and_permission(event, conn, 'contractors.delete')
-            if error:
-                return error
-            
-            params = event.get('queryStringParameters', {})
-            contractor_id = params.get('id')
-            
-            if not contractor_id:
-                return response(400, {'error': 'ID is required'})
-            
-            cur.execute(f'DELETE FROM {SCHEMA}.contractors WHERE id = %s', (contractor_id,))
-            conn.commit()
-            
-            return response(200, {'success': True})
-        
-        return response(405, {'error': 'Method not allowed'})
-    
-    finally:
-        cur.close()
-
-def handle_roles(method: str, event: Dict[str, Any], conn) -> Dict[str, Any]:
-    '''Обработка запросов к ролям'''
-    cur = conn.cursor()
-    
-    try:
-        if method == 'GET':
-            payload, error = verify_token_and_permission(event, conn, 'roles.read')
-            if error:
-                return error
-            
-            cur.execute(f'SELECT id, name, description, created_at FROM {SCHEMA}.roles ORDER BY name')
-            rows = cur.fetchall()
-            roles = [
-                {
-                    'id': row[0],
-                    'name': row[1],
-                    'description': row[2] or '',
-                    'created_at': row[3].isoformat() if row[3] else None
-                }
-                for row in rows
-            ]
-            return response(200, roles)
-        
-        elif method == 'POST':
-            payload, error = verify_token_and_permission(event, conn, 'roles.create')
-            if error:
-                return error
-            
-            body = json.loads(event.get('body', '{}'))
-            name = body.get('name', '').strip()
-            description = body.get('description', '').strip()
-            
-            if not name:
-                return response(400, {'error': 'Name is required'})
-            
-            cur.execute(
-                f"INSERT INTO {SCHEMA}.roles (name, description) VALUES (%s, %s) RETURNING id, name, description, created_at",
-                (name, description)
-            )
-            row = cur.fetchone()
-            conn.commit()
-            
-            return response(201, {
-                'id': row[0],
-                'name': row[1],
-                'description': row[2] or '',
-                'created_at': row[3].isoformat() if row[3] else None
-            })
-        
-        elif method == 'PUT':
-            payload, error = verify_token_and_permission(event, conn, 'roles.update')
-            if error:
-                return error
-            
-            body = json.loads(event.get('body', '{}'))
-            role_id = body.get('id')
-            name = body.get('name', '').strip()
-            description = body.get('description', '').strip()
-            
-            if not role_id or not name:
-                return response(400, {'error': 'ID and name are required'})
-            
-            cur.execute(
-                f"UPDATE {SCHEMA}.roles SET name = %s, description = %s WHERE id = %s RETURNING id, name, description, created_at",
-                (name, description, role_id)
-            )
-            row = cur.fetchone()
-            
-            if not row:
-                return response(404, {'error': 'Role not found'})
-            
-            conn.commit()
-            
-            return response(200, {
-                'id': row[0],
-                'name': row[1],
-                'description': row[2] or '',
-                'created_at': row[3].isoformat() if row[3] else None
-            })
-        
-        elif method == 'DELETE':
-            payload, error = verify_token_and_permission(event, conn, 'roles.delete')
-            if error:
-                return error
-            
-            params = event.get('queryStringParameters', {})
-            role_id = params.get('id')
-            
-            if not role_id:
-                return response(400, {'error': 'ID is required'})
-            
-            cur.execute(f'DELETE FROM {SCHEMA}.roles WHERE id = %s', (role_id,))
-            conn.commit()
-            
-            return response(200, {'success': True})
-        
-        return response(405, {'error': 'Method not allowed'})
-    
-    finally:
-        cur.close()
-
 def handle_legal_entities(method: str, event: Dict[str, Any], conn) -> Dict[str, Any]:
     cur = conn.cursor()
     
@@ -1820,6 +1305,7 @@ def handle_legal_entities(method: str, event: Dict[str, Any], conn) -> Dict[str,
                 return error
             
             body = json.loads(event.get('body', '{}'))
+            from models import LegalEntityRequest
             entity_req = LegalEntityRequest(**body)
             
             cur.execute(
@@ -1845,6 +1331,7 @@ def handle_legal_entities(method: str, event: Dict[str, Any], conn) -> Dict[str,
             
             body = json.loads(event.get('body', '{}'))
             entity_id = body.get('id')
+            from models import LegalEntityRequest
             entity_req = LegalEntityRequest(**body)
             
             if not entity_id:
@@ -1933,6 +1420,7 @@ def handle_custom_fields(method: str, event: Dict[str, Any], conn) -> Dict[str,
                 return error
             
             body = json.loads(event.get('body', '{}'))
+            from models import CustomFieldRequest
             field_req = CustomFieldRequest(**body)
             
             cur.execute(
@@ -1957,6 +1445,7 @@ def handle_custom_fields(method: str, event: Dict[str, Any], conn) -> Dict[str,
             
             body = json.loads(event.get('body', '{}'))
             field_id = body.get('id')
+            from models import CustomFieldRequest
             field_req = CustomFieldRequest(**body)
             
             if not field_id:
@@ -2045,6 +1534,7 @@ def handle_contractors(method: str, event: Dict[str, Any], conn) -> Dict[str, An
                 return error
             
             body = json.loads(event.get('body', '{}'))
+            from models import ContractorRequest
             cont_req = ContractorRequest(**body)
             
             cur.execute(
@@ -2086,6 +1576,7 @@ def handle_contractors(method: str, event: Dict[str, Any], conn) -> Dict[str, An
             
             body = json.loads(event.get('body', '{}'))
             contractor_id = body.get('id')
+            from models import ContractorRequest
             cont_req = ContractorRequest(**body)
             
             if not contractor_id:
@@ -2245,6 +1736,7 @@ def handle_roles(method: str, event: Dict[str, Any], conn) -> Dict[str, Any]:
                 return error
             
             body = json.loads(event.get('body', '{}'))
+            from models import RoleRequest
             role_req = RoleRequest(**body)
             
             cur.execute(
@@ -2260,6 +1752,7 @@ def handle_roles(method: str, event: Dict[str, Any], conn) -> Dict[str, Any]:
                     (role_id, perm_id)
                 )
             
+            reset_principal_cache()
             conn.commit()
             
             return response(201, {
@@ -2276,6 +1769,7 @@ def handle_roles(method: str, event: Dict[str, Any], conn) -> Dict[str, Any]:
             
             body = json.loads(event.get('body', '{}'))
             role_id = body.get('id')
+            from models import RoleRequest
             role_req = RoleRequest(**body)
             
             if not role_id:
@@ -2298,6 +1792,7 @@ def handle_roles(method: str, event: Dict[str, Any], conn) -> Dict[str, Any]:
                     (role_id, perm_id)
                 )
             
+            reset_principal_cache()
             conn.commit()
             
             return response(200, {
@@ -2331,6 +1826,7 @@ def handle_roles(method: str, event: Dict[str, Any], conn) -> Dict[str, Any]:
             if not row:
                 return response(404, {'error': 'Role not found'})
             
+            reset_principal_cache()
             conn.commit()
             return response(200, {'message': 'Role deleted'})
         
@@ -2369,6 +1865,7 @@ def handle_permissions(method: str, event: Dict[str, Any], conn) -> Dict[str, An
                 return error
             
             body = json.loads(event.get('body', '{}'))
+            from models import PermissionRequest
             perm_req = PermissionRequest(**body)
             
             cur.execute(
@@ -2376,6 +1873,7 @@ def handle_permissions(method: str, event: Dict[str, Any], conn) -> Dict[str, An
                 (perm_req.name, perm_req.resource, perm_req.action, perm_req.description)
             )
             row = cur.fetchone()
+            reset_principal_cache()
             conn.commit()
             
             return response(201, {
@@ -2394,6 +1892,7 @@ def handle_permissions(method: str, event: Dict[str, Any], conn) -> Dict[str, An
             
             body = json.loads(event.get('body', '{}'))
             perm_id = body.get('id')
+            from models import PermissionRequest
             perm_req = PermissionRequest(**body)
             
             if not perm_id:
@@ -2408,6 +1907,7 @@ def handle_permissions(method: str, event: Dict[str, Any], conn) -> Dict[str, An
             if not row:
                 return response(404, {'error': 'Permission not found'})
             
+            reset_principal_cache()
             conn.commit()
             
             return response(200, {
@@ -2437,6 +1937,7 @@ def handle_permissions(method: str, event: Dict[str, Any], conn) -> Dict[str, An
             if not row:
                 return response(404, {'error': 'Permission not found'})
             
+            reset_principal_cache()
             conn.commit()
             return response(200, {'message': 'Permission deleted'})
         
@@ -2474,6 +1975,7 @@ def handle_customer_departments(method: str, event: Dict[str, Any], conn) -> Dic
                 return error
             
             body = json.loads(event.get('body', '{}'))
+            from models import CustomerDepartmentRequest
             dept_req = CustomerDepartmentRequest(**body)
             
             cur.execute(
@@ -2498,6 +2000,7 @@ def handle_customer_departments(method: str, event: Dict[str, Any], conn) -> Dic
             
             body = json.loads(event.get('body', '{}'))
             dept_id = body.get('id')
+            from models import CustomerDepartmentRequest
             dept_req = CustomerDepartmentRequest(**body)
             
             if not dept_id:
@@ -2528,189 +2031,21 @@ def handle_customer_departments(method: str, event: Dict[str, Any], conn) -> Dic
                 return error
             
             body_data = json.loads(event.get('body', '{}'))
-            dept_id = body_data.get('id')
-            
-            cur.execute(f"DELETE FROM {SCHEMA}.customer_departments WHERE id = %s RETURNING id", (dept_id,))
-            row = cur.fetchone()
-            
-            if not row:
-                return response(404, {'error': 'Department not found'})
-            
-            conn.commit()
-            return response(200, {'message': 'Department deleted'})
-        
-        return response(405, {'error': 'Method not allowed'})
-    
-    finally:
-        cur.close()
-
-def handle_approvals(method: str, event: Dict[str, Any], conn, payload: Dict[str, Any]) -> Dict[str, Any]:
-    if not payload:
-        return response(401, {'error': 'Требуется авторизация'})
-    
-    if method == 'POST':
-        body_data = json.loads(event.get('body', '{}'))
-        payment_id = body_data.get('payment_id')
-        
-        if not payment_id:
-            return response(400, {'error': 'payment_id обязателен'})
-        
-        cur = conn.cursor(cursor_factory=RealDictCursor)
-        
-        cur.execute(f"""
-            SELECT p.status, p.created_by, p.service_id, 
-                   s.intermediate_approver_id, s.final_approver_id
-            FROM {SCHEMA}.payments p
-            LEFT JOIN {SCHEMA}.services s ON p.service_id = s.id
-            WHERE p.id = %s
-        """, (payment_id,))
-        
-        payment = cur.fetchone()
-        if not payment:
-            cur.close()
-            return response(404, {'error': 'Платеж не найден'})
-        
-        if payment['status'] != 'draft':
-            cur.close()
-            return response(400, {'error': 'Платеж уже отправлен на согласование'})
-        
-        if not payment['service_id']:
-            cur.close()
-            return response(400, {'error': 'Для отправки на согласование необходимо указать сервис'})
-        
-        moscow_tz = ZoneInfo('Europe/Moscow')
-        now_moscow = datetime.now(moscow_tz).replace(tzinfo=None)
-        
-        cur.execute(f"""
-            UPDATE {SCHEMA}.payments 
-            SET status = 'pending_ceo', submitted_at = %s
-            WHERE id = %s
-        """, (now_moscow, payment_id))
-        
-        cur.execute(f"""
-            INSERT INTO {SCHEMA}.approvals (payment_id, approver_id, approver_role, action, comment)
-            VALUES (%s, %s, 'creator', 'submitted', 'Отправлено на согласование')
-        """, (payment_id, payload['user_id']))
-        
-        conn.commit()
-        cur.close()
-        
-        return response(200, {'message': 'Платеж отправлен на согласование', 'status': 'pending_ceo'})
-    
-    elif method == 'PUT':
-        body_data = json.loads(event.get('body', '{}'))
-        
-        req = ApprovalActionRequest(**body_data)
-        user_id = payload['user_id']
-        user_role = get_user_role(conn, user_id)
-        
-        cur = conn.cursor(cursor_factory=RealDictCursor)
-        
-        cur.execute(f"""
-            SELECT p.status, p.service_id, 
-                   s.intermediate_approver_id, s.final_approver_id
-            FROM {SCHEMA}.payments p
-            LEFT JOIN {SCHEMA}.services s ON p.service_id = s.id
-            WHERE p.id = %s
-        """, (req.payment_id,))
-        
-        payment = cur.fetchone()
-        if not payment:
-            cur.close()
-            return response(404, {'error': 'Платеж не найден'})
-        
-        current_status = payment['status']
-        intermediate_approver = payment.get('intermediate_approver_id')
-        final_approver = payment.get('final_approver_id')
-        
-        if current_status == 'pending_ceo' and user_id == final_approver:
-            moscow_tz = ZoneInfo('Europe/Moscow')
-            now_moscow = datetime.now(moscow_tz).replace(tzinfo=None)
-            
-            if req.action == 'approve':
-                new_status = 'approved'
-                cur.execute(f"""
-                    UPDATE {SCHEMA}.payments 
-                    SET status = %s, ceo_approved_at = %s, ceo_approved_by = %s
-                    WHERE id = %s
-                """, (new_status, now_moscow, user_id, req.payment_id))
-            else:
-                new_status = 'rejected'
-                cur.execute(f"""
-                    UPDATE {SCHEMA}.payments 
-                    SET status = %s, ceo_approved_at = %s, ceo_approved_by = %s
-                    WHERE id = %s
-                """, (new_status, now_moscow, user_id, req.payment_id))
-        
-        else:
-            cur.close()
-            return response(403, {'error': 'У вас нет прав для этого действия'})
-        
-        try:
-            print(f"[DEBUG] Inserting approval: payment_id={req.payment_id}, user_id={user_id}, user_role={user_role}, action={req.action}, comment={req.comment}")
-            cur.execute(f"""
-                INSERT INTO {SCHEMA}.approvals (payment_id, approver_id, approver_role, action, comment)
-                VALUES (%s, %s, %s, %s, %s)
-            """, (req.payment_id, user_id, user_role, req.action, req.comment))
-            
-            conn.commit()
-        except Exception as e:
-            print(f"[ERROR] Error saving to DB: {str(e)}")
-            conn.rollback()
-            cur.close()
-            return response(500, {'error': f'Error saving to DB: {str(e)}'})
-        
-        # Audit log
-        cur.execute(f"SELECT username FROM {SCHEMA}.users WHERE id = %s", (user_id,))
-        username_row = cur.fetchone()
-        username = username_row['username'] if username_row else 'Unknown'
-        
-        action_name = 'approved' if req.action == 'approve' else 'rejected'
-        create_audit_log(
-            conn,
-            'payment',
-            req.payment_id,
-            action_name,
-            user_id,
-            username,
-            changed_fields={'status': {'old': current_status, 'new': new_status}},
-            metadata={'comment': req.comment, 'role': user_role}
-        )
-        
-        cur.close()
-        
-        return response(200, {'message': 'Решение принято', 'status': new_status})
-    
-    elif method == 'GET':
-        params = event.get('queryStringParameters') or {}
-        payment_id = params.get('payment_id')
-        
-        cur = conn.cursor(cursor_factory=RealDictCursor)
-        
-        if payment_id:
-            cur.execute(f"""
-                SELECT a.*, u.full_name as approver_name
-                FROM {SCHEMA}.approvals a
-                JOIN {SCHEMA}.users u ON a.approver_id = u.id
-                WHERE a.payment_id = %s
-                ORDER BY a.created_at DESC
-            """, (payment_id,))
-        else:
-            cur.execute(f"""
-                SELECT a.*, u.full_name as approver_name, p.amount, p.description
-                FROM {SCHEMA}.approvals a
-                JOIN {SCHEMA}.users u ON a.approver_id = u.id
-                JOIN {SCHEMA}.payments p ON a.payment_id = p.id
-                ORDER BY a.created_at DESC
-                LIMIT 100
-            """)
-        
-        approvals = [dict(row) for row in cur.fetchall()]
-        cur.close()
+            dept_id = body_data.get('id')
+            
+            cur.execute(f"DELETE FROM {SCHEMA}.customer_departments WHERE id = %s RETURNING id", (dept_id,))
+            row = cur.fetchone()
+            
+            if not row:
+                return response(404, {'error': 'Department not found'})
+            
+            conn.commit()
+            return response(200, {'message': 'Department deleted'})
         
-        return response(200, approvals)
+        return response(405, {'error': 'Method not allowed'})
     
-    return response(405, {'error': 'Метод не поддерживается'})
+    finally:
+        cur.close()
 
 def handle_services(method: str, event: Dict[str, Any], conn) -> Dict[str, Any]:
     cur = conn.cursor(cursor_factory=RealDictCursor)
@@ -2749,6 +2084,7 @@ def handle_services(method: str, event: Dict[str, Any], conn) -> Dict[str, Any]:
                 return error
             
             body = json.loads(event.get('body', '{}'))
+            from models import ServiceRequest
             service_req = ServiceRequest(**body)
             
             cur.execute(
@@ -2786,6 +2122,7 @@ def handle_services(method: str, event: Dict[str, Any], conn) -> Dict[str, Any]:
                 return response(400, {'error': 'ID is required'})
             
             body = json.loads(event.get('body', '{}'))
+            from models import ServiceRequest
             service_req = ServiceRequest(**body)
             
             cur.execute(
@@ -2942,6 +2279,7 @@ def handle_savings(method: str, event: Dict[str, Any], conn) -> Dict[str, Any]:
                 return error
             
             body = json.loads(event.get('body', '{}'))
+            from models import SavingRequest
             saving_req = SavingRequest(**body)
             
             cur.execute(
@@ -3012,6 +2350,7 @@ def handle_saving_reasons(method: str, event: Dict[str, Any], conn) -> Dict[str,
                 return error
             
             body = json.loads(event.get('body', '{}'))
+            from models import SavingReasonRequest
             reason_req = SavingReasonRequest(**body)
             
             cur.execute(
@@ -3036,6 +2375,7 @@ def handle_saving_reasons(method: str, event: Dict[str, Any], conn) -> Dict[str,
             
             body = json.loads(event.get('body', '{}'))
             reason_id = body.get('id')
+            from models import SavingReasonRequest
             reason_req = SavingReasonRequest(**body)
             
             if not reason_id:
@@ -3593,129 +2933,6 @@ def handle_planned_payments(method: str, event: Dict[str, Any], conn) -> Dict[st
     finally:
         cur.close()
 
-def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
-    '''
-    Главная функция-роутер для обработки всех запросов.
-    '''
-    endpoint = event.get('queryStringParameters', {}).get('endpoint', '')
-    method = event.get('httpMethod', 'GET')
-    
-    if method == 'OPTIONS':
-        return {
-            'statusCode': 200,
-            'headers': {
-                'Access-Control-Allow-Origin': '*',
-                'Access-Control-Allow-Methods': 'GET, POST, PUT, DELETE, OPTIONS',
-                'Access-Control-Allow-Headers': 'Content-Type, Authorization, X-Authorization, X-Auth-Token, X-User-Id, X-Session-Id',
-                'Access-Control-Max-Age': '86400'
-            },
-            'body': '',
-            'isBase64Encoded': False
-        }
-    
-    try:
-        conn = get_db_connection()
-    except Exception as e:
-        return response(500, {'error': f'Database connection failed: {str(e)}'})
-    
-    try:
-        if endpoint == 'login' and method == 'POST':
-            return handle_login(event, conn)
-        
-        if endpoint == 'health':
-            return response(200, {'status': 'healthy'})
-        
-        payload = verify_token(event)
-        if not payload:
-            conn.close()
-            return response(401, {'error': 'Unauthorized'})
-        
-        if endpoint == 'me':
-            user_data = get_user_with_permissions(conn, payload['user_id'])
-            conn.close()
-            if not user_data:
-                return response(404, {'error': 'User not found'})
-            return response(200, user_data)
-        
-        if endpoint == 'payments':
-            result = handle_payments(method, event, conn)
-        elif endpoint == 'categories':
-            result = handle_categories(method, event, conn)
-        elif endpoint == 'legal-entities':
-            result = handle_legal_entities(method, event, conn)
-        elif endpoint == 'contractors':
-            result = handle_contractors(method, event, conn)
-        elif endpoint == 'customer-departments' or endpoint == 'customer_departments' or endpoint == 'departments':
-            result = handle_customer_departments(method, event, conn)
-        elif endpoint == 'custom-fields':
-            result = handle_custom_fields(method, event, conn)
-        elif endpoint == 'services':
-            result = handle_services(method, event, conn)
-        elif endpoint == 'savings':
-            result = handle_savings(method, event, conn)
-        elif endpoint == 'saving-reasons':
-            result = handle_saving_reasons(method, event, conn)
-        elif endpoint == 'users':
-            result = handle_users(method, event, conn)
-        elif endpoint == 'roles':
-            result = handle_roles(method, event, conn)
-        elif endpoint == 'permissions':
-            result = handle_permissions(method, event, conn)
-        elif endpoint == 'approvals':
-            result = handle_approvals(method, event, conn, payload)
-        elif endpoint == 'approvers':
-            user_data = get_user_with_permissions(conn, payload['user_id'])
-            result = handle_get_approvers(conn, payload, user_data)
-        elif endpoint == 'stats':
-            result = handle_stats(method, event, conn)
-        elif endpoint == 'comments':
-            user_data = get_user_with_permissions(conn, payload['user_id'])
-            result = handle_comments(method, event, conn, user_data)
-        elif endpoint == 'comment-likes':
-            user_data = get_user_with_permissions(conn, payload['user_id'])
-            result = handle_comment_likes(method, event, conn, user_data)
-        elif endpoint == 'audit-logs':
-            result = handle_audit_logs(method, event, conn, payload)
-        elif endpoint == 'tickets' or endpoint == 'tickets-api':
-            result = handle_tickets_api(method, event, conn, payload)
-        elif endpoint == 'ticket-dictionaries-api':
-            result = handle_ticket_dictionaries_api(method, event, conn, payload)
-        elif endpoint == 'ticket-comments-api':
-            result = handle_ticket_comments_api(method, event, conn, payload)
-        elif endpoint == 'ticket-history':
-            result = handle_ticket_history(method, event, conn, payload)
-        elif endpoint == 'users-list':
-            result = handle_users_list(method, event, conn, payload)
-        elif endpoint == 'tickets-bulk-actions':
-            result = handle_tickets_bulk_actions(method, event, conn, payload)
-        elif endpoint == 'notifications':
-            result = handle_notifications(method, event, conn, payload)
-        elif endpoint == 'dashboard-layout':
-            result = handle_dashboard_layout(method, event, conn, payload)
-        elif endpoint == 'dashboard-stats':
-            result = handle_dashboard_stats(method, event, conn, payload)
-        elif endpoint == 'budget-breakdown':
-            result = handle_budget_breakdown(method, event, conn, payload)
-        elif endpoint == 'savings-dashboard':
-            result = handle_savings_dashboard(method, event, conn, payload)
-        elif endpoint == 'planned-payments':
-            result = handle_planned_payments(method, event, conn)
-        elif endpoint == 'payment-views':
-            result = handle_payment_views(method, event, conn)
-        else:
-            result = response(404, {'error': f'Endpoint not found: {endpoint}'})
-        
-        conn.close()
-        return result
-        
-    except Exception as e:
-        import traceback
-        error_details = traceback.format_exc()
-        print(f"Error: {str(e)}")
-        print(f"Traceback: {error_details}")
-        conn.close()
-        return response(500, {'error': str(e), 'details': error_details})
-
 def handle_payment_views(method: str, event: Dict[str, Any], conn) -> Dict[str, Any]:
     """Запись и чтение фактов просмотра платежа согласующим"""
     cur = conn.cursor(cursor_factory=RealDictCursor)
@@ -3768,6 +2985,132 @@ def handle_payment_views(method: str, event: Dict[str, Any], conn) -> Dict[str,
 
 
 # Tickets handlers
+TICKETS_PAGE_DEFAULT = 50
+TICKETS_PAGE_MAX = 500
+# Фильтры списка заявок: значение - id или несколько id через запятую
+TICKET_FILTER_FIELDS = ('status_id', 'priority_id', 'category_id', 'department_id', 'assigned_to', 'created_by')
+# Сколько самых новых совпадений поиска ранжируется по релевантности
+TICKETS_SEARCH_CANDIDATES = 1000
+
+def encode_tickets_cursor(sort_key: Any, ticket_id: int) -> str:
+    """Курсор по ключу сортировки: created_at или ранг релевантности при поиске"""
+    key = sort_key.isoformat() if isinstance(sort_key, datetime) else repr(sort_key)
+    raw = f"{key}|{ticket_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_tickets_cursor(cursor: str) -> Tuple[str, int]:
+    raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+    key_part, id_part = raw.rsplit('|', 1)
+    return key_part, int(id_part)
+
+def build_tickets_search(search: str, filters: List[str], filter_values: List[Any]) -> Tuple[str, List[Any], str, List[Any]]:
+    """
+    Поиск по заявкам: полнотекстовый по search_vector (заголовок весомее описания),
+    а если он ничего не нашёл - подстрочный ILIKE по заголовку, описанию и названию
+    категории, который обслуживают триграммные индексы. Ранжируются только
+    TICKETS_SEARCH_CANDIDATES самых новых совпадений, так что цена запроса не растёт
+    с их числом. filters - условия фильтров списка, они отбирают совпадения до лимита.
+    Возвращает (условие, его параметры, выражение ранга, его параметры).
+    """
+    escaped = search.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    pattern = f'%{escaped}%'
+    filter_sql = ''.join(f' AND {condition}' for condition in filters)
+    condition = f"""t.id = ANY(ARRAY(
+        WITH fts AS (
+            SELECT t.id FROM {SCHEMA}.tickets t
+            WHERE t.search_vector @@ websearch_to_tsquery('russian', %s){filter_sql}
+            ORDER BY t.created_at DESC, t.id DESC
+            LIMIT {TICKETS_SEARCH_CANDIDATES}
+        )
+        SELECT id FROM fts
+        UNION ALL
+        (
+            SELECT t.id FROM {SCHEMA}.tickets t
+            WHERE NOT EXISTS (SELECT 1 FROM fts)
+              AND (
+                  t.title ILIKE %s
+                  OR t.description ILIKE %s
+                  OR t.category_id = ANY(ARRAY(SELECT id FROM {SCHEMA}.ticket_categories WHERE name ILIKE %s))
+              ){filter_sql}
+            ORDER BY t.created_at DESC, t.id DESC
+            LIMIT {TICKETS_SEARCH_CANDIDATES}
+        )
+    ))"""
+    # Совпадение части слова в заголовке поднимает заявку над совпадениями только в описании
+    rank = """(
+        ts_rank(t.search_vector, websearch_to_tsquery('russian', %s))
+        + CASE WHEN t.title ILIKE %s THEN 0.1::real ELSE 0::real END
+    )"""
+    return condition, [search, *filter_values, pattern, pattern, pattern, *filter_values], rank, [search, pattern]
+
+def build_tickets_query(query_params: Dict[str, Any]) -> Tuple[str, List[Any], List[str], List[Any], Optional[int]]:
+    """
+    Ключ сортировки, условия WHERE и лимит списка заявок из query-параметров.
+    При search сортировка по релевантности, иначе по created_at; в обоих случаях
+    по убыванию и с t.id для однозначности.
+    Лимит None - старый режим без пагинации. ValueError при неверных значениях.
+    """
+    conditions: List[str] = []
+    values: List[Any] = []
+    sort_sql, sort_values, sort_type = 't.created_at', [], 'timestamp'
+    
+    for field in TICKET_FILTER_FIELDS:
+        if query_params.get(field):
+            conditions.append(f"t.{field} = ANY(%s)")
+            values.append([int(v) for v in str(query_params[field]).split(',') if v])
+    
+    search = (query_params.get('search') or '').strip()
+    if search:
+        condition, condition_values, sort_sql, sort_values = build_tickets_search(search, list(conditions), list(values))
+        conditions.append(condition)
+        values.extend(condition_values)
+        sort_type = 'real'
+    
+    if not query_params.get('limit') and not query_params.get('cursor'):
+        return sort_sql, sort_values, conditions, values, None
+    
+    limit = min(max(int(query_params.get('limit') or TICKETS_PAGE_DEFAULT), 1), TICKETS_PAGE_MAX)
+    
+    if query_params.get('cursor'):
+        cursor_key, cursor_id = decode_tickets_cursor(query_params['cursor'])
+        cursor_value = datetime.fromisoformat(cursor_key) if sort_type == 'timestamp' else float(cursor_key)
+        conditions.append(f"({sort_sql}, t.id) < (%s::{sort_type}, %s)")
+        values.extend(sort_values + [cursor_value, cursor_id])
+    
+    return sort_sql, sort_values, conditions, values, limit
+
+def count_unread_comments(cur, user_id: int, ticket_ids: Optional[List[int]]) -> Dict[int, int]:
+    """
+    Непрочитанные пользователем чужие комментарии по заявкам одним запросом.
+    По открытым заявкам - всё после его курсора в ticket_comment_reads, по
+    неоткрытым - по старому флагу is_read. ticket_ids None - по всем заявкам.
+    """
+    ids_values: List[Any] = [] if ticket_ids is None else [ticket_ids]
+    reads_filter = "" if ticket_ids is None else " AND r.ticket_id = ANY(%s)"
+    legacy_filter = "" if ticket_ids is None else " AND tc.ticket_id = ANY(%s)"
+    values = [user_id, user_id] + ids_values + [user_id, user_id] + ids_values
+    
+    cur.execute(f"""
+        SELECT ticket_id, COUNT(*) as unread
+        FROM (
+            SELECT tc.ticket_id
+            FROM {SCHEMA}.ticket_comment_reads r
+            JOIN {SCHEMA}.ticket_comments tc
+                ON tc.ticket_id = r.ticket_id AND tc.id > r.last_read_comment_id
+            WHERE r.user_id = %s AND tc.user_id != %s{reads_filter}
+            UNION ALL
+            SELECT tc.ticket_id
+            FROM {SCHEMA}.ticket_comments tc
+            WHERE tc.is_read = FALSE AND tc.user_id != %s
+              AND NOT EXISTS (
+                  SELECT 1 FROM {SCHEMA}.ticket_comment_reads r
+                  WHERE r.user_id = %s AND r.ticket_id = tc.ticket_id
+              ){legacy_filter}
+        ) unread
+        GROUP BY ticket_id
+    """, values)
+    return {row['ticket_id']: row['unread'] for row in cur.fetchall()}
+
 def handle_tickets_api(method: str, event: Dict[str, Any], conn, payload: Dict[str, Any]) -> Dict[str, Any]:
     """Обработчик для управления заявками"""
     cur = conn.cursor(cursor_factory=RealDictCursor)
@@ -3776,26 +3119,34 @@ def handle_tickets_api(method: str, event: Dict[str, Any], conn, payload: Dict[s
     try:
         if method == 'GET':
             query_params = event.get('queryStringParameters') or {}
-            search = query_params.get('search', '')
-            
-            query = f"""
+            try:
+                sort_sql, sort_values, conditions, values, limit = build_tickets_query(query_params)
+            except ValueError as e:
+                return response(400, {'error': f'Invalid query parameters: {str(e)}'})
+            
+            where_clause = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+            limit_clause = ""
+            if limit is not None:
+                limit_clause = "LIMIT %s"
+                values.append(limit + 1)
+            # Выражение сортировки стоит в SELECT, его параметры идут раньше параметров WHERE
+            values = sort_values + values
+            
+            # Колонки совпадают с полями ответа, строки уходят в json_response без пересборки.
+            # Даты вне 1900-2100 считаем битыми и отдаём как null
+            cur.execute(f"""
                 SELECT 
-                    t.id, t.title, t.description, t.due_date,
+                    t.id, t.title, t.description,
+                    CASE WHEN EXTRACT(YEAR FROM t.due_date) BETWEEN 1900 AND 2100 THEN t.due_date END as due_date,
                     t.category_id, c.name as category_name, c.icon as category_icon,
-                    t.priority_id, p.name as priority_name, p.level as priority_level, p.color as priority_color,
+                    t.priority_id, p.name as priority_name, p.color as priority_color,
                     t.status_id, s.name as status_name, s.color as status_color,
                     t.department_id, d.name as department_name,
                     t.created_by, u.username as creator_name, u.email as creator_email,
                     t.assigned_to, ua.username as assignee_name, ua.email as assignee_email,
-                    t.created_at, t.updated_at,
-                    t.has_response,
-                    COALESCE((
-                        SELECT COUNT(*) 
-                        FROM {SCHEMA}.ticket_comments tc 
-                        WHERE tc.ticket_id = t.id 
-                        AND tc.is_read = FALSE 
-                        AND tc.user_id != %s
-                    ), 0) as unread_comments
+                    CASE WHEN EXTRACT(YEAR FROM t.created_at) BETWEEN 1900 AND 2100 THEN t.created_at END as created_at,
+                    CASE WHEN EXTRACT(YEAR FROM t.updated_at) BETWEEN 1900 AND 2100 THEN t.updated_at END as updated_at,
+                    {sort_sql} as cursor_key
                 FROM {SCHEMA}.tickets t
                 LEFT JOIN {SCHEMA}.ticket_categories c ON t.category_id = c.id
                 LEFT JOIN {SCHEMA}.ticket_priorities p ON t.priority_id = p.id
@@ -3803,60 +3154,26 @@ def handle_tickets_api(method: str, event: Dict[str, Any], conn, payload: Dict[s
                 LEFT JOIN {SCHEMA}.departments d ON t.department_id = d.id
                 LEFT JOIN {SCHEMA}.users u ON t.created_by = u.id
                 LEFT JOIN {SCHEMA}.users ua ON t.assigned_to = ua.id
-                WHERE 1=1
-            """
+                {where_clause}
+                ORDER BY cursor_key DESC, t.id DESC
+                {limit_clause}
+            """, values)
+            tickets = cur.fetchall()
             
-            params = [user_id]
-            if search:
-                query += " AND (t.title ILIKE %s OR t.description ILIKE %s OR c.name ILIKE %s)"
-                search_pattern = f'%{search}%'
-                params.extend([search_pattern, search_pattern, search_pattern])
-            
-            query += " ORDER BY t.created_at DESC"
-            
-            cur.execute(query, params)
-            tickets = []
-            for row in cur.fetchall():
-                # Безопасная обработка дат с проверкой на корректность
-                def safe_date_format(date_value):
-                    if not date_value:
-                        return None
-                    try:
-                        # Проверяем, что год в разумных пределах (1900-2100)
-                        if hasattr(date_value, 'year') and (date_value.year < 1900 or date_value.year > 2100):
-                            return None
-                        return date_value.isoformat()
-                    except:
-                        return None
-                
-                tickets.append({
-                    'id': row['id'],
-                    'title': row['title'],
-                    'description': row['description'],
-                    'due_date': safe_date_format(row['due_date']),
-                    'category_id': row['category_id'],
-                    'category_name': row['category_name'],
-                    'category_icon': row['category_icon'],
-                    'priority_id': row['priority_id'],
-                    'priority_name': row['priority_name'],
-                    'priority_color': row['priority_color'],
-                    'status_id': row['status_id'],
-                    'status_name': row['status_name'],
-                    'status_color': row['status_color'],
-                    'department_id': row['department_id'],
-                    'department_name': row['department_name'],
-                    'created_by': row['created_by'],
-                    'creator_name': row['creator_name'],
-                    'creator_email': row['creator_email'],
-                    'assigned_to': row['assigned_to'],
-                    'assignee_name': row['assignee_name'],
-                    'assignee_email': row['assignee_email'],
-                    'created_at': safe_date_format(row['created_at']),
-                    'updated_at': safe_date_format(row['updated_at']),
-                    'unread_comments': row['unread_comments']
-                })
+            next_cursor = None
+            if limit is not None and len(tickets) > limit:
+                tickets = tickets[:limit]
+                next_cursor = encode_tickets_cursor(tickets[-1]['cursor_key'], tickets[-1]['id'])
+            
+            unread = count_unread_comments(cur, user_id, [t['id'] for t in tickets] if limit is not None else None)
+            for ticket in tickets:
+                del ticket['cursor_key']
+                ticket['unread_comments'] = unread.get(ticket['id'], 0)
+            
+            if limit is not None:
+                return json_response(200, {'tickets': tickets, 'next_cursor': next_cursor, 'has_more': next_cursor is not None})
             
-            return response(200, {'tickets': tickets})
+            return json_response(200, {'tickets': tickets})
         
         elif method == 'POST':
             data = json.loads(event.get('body', '{}'))
@@ -4124,6 +3441,58 @@ def handle_users_list(method: str, event: Dict[str, Any], conn, payload: Dict[st
     finally:
         cur.close()
 
+TICKET_COMMENTS_PAGE_MAX = 200
+
+def load_comment_extras(cur, comment_ids: List[int]) -> Tuple[Dict[int, List[Dict[str, Any]]], Dict[int, List[Dict[str, Any]]]]:
+    """Вложения и реакции для страницы комментариев - по одному запросу на всё"""
+    attachments: Dict[int, List[Dict[str, Any]]] = {comment_id: [] for comment_id in comment_ids}
+    reactions: Dict[int, List[Dict[str, Any]]] = {comment_id: [] for comment_id in comment_ids}
+    if not comment_ids:
+        return attachments, reactions
+    
+    cur.execute(f"""
+        SELECT comment_id, id, filename, url, size
+        FROM {SCHEMA}.comment_attachments
+        WHERE comment_id = ANY(%s)
+        ORDER BY comment_id, created_at ASC
+    """, (comment_ids,))
+    for a in cur.fetchall():
+        attachments[a['comment_id']].append({'id': a['id'], 'filename': a['filename'], 'url': a['url'], 'size': a['size']})
+    
+    cur.execute(f"""
+        SELECT comment_id, emoji, COUNT(*) as count, ARRAY_AGG(user_id) as users
+        FROM {SCHEMA}.comment_reactions
+        WHERE comment_id = ANY(%s)
+        GROUP BY comment_id, emoji
+    """, (comment_ids,))
+    for r in cur.fetchall():
+        reactions[r['comment_id']].append({'emoji': r['emoji'], 'count': r['count'], 'users': r['users']})
+    
+    return attachments, reactions
+
+def mark_ticket_comments_read(conn, ticket_id: int, user_id: int, up_to_comment_id: int) -> None:
+    """
+    Сдвигает курсор прочтения пользователя по заявке - одна строка вместо
+    перезаписи всех комментариев. Если курсор уже дальше, записи нет.
+    Отдельная короткая транзакция без ожидания сброса WAL.
+    """
+    cur = conn.cursor()
+    try:
+        cur.execute("SET LOCAL synchronous_commit TO OFF")
+        cur.execute(f"""
+            INSERT INTO {SCHEMA}.ticket_comment_reads (user_id, ticket_id, last_read_comment_id)
+            VALUES (%s, %s, %s)
+            ON CONFLICT (user_id, ticket_id) DO UPDATE
+            SET last_read_comment_id = EXCLUDED.last_read_comment_id, updated_at = CURRENT_TIMESTAMP
+            WHERE ticket_comment_reads.last_read_comment_id < EXCLUDED.last_read_comment_id
+        """, (user_id, ticket_id, up_to_comment_id))
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        print(f"Failed to mark comments read: {e}")
+    finally:
+        cur.close()
+
 def handle_ticket_comments_api(method: str, event: Dict[str, Any], conn, payload: Dict[str, Any]) -> Dict[str, Any]:
     """Обработчик для комментариев к заявкам"""
     cur = conn.cursor(cursor_factory=RealDictCursor)
@@ -4137,15 +3506,20 @@ def handle_ticket_comments_api(method: str, event: Dict[str, Any], conn, payload
             if not ticket_id:
                 return response(400, {'error': 'ticket_id обязателен'})
             
-            # Помечаем все комментарии в заявке как прочитанные для текущего пользователя
-            cur.execute(f"""
-                UPDATE {SCHEMA}.ticket_comments 
-                SET is_read = TRUE
-                WHERE ticket_id = %s AND user_id != %s AND is_read = FALSE
-            """, (ticket_id, user_id))
-            conn.commit()
-            
-            cur.execute(f"""
+            try:
+                ticket_id = int(ticket_id)
+                limit = None
+                if query_params.get('limit'):
+                    limit = min(max(int(query_params['limit']), 1), TICKET_COMMENTS_PAGE_MAX)
+                cursor = None
+                if query_params.get('cursor'):
+                    cursor_key, cursor_id = decode_tickets_cursor(query_params['cursor'])
+                    cursor = (datetime.fromisoformat(cursor_key), cursor_id)
+            except ValueError as e:
+                return response(400, {'error': f'Invalid query parameters: {str(e)}'})
+            
+            # Ветка от новых к старым, страницы по курсору (created_at, id)
+            query = f"""
                 SELECT 
                     tc.id, tc.ticket_id, tc.user_id, tc.comment, tc.is_internal, tc.created_at,
                     tc.parent_comment_id, tc.mentioned_user_ids,
@@ -4153,31 +3527,26 @@ def handle_ticket_comments_api(method: str, event: Dict[str, Any], conn, payload
                 FROM {SCHEMA}.ticket_comments tc
                 LEFT JOIN {SCHEMA}.users u ON tc.user_id = u.id
                 WHERE tc.ticket_id = %s
-                ORDER BY tc.created_at DESC
-            """, (ticket_id,))
+            """
+            values: List[Any] = [ticket_id]
+            if cursor:
+                query += " AND (tc.created_at, tc.id) < (%s::timestamp, %s)"
+                values.extend(cursor)
+            query += " ORDER BY tc.created_at DESC, tc.id DESC"
+            if limit is not None:
+                query += " LIMIT %s"
+                values.append(limit + 1)
+            
+            cur.execute(query, values)
+            rows = cur.fetchall()
+            has_more = limit is not None and len(rows) > limit
+            if has_more:
+                rows = rows[:limit]
+            
+            attachments, reactions = load_comment_extras(cur, [row['id'] for row in rows])
             
             comments = []
-            for row in cur.fetchall():
-                comment_id = row['id']
-                
-                # Загружаем вложения
-                cur.execute(f"""
-                    SELECT id, filename, url, size
-                    FROM {SCHEMA}.comment_attachments
-                    WHERE comment_id = %s
-                    ORDER BY created_at ASC
-                """, (comment_id,))
-                attachments = [dict(a) for a in cur.fetchall()]
-                
-                # Загружаем реакции с агрегацией
-                cur.execute(f"""
-                    SELECT emoji, COUNT(*) as count, ARRAY_AGG(user_id) as users
-                    FROM {SCHEMA}.comment_reactions
-                    WHERE comment_id = %s
-                    GROUP BY emoji
-                """, (comment_id,))
-                reactions = [{'emoji': r['emoji'], 'count': r['count'], 'users': r['users']} for r in cur.fetchall()]
-                
+            for row in rows:
                 comments.append({
                     'id': row['id'],
                     'ticket_id': row['ticket_id'],
@@ -4189,11 +3558,23 @@ def handle_ticket_comments_api(method: str, event: Dict[str, Any], conn, payload
                     'created_at': row['created_at'].isoformat() if row['created_at'] else None,
                     'parent_comment_id': row['parent_comment_id'],
                     'mentioned_user_ids': row['mentioned_user_ids'] or [],
-                    'attachments': attachments,
-                    'reactions': reactions
+                    'attachments': attachments[row['id']],
+                    'reactions': reactions[row['id']]
                 })
             
-            return response(200, {'comments': comments})
+            # Чтение закончено - теперь можно писать. Первая страница отмечает
+            # прочитанным всё до самого нового из показанных комментариев
+            if rows and not cursor:
+                conn.commit()
+                mark_ticket_comments_read(conn, ticket_id, user_id, max(row['id'] for row in rows))
+            
+            if limit is None and not cursor:
+                return response(200, {'comments': comments})
+            return response(200, {
+                'comments': comments,
+                'next_cursor': encode_tickets_cursor(rows[-1]['created_at'], rows[-1]['id']) if has_more else None,
+                'has_more': has_more
+            })
         
         elif method == 'POST':
             data = json.loads(event.get('body', '{}'))
@@ -4417,8 +3798,24 @@ def handle_ticket_history(method: str, event: Dict[str, Any], conn, payload: Dic
     finally:
         cur.close()
 
+# Больше заявок за один запрос не обрабатываем: каждое действие - один-два SQL-запроса
+# и одна вставка в audit_logs. Время на пределе меряют сценарии "tickets-bulk-actions
+# max ..." в backend/benchmarks/handlers.py: p95 около 0.2 с с аудитом по каждой заявке
+BULK_TICKETS_MAX = 1000
+
+# action -> (колонка tickets, ключ в changed_fields, справочник, колонка с названием, action в audit_logs)
+BULK_TICKET_UPDATES = {
+    'change_status': ('status_id', 'status', 'ticket_statuses', 'name', 'status_changed'),
+    'change_priority': ('priority_id', 'priority', 'ticket_priorities', 'name', 'updated'),
+    'assign': ('assigned_to', 'assigned_to', 'users', 'username', 'assigned'),
+}
+
 def handle_tickets_bulk_actions(method: str, event: Dict[str, Any], conn, payload: Dict[str, Any]) -> Dict[str, Any]:
-    """Массовые операции над заявками"""
+    """
+    Массовые операции над заявками: change_status, change_priority, assign, delete.
+    Не больше BULK_TICKETS_MAX заявок за запрос; каждое действие выполняется одним
+    запросом по id = ANY(...), успех по заявке определяется по RETURNING.
+    """
     if method != 'POST':
         return response(405, {'error': 'Метод не поддерживается'})
     
@@ -4427,59 +3824,104 @@ def handle_tickets_bulk_actions(method: str, event: Dict[str, Any], conn, payloa
     
     try:
         body = json.loads(event.get('body', '{}'))
-        ticket_ids = body.get('ticket_ids', [])
         action = body.get('action')
         
+        try:
+            ticket_ids = list(dict.fromkeys(int(ticket_id) for ticket_id in body.get('ticket_ids') or []))
+        except (TypeError, ValueError):
+            return response(400, {'error': 'ticket_ids должен быть списком id'})
+        
         if not ticket_ids or not action:
             return response(400, {'error': 'Не указаны ticket_ids или action'})
         
-        results = []
-        
-        if action == 'change_status':
-            status_id = body.get('status_id')
-            if not status_id:
-                return response(400, {'error': 'Не указан status_id'})
-            
-            for ticket_id in ticket_ids:
-                try:
-                    cur.execute(
-                        f'UPDATE {SCHEMA}.tickets SET status_id = %s, updated_at = NOW() WHERE id = %s',
-                        (status_id, ticket_id)
-                    )
-                    results.append({'ticket_id': ticket_id, 'success': True})
-                except Exception as e:
-                    results.append({'ticket_id': ticket_id, 'success': False, 'error': str(e)})
-        
-        elif action == 'change_priority':
-            priority_id = body.get('priority_id')
-            if not priority_id:
-                return response(400, {'error': 'Не указан priority_id'})
-            
-            for ticket_id in ticket_ids:
-                try:
-                    cur.execute(
-                        f'UPDATE {SCHEMA}.tickets SET priority_id = %s, updated_at = NOW() WHERE id = %s',
-                        (priority_id, ticket_id)
-                    )
-                    results.append({'ticket_id': ticket_id, 'success': True})
-                except Exception as e:
-                    results.append({'ticket_id': ticket_id, 'success': False, 'error': str(e)})
+        if len(ticket_ids) > BULK_TICKETS_MAX:
+            return response(400, {'error': f'Не больше {BULK_TICKETS_MAX} заявок за один запрос'})
+        
+        audit_rows = []
+        
+        if action in BULK_TICKET_UPDATES:
+            column, field, ref_table, ref_name, audit_action = BULK_TICKET_UPDATES[action]
+            
+            if action == 'assign':
+                if 'assigned_to' not in body:
+                    return response(400, {'error': 'Не указан assigned_to'})
+                value = body.get('assigned_to')
+            else:
+                value = body.get(column)
+                if not value:
+                    return response(400, {'error': f'Не указан {column}'})
+
+            try:
+                value = int(value) if value is not None else None
+            except (TypeError, ValueError):
+                return response(400, {'error': f'Неверное значение {column}'})
+
+            cur.execute(f"""
+                WITH old AS (
+                    SELECT id, {column} as old_value
+                    FROM {SCHEMA}.tickets
+                    WHERE id = ANY(%s)
+                    FOR UPDATE
+                ),
+                upd AS (
+                    UPDATE {SCHEMA}.tickets t
+                    SET {column} = %s, updated_at = NOW()
+                    FROM old
+                    WHERE t.id = old.id
+                    RETURNING t.id, old.old_value
+                )
+                SELECT upd.id, upd.old_value, o.{ref_name} as old_name, n.{ref_name} as new_name
+                FROM upd
+                LEFT JOIN {SCHEMA}.{ref_table} o ON o.id = upd.old_value
+                LEFT JOIN {SCHEMA}.{ref_table} n ON n.id = %s
+            """, (ticket_ids, value, value))
+            
+            updated = cur.fetchall()
+            done_ids = {row['id'] for row in updated}
+            
+            for row in updated:
+                if row['old_value'] != value:
+                    changed_fields = {field: {'old': row['old_name'], 'new': row['new_name']}}
+                    audit_rows.append((row['id'], audit_action, json.dumps(changed_fields), None))
         
         elif action == 'delete':
-            for ticket_id in ticket_ids:
-                try:
-                    cur.execute(f'DELETE FROM {SCHEMA}.ticket_comments WHERE ticket_id = %s', (ticket_id,))
-                    cur.execute(f'DELETE FROM {SCHEMA}.tickets WHERE id = %s', (ticket_id,))
-                    results.append({'ticket_id': ticket_id, 'success': True})
-                except Exception as e:
-                    results.append({'ticket_id': ticket_id, 'success': False, 'error': str(e)})
+            cur.execute(f'DELETE FROM {SCHEMA}.ticket_comments WHERE ticket_id = ANY(%s)', (ticket_ids,))
+            cur.execute(f'DELETE FROM {SCHEMA}.tickets WHERE id = ANY(%s) RETURNING id, title', (ticket_ids,))
+            
+            deleted = cur.fetchall()
+            done_ids = {row['id'] for row in deleted}
+            
+            for row in deleted:
+                audit_rows.append((row['id'], 'deleted', None, json.dumps({'title': row['title']})))
         
         else:
             return response(400, {'error': f'Неизвестное действие: {action}'})
         
+        if audit_rows:
+            cur.execute(f"SELECT username FROM {SCHEMA}.users WHERE id = %s", (user_id,))
+            user_row = cur.fetchone()
+            username = user_row['username'] if user_row else None
+            
+            execute_values(
+                cur,
+                f"""
+                    INSERT INTO {SCHEMA}.audit_logs 
+                    (entity_type, entity_id, action, user_id, username, changed_fields, old_values)
+                    VALUES %s
+                """,
+                [(entity_id, audit_action, user_id, username, changed, old) for entity_id, audit_action, changed, old in audit_rows],
+                template="('ticket', %s, %s, %s, %s, %s::jsonb, %s::jsonb)",
+                page_size=len(audit_rows)
+            )
+        
         conn.commit()
         
-        success_count = sum(1 for r in results if r['success'])
+        results = [
+            {'ticket_id': ticket_id, 'success': True} if ticket_id in done_ids
+            else {'ticket_id': ticket_id, 'success': False, 'error': 'Заявка не найдена'}
+            for ticket_id in ticket_ids
+        ]
+        success_count = len(done_ids)
         
         return response(200, {
             'success': True,
@@ -4495,6 +3937,37 @@ def handle_tickets_bulk_actions(method: str, event: Dict[str, Any], conn, payloa
     finally:
         cur.close()
 
+# Долгий опрос: сколько максимум держим запрос и как часто проверяем счётчик
+NOTIFICATIONS_WAIT_MAX = 20.0
+NOTIFICATIONS_POLL_INTERVAL = 1.0
+# Больше уведомлений за один запрос не отдаём
+NOTIFICATIONS_PAGE_MAX = 200
+
+def read_notification_counter(cur, user_id: int) -> Tuple[int, int]:
+    """(непрочитанные, id последнего уведомления) из notification_counters"""
+    cur.execute(f"""
+        SELECT unread_count, last_notification_id
+        FROM {SCHEMA}.notification_counters
+        WHERE user_id = %s
+    """, (user_id,))
+    row = cur.fetchone()
+    if not row:
+        return 0, 0
+    return row['unread_count'], row['last_notification_id']
+
+def wait_for_notifications(conn, cur, user_id: int, since_id: int, wait: float) -> Tuple[int, int]:
+    """
+    Ждёт до wait секунд, пока не появится уведомление новее since_id, проверяя
+    строку счётчика. Между проверками транзакция закрыта.
+    """
+    deadline = time.monotonic() + min(max(wait, 0.0), NOTIFICATIONS_WAIT_MAX)
+    unread_count, last_id = read_notification_counter(cur, user_id)
+    while last_id <= since_id and time.monotonic() < deadline:
+        conn.rollback()
+        time.sleep(min(NOTIFICATIONS_POLL_INTERVAL, max(deadline - time.monotonic(), 0.0)))
+        unread_count, last_id = read_notification_counter(cur, user_id)
+    return unread_count, last_id
+
 def handle_notifications(method: str, event: Dict[str, Any], conn, payload: Dict[str, Any]) -> Dict[str, Any]:
     """Управление уведомлениями пользователей"""
     user_id = payload['user_id']
@@ -4504,7 +3977,15 @@ def handle_notifications(method: str, event: Dict[str, Any], conn, payload: Dict
         if method == 'GET':
             params = event.get('queryStringParameters') or {}
             unread_only = params.get('unread_only') == 'true'
-            limit = int(params.get('limit', 50))
+            try:
+                limit = int(params.get('limit', 50))
+                since_id = int(params['since']) if params.get('since') is not None else None
+                wait = float(params.get('wait') or 0)
+                if limit < 1:
+                    raise ValueError('limit must be a positive integer')
+            except ValueError as e:
+                return response(400, {'error': f'Invalid query parameters: {str(e)}'})
+            limit = min(limit, NOTIFICATIONS_PAGE_MAX)
             
             query = f"""
                 SELECT 
@@ -4523,22 +4004,46 @@ def handle_notifications(method: str, event: Dict[str, Any], conn, payload: Dict
             if unread_only:
                 query += " AND n.is_read = false"
             
+            # Режим "новое с курсора": пока новых нет, отвечаем по одной строке счётчика
+            if since_id is not None:
+                unread_count, last_id = wait_for_notifications(conn, cur, user_id, since_id, wait)
+                if last_id <= since_id:
+                    return response(200, {
+                        'notifications': [],
+                        'unread_count': unread_count,
+                        'cursor': since_id,
+                        'has_more': False
+                    })
+                
+                query += " AND n.id > %s ORDER BY n.id ASC LIMIT %s"
+                cur.execute(query, (user_id, since_id, limit + 1))
+                notifications = cur.fetchall()
+                has_more = len(notifications) > limit
+                notifications = notifications[:limit]
+                # Пока есть следующая страница, курсор - последнее отданное; иначе
+                # всё до last_id просмотрено (с unread_only прочитанные пропущены).
+                # id уведомлений пользователя фиксируются по порядку (V0115), так что
+                # ниже last_id незакоммиченных уже нет
+                cursor = notifications[-1]['id'] if has_more else max([last_id] + [n['id'] for n in notifications])
+                
+                return response(200, {
+                    'notifications': [dict(n) for n in notifications],
+                    'unread_count': unread_count,
+                    'cursor': cursor,
+                    'has_more': has_more
+                })
+            
             query += " ORDER BY n.created_at DESC LIMIT %s"
             
             cur.execute(query, (user_id, limit))
             notifications = cur.fetchall()
             
-            cur.execute(f"""
-                SELECT COUNT(*) as unread_count
-                FROM {SCHEMA}.notifications
-                WHERE user_id = %s AND is_read = false
-            """, (user_id,))
-            
-            unread_count = cur.fetchone()['unread_count']
+            unread_count, last_id = read_notification_counter(cur, user_id)
             
             return response(200, {
                 'notifications': [dict(n) for n in notifications],
-                'unread_count': unread_count
+                'unread_count': unread_count,
+                'cursor': last_id
             })
         
         elif method == 'PUT':
@@ -4627,30 +4132,22 @@ def handle_dashboard_stats(method: str, event: Dict[str, Any], conn, payload: Di
     cur = conn.cursor(cursor_factory=RealDictCursor)
     
     try:
+        # Текущий и прошлый месяц из помесячной сводки payment_monthly_stats
         cur.execute(f"""
             SELECT 
-                COALESCE(SUM(amount), 0) as total_amount,
-                COUNT(*) as total_count
-            FROM {SCHEMA}.payments
-            WHERE EXTRACT(MONTH FROM payment_date) = EXTRACT(MONTH FROM CURRENT_DATE)
-                AND EXTRACT(YEAR FROM payment_date) = EXTRACT(YEAR FROM CURRENT_DATE)
+                COALESCE(SUM(total_amount) FILTER (WHERE month = date_trunc('month', CURRENT_DATE)::date), 0) as total_amount,
+                COALESCE(SUM(payment_count) FILTER (WHERE month = date_trunc('month', CURRENT_DATE)::date), 0) as total_count,
+                COALESCE(SUM(total_amount) FILTER (WHERE month < date_trunc('month', CURRENT_DATE)::date), 0) as previous_amount
+            FROM {SCHEMA}.payment_monthly_stats
+            WHERE month >= date_trunc('month', CURRENT_DATE - INTERVAL '1 month')::date
+                AND month <= date_trunc('month', CURRENT_DATE)::date
         """)
         
         current_month = cur.fetchone()
         
-        cur.execute(f"""
-            SELECT 
-                COALESCE(SUM(amount), 0) as total_amount
-            FROM {SCHEMA}.payments
-            WHERE EXTRACT(MONTH FROM payment_date) = EXTRACT(MONTH FROM CURRENT_DATE - INTERVAL '1 month')
-                AND EXTRACT(YEAR FROM payment_date) = EXTRACT(YEAR FROM CURRENT_DATE - INTERVAL '1 month')
-        """)
-        
-        previous_month = cur.fetchone()
-        
         total_amount = float(current_month['total_amount'])
         total_count = current_month['total_count']
-        previous_amount = float(previous_month['total_amount'])
+        previous_amount = float(current_month['previous_amount'])
         
         if previous_amount > 0:
             change_percent = round(((total_amount - previous_amount) / previous_amount) * 100, 1)
@@ -4671,26 +4168,90 @@ def handle_dashboard_stats(method: str, event: Dict[str, Any], conn, payload: Di
     finally:
         cur.close()
 
+BUDGET_TOP_PAYMENTS = 5
+
 def handle_budget_breakdown(method: str, event: Dict[str, Any], conn, payload: Dict[str, Any]) -> Dict[str, Any]:
-    """Детальная разбивка IT бюджета по категориям"""
+    """
+    Детальная разбивка IT бюджета по категориям с топ-5 платежей в каждой.
+    Фильтры: date_from, date_to (YYYY-MM-DD, включительно), status (через запятую).
+    """
     if method != 'GET':
         return response(405, {'error': 'Метод не поддерживается'})
     
+    query_params = event.get('queryStringParameters') or {}
+    conditions: List[str] = []
+    values: List[Any] = []
+    
+    try:
+        if query_params.get('date_from'):
+            conditions.append("p.payment_date >= %s")
+            values.append(datetime.fromisoformat(query_params['date_from']))
+        if query_params.get('date_to'):
+            conditions.append("p.payment_date < %s")
+            values.append(datetime.fromisoformat(query_params['date_to']) + timedelta(days=1))
+    except ValueError as e:
+        return response(400, {'error': f'Неверный формат даты: {str(e)}'})
+    
+    date_filtered = bool(conditions)
+    statuses = [st for st in (query_params.get('status') or '').split(',') if st]
+    if statuses:
+        conditions.append("p.status = ANY(%s)")
+        values.append(statuses)
+    
+    where_clause = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    
+    # Без фильтра по датам суммы берём из помесячной сводки, иначе считаем по платежам периода
+    if date_filtered:
+        totals_sql = f"""
+            SELECT p.category_id, SUM(p.amount) as amount, COUNT(*) as payment_count
+            FROM {SCHEMA}.payments p
+            {where_clause}
+            GROUP BY p.category_id
+        """
+        totals_values = list(values)
+    else:
+        totals_sql = f"""
+            SELECT ms.category_id, SUM(ms.total_amount) as amount, SUM(ms.payment_count) as payment_count
+            FROM {SCHEMA}.payment_monthly_stats ms
+            {'WHERE ms.status = ANY(%s)' if statuses else ''}
+            GROUP BY ms.category_id
+        """
+        totals_values = [statuses] if statuses else []
+    
     cur = conn.cursor(cursor_factory=RealDictCursor)
     
     try:
         cur.execute(f"""
+            WITH totals AS ({totals_sql}),
+            ranked AS (
+                SELECT 
+                    p.category_id,
+                    COALESCE(s.name, 'Без сервиса') as service,
+                    p.amount,
+                    p.status,
+                    ROW_NUMBER() OVER (PARTITION BY p.category_id ORDER BY p.amount DESC, p.id DESC) as rn
+                FROM {SCHEMA}.payments p
+                LEFT JOIN {SCHEMA}.services s ON p.service_id = s.id
+                {where_clause}
+            )
             SELECT 
                 c.id as category_id,
                 c.name,
                 c.icon,
-                COALESCE(SUM(p.amount), 0) as amount,
-                COUNT(p.id) as payment_count
+                COALESCE(t.amount, 0) as amount,
+                COALESCE(
+                    json_agg(
+                        json_build_object('service', r.service, 'amount', r.amount, 'status', r.status)
+                        ORDER BY r.rn
+                    ) FILTER (WHERE r.rn IS NOT NULL),
+                    '[]'
+                ) as payments
             FROM {SCHEMA}.categories c
-            LEFT JOIN {SCHEMA}.payments p ON c.id = p.category_id
-            GROUP BY c.id, c.name, c.icon
+            LEFT JOIN totals t ON t.category_id = c.id
+            LEFT JOIN ranked r ON r.category_id = c.id AND r.rn <= %s
+            GROUP BY c.id, c.name, c.icon, t.amount
             ORDER BY amount DESC
-        """)
+        """, totals_values + values + [BUDGET_TOP_PAYMENTS])
         
         categories = cur.fetchall()
         total_budget = sum(float(cat['amount']) for cat in categories)
@@ -4700,28 +4261,16 @@ def handle_budget_breakdown(method: str, event: Dict[str, Any], conn, payload: D
             amount = float(cat['amount'])
             percentage = round((amount / total_budget * 100), 1) if total_budget > 0 else 0
             
-            cur.execute(f"""
-                SELECT 
-                    COALESCE(s.name, 'Без сервиса') as service,
-                    p.amount,
-                    p.status
-                FROM {SCHEMA}.payments p
-                LEFT JOIN {SCHEMA}.services s ON p.service_id = s.id
-                WHERE p.category_id = %s
-                ORDER BY p.amount DESC
-                LIMIT 5
-            """, (cat['category_id'],))
-            
-            payments = [{'service': row['service'], 'amount': float(row['amount']), 'status': row['status']} 
-                       for row in cur.fetchall()]
-            
             result.append({
                 'category_id': cat['category_id'],
                 'name': cat['name'],
                 'icon': cat['icon'],
                 'amount': amount,
                 'percentage': percentage,
-                'payments': payments
+                'payments': [
+                    {'service': row['service'], 'amount': float(row['amount']), 'status': row['status']}
+                    for row in cat['payments']
+                ]
             })
         
         return response(200, result)
@@ -4774,4 +4323,190 @@ def handle_savings_dashboard(method: str, event: Dict[str, Any], conn, payload:
     except Exception as e:
         return response(500, {'error': str(e)})
     finally:
-        cur.close()
\ No newline at end of file
+        cur.close()
+
+BATCH_MAX_REQUESTS = 20
+
+def handle_batch(method: str, event: Dict[str, Any], conn, payload: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Несколько вызовов за один запрос на одном соединении и с одной проверкой прав.
+    
+    POST ?endpoint=batch
+    {"requests": [{"id": "payments", "endpoint": "payments", "method": "GET",
+                   "params": {...}, "body": {...}}, ...]}
+    
+    Ответ: {"responses": {"<id>": {"status": 200, "body": ...}, ...}}
+    """
+    if method != 'POST':
+        return response(405, {'error': 'Method not allowed'})
+    
+    try:
+        requests = json.loads(event.get('body') or '{}').get('requests')
+    except (ValueError, AttributeError):
+        return response(400, {'error': 'Invalid JSON'})
+    
+    if not isinstance(requests, list) or not requests:
+        return response(400, {'error': 'Не указан список requests'})
+    if len(requests) > BATCH_MAX_REQUESTS:
+        return response(400, {'error': f'Не больше {BATCH_MAX_REQUESTS} запросов в batch'})
+    
+    ids = [str(item.get('id', index)) if isinstance(item, dict) else str(index) for index, item in enumerate(requests)]
+    if len(set(ids)) != len(ids):
+        return response(400, {'error': 'id запросов в batch должны быть уникальны'})
+    
+    principal = get_principal(conn, payload['user_id'])
+    if principal:
+        _batch_principal[payload['user_id']] = principal
+    
+    parts = []
+    try:
+        for request_id, item in zip(ids, requests):
+            result = run_batch_item(event, conn, payload, item)
+            body = result.get('body') or 'null'
+            parts.append(f'{json.dumps(request_id, ensure_ascii=False)}:{{"status":{result["statusCode"]},"body":{body}}}')
+    finally:
+        _batch_principal.clear()
+    
+    # Тела подответов уже в JSON: склеиваем их как есть, без повторного разбора
+    result = response(200, None)
+    result['body'] = '{"responses":{' + ','.join(parts) + '}}'
+    return result
+
+def run_batch_item(event: Dict[str, Any], conn, payload: Dict[str, Any], item: Any) -> Dict[str, Any]:
+    if not isinstance(item, dict) or not item.get('endpoint'):
+        return response(400, {'error': 'Не указан endpoint'})
+    
+    endpoint = item['endpoint']
+    route = ROUTES.get(endpoint) if endpoint != 'batch' else None
+    if not route:
+        return response(404, {'error': f'Endpoint not found: {endpoint}'})
+    
+    method = str(item.get('method') or 'GET').upper()
+    params = item.get('params') or {}
+    sub_event = {
+        **event,
+        'httpMethod': method,
+        'queryStringParameters': {**{k: str(v) for k, v in params.items()}, 'endpoint': endpoint},
+        'body': json.dumps(item['body'], ensure_ascii=False) if item.get('body') is not None else None
+    }
+    
+    try:
+        result = route(method, sub_event, conn, dict(payload))
+    except Exception as e:
+        log(f"Batch item {endpoint} failed: {e}")
+        result = response(500, {'error': str(e)})
+    
+    # Незакоммиченное запросом (упал, вернул ошибку до commit) откатываем, как это
+    # сделал бы пул при возврате соединения: иначе его закоммитит следующий запрос
+    if conn.info.transaction_status != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+        conn.rollback()
+    return result
+
+def with_user(handle: Callable) -> Callable:
+    """Маршрут для обработчиков, которым нужен пользователь с ролями и правами вместо payload"""
+    def route(method: str, event: Dict[str, Any], conn, payload: Dict[str, Any]) -> Dict[str, Any]:
+        return handle(method, event, conn, get_user_with_permissions(conn, payload['user_id']))
+    return route
+
+def without_payload(handle: Callable) -> Callable:
+    """Маршрут для обработчиков вида handle(method, event, conn)"""
+    def route(method: str, event: Dict[str, Any], conn, payload: Dict[str, Any]) -> Dict[str, Any]:
+        return handle(method, event, conn)
+    return route
+
+# Маршруты без авторизации: (endpoint, method) -> handle(method, event, conn); '*' - любой метод
+PUBLIC_ROUTES: Dict[Tuple[str, str], Callable] = {
+    ('login', 'POST'): lambda method, event, conn: handle_login(event, conn),
+    ('health', '*'): lambda method, event, conn: response(200, {'status': 'healthy'}),
+}
+
+# Маршруты с авторизацией: endpoint -> handle(method, event, conn, payload)
+ROUTES: Dict[str, Callable] = {
+    'me': lambda method, event, conn, payload: handle_me(event, conn),
+    'payments': without_payload(handle_payments),
+    'categories': without_payload(handle_categories),
+    'legal-entities': without_payload(handle_legal_entities),
+    'contractors': without_payload(handle_contractors),
+    'customer-departments': without_payload(handle_customer_departments),
+    'customer_departments': without_payload(handle_customer_departments),
+    'departments': without_payload(handle_customer_departments),
+    'custom-fields': without_payload(handle_custom_fields),
+    'services': without_payload(handle_services),
+    'savings': without_payload(handle_savings),
+    'saving-reasons': without_payload(handle_saving_reasons),
+    'users': without_payload(handle_users),
+    'roles': without_payload(handle_roles),
+    'permissions': without_payload(handle_permissions),
+    'approvals': handle_approvals,
+    'approvers': with_user(lambda method, event, conn, user_data: handle_get_approvers(conn, None, user_data)),
+    'stats': lambda method, event, conn, payload: handle_stats(event, conn),
+    'comments': with_user(handle_comments),
+    'comment-likes': with_user(handle_comment_likes),
+    'audit-logs': handle_audit_logs,
+    'tickets': handle_tickets_api,
+    'tickets-api': handle_tickets_api,
+    'ticket-dictionaries-api': handle_ticket_dictionaries_api,
+    'ticket-comments-api': handle_ticket_comments_api,
+    'ticket-history': handle_ticket_history,
+    'users-list': handle_users_list,
+    'tickets-bulk-actions': handle_tickets_bulk_actions,
+    'notifications': handle_notifications,
+    'dashboard-layout': handle_dashboard_layout,
+    'dashboard-stats': handle_dashboard_stats,
+    'budget-breakdown': handle_budget_breakdown,
+    'savings-dashboard': handle_savings_dashboard,
+    'planned-payments': without_payload(handle_planned_payments),
+    'payment-views': without_payload(handle_payment_views),
+    'batch': handle_batch,
+}
+
+@track_request
+@negotiate_encoding
+def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    '''
+    Главная функция-роутер для обработки всех запросов.
+    '''
+    endpoint = (event.get('queryStringParameters') or {}).get('endpoint', '')
+    method = event.get('httpMethod', 'GET')
+    
+    if method == 'OPTIONS':
+        return {
+            'statusCode': 200,
+            'headers': {
+                'Access-Control-Allow-Origin': '*',
+                'Access-Control-Allow-Methods': 'GET, POST, PUT, DELETE, OPTIONS',
+                'Access-Control-Allow-Headers': 'Content-Type, Authorization, X-Authorization, X-Auth-Token, X-User-Id, X-Session-Id',
+                'Access-Control-Max-Age': '86400'
+            },
+            'body': '',
+            'isBase64Encoded': False
+        }
+    
+    try:
+        conn = get_db_connection()
+    except Exception as e:
+        return response(500, {'error': f'Database connection failed: {str(e)}'})
+    
+    try:
+        public_route = PUBLIC_ROUTES.get((endpoint, method)) or PUBLIC_ROUTES.get((endpoint, '*'))
+        if public_route:
+            return public_route(method, event, conn)
+        
+        payload = verify_token(event)
+        if not payload:
+            return response(401, {'error': 'Unauthorized'})
+        
+        route = ROUTES.get(endpoint)
+        if not route:
+            return response(404, {'error': f'Endpoint not found: {endpoint}'})
+        
+        return route(method, event, conn, payload)
+        
+    except Exception as e:
+        import traceback
+        error_details = traceback.format_exc()
+        print(f"Error: {str(e)}")
+        print(f"Traceback: {error_details}")
+        return response(500, {'error': str(e), 'details': error_details})
+    finally:
+        conn.close()
@@ -1,12 +1,16 @@
 import json
 import os
-import psycopg2
 from psycopg2.extras import RealDictCursor
 from datetime import datetime
 from zoneinfo import ZoneInfo
 from decimal import Decimal
 from services import fetch_service_balance, calculate_status
+from db_pool import get_connection
+from http_encoding import negotiate_encoding
+from perf import instrument, track_request
 
+@track_request
+@negotiate_encoding
 def handler(event: dict, context) -> dict:
     '''API для мониторинга балансов сервисов - получение, обновление и управление интеграциями'''
     
@@ -33,7 +37,7 @@ def handler(event: dict, context) -> dict:
             'body': json.dumps({'error': 'Database connection not configured'})
         }
     
-    conn = psycopg2.connect(dsn)
+    conn = instrument(get_connection(dsn))
     
     try:
         if method == 'GET' and not path:
@@ -1,7 +1,8 @@
 """API для уведомлений"""
 import json
 import os
-from typing import Dict, Any
+import time
+from typing import Dict, Any, Tuple
 import jwt
 import psycopg2
 from psycopg2.extras import RealDictCursor
@@ -47,12 +48,44 @@ def verify_token(event: Dict[str, Any], conn=None) -> tuple:
     except jwt.InvalidTokenError:
         return None, response(401, {'error': 'Invalid token'})
 
+# Долгий опрос: сколько максимум держим запрос и как часто проверяем счётчик
+NOTIFICATIONS_WAIT_MAX = 20.0
+NOTIFICATIONS_POLL_INTERVAL = 1.0
+# Больше уведомлений за один запрос не отдаём
+NOTIFICATIONS_PAGE_MAX = 200
+
+def read_notification_counter(cur, user_id: int) -> Tuple[int, int]:
+    """(непрочитанные, id последнего уведомления) из notification_counters"""
+    cur.execute(f"""
+        SELECT unread_count, last_notification_id
+        FROM {SCHEMA}.notification_counters
+        WHERE user_id = %s
+    """, (user_id,))
+    row = cur.fetchone()
+    if not row:
+        return 0, 0
+    return row['unread_count'], row['last_notification_id']
+
+def wait_for_notifications(conn, cur, user_id: int, since_id: int, wait: float) -> Tuple[int, int]:
+    """
+    Ждёт до wait секунд, пока не появится уведомление новее since_id, проверяя
+    строку счётчика. Между проверками транзакция закрыта.
+    """
+    deadline = time.monotonic() + min(max(wait, 0.0), NOTIFICATIONS_WAIT_MAX)
+    unread_count, last_id = read_notification_counter(cur, user_id)
+    while last_id <= since_id and time.monotonic() < deadline:
+        conn.rollback()
+        time.sleep(min(NOTIFICATIONS_POLL_INTERVAL, max(deadline - time.monotonic(), 0.0)))
+        unread_count, last_id = read_notification_counter(cur, user_id)
+    return unread_count, last_id
+
 def handler(event: dict, context) -> dict:
     """
     API для уведомлений.
     
     Endpoints:
-    - GET /notifications - получить список уведомлений
+    - GET /notifications - получить список уведомлений (?limit=50)
+    - GET /notifications?since={id}&wait={сек} - только новые, с долгим опросом
     - PUT /notifications/{id}/read - отметить как прочитанное
     """
     method = event.get('httpMethod', 'GET')
@@ -73,19 +106,53 @@ def handler(event: dict, context) -> dict:
         cur = conn.cursor(cursor_factory=RealDictCursor)
         
         if method == 'GET':
-            # Получить уведомления пользователя
-            cur.execute(f"""
+            params = event.get('queryStringParameters') or {}
+            try:
+                limit = int(params.get('limit', 50))
+                since_id = int(params['since']) if params.get('since') is not None else None
+                wait = float(params.get('wait') or 0)
+                if limit < 1:
+                    raise ValueError('limit must be a positive integer')
+            except ValueError as e:
+                cur.close()
+                return response(400, {'error': f'Invalid query parameters: {str(e)}'})
+            limit = min(limit, NOTIFICATIONS_PAGE_MAX)
+            query = f"""
                 SELECT id, user_id, type, title, message, is_read, created_at, data
                 FROM {SCHEMA}.notifications
                 WHERE user_id = %s
-                ORDER BY created_at DESC
-                LIMIT 50
-            """, (user_id,))
+            """
             
+            # ?since=<id>[&wait=<сек>] - только уведомления новее курсора
+            if since_id is not None:
+                unread_count, last_id = wait_for_notifications(conn, cur, user_id, since_id, wait)
+                if last_id <= since_id:
+                    cur.close()
+                    return response(200, {'notifications': [], 'unread_count': unread_count, 'cursor': since_id, 'has_more': False})
+                
+                cur.execute(query + " AND id > %s ORDER BY id ASC LIMIT %s", (user_id, since_id, limit + 1))
+                notifications = [dict(row) for row in cur.fetchall()]
+                cur.close()
+                has_more = len(notifications) > limit
+                notifications = notifications[:limit]
+                # id уведомлений пользователя фиксируются по порядку (V0115): всё до
+                # last_id уже видно, и без следующей страницы курсор можно сдвинуть к нему
+                cursor = notifications[-1]['id'] if has_more else max([last_id] + [n['id'] for n in notifications])
+                
+                return response(200, {
+                    'notifications': notifications,
+                    'unread_count': unread_count,
+                    'cursor': cursor,
+                    'has_more': has_more
+                })
+            
+            # Получить уведомления пользователя
+            cur.execute(query + " ORDER BY created_at DESC LIMIT %s", (user_id, limit))
             notifications = [dict(row) for row in cur.fetchall()]
+            unread_count, last_id = read_notification_counter(cur, user_id)
             cur.close()
             
-            return response(200, {'notifications': notifications})
+            return response(200, {'notifications': notifications, 'unread_count': unread_count, 'cursor': last_id})
         
         elif method == 'PUT':
             # Отметить уведомление как прочитанное
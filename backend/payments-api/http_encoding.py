@@ -0,0 +1,121 @@
+"""Сжатие ответов (br/gzip по Accept-Encoding) и ETag/304 по If-None-Match"""
+import base64
+import gzip
+import hashlib
+from functools import wraps
+from typing import Any, Callable, Dict, Optional
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Ответы меньше этого размера не сжимаем: выигрыш меньше накладных расходов
+COMPRESS_MIN_BYTES = 1024
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+
+def _request_header(event: Dict[str, Any], name: str) -> str:
+    name = name.lower()
+    for key, value in (event.get('headers') or {}).items():
+        if key.lower() == name:
+            return value or ''
+    return ''
+
+
+def _accepted_encodings(accept_encoding: str) -> Dict[str, float]:
+    """Кодировки из Accept-Encoding с их q-весами"""
+    accepted = {}
+    for part in accept_encoding.split(','):
+        token, _, params = part.strip().partition(';')
+        token = token.strip().lower()
+        if not token:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[token] = q
+    return accepted
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """Допустимая кодировка с наибольшим q; при равных весах br лучше gzip"""
+    accepted = _accepted_encodings(accept_encoding)
+    wildcard = accepted.get('*', 0.0)
+    candidates = ['br', 'gzip'] if brotli is not None else ['gzip']
+    best = max(candidates, key=lambda name: accepted.get(name, wildcard))
+    return best if accepted.get(best, wildcard) > 0 else None
+
+
+def compute_etag(body: bytes, encoding: Optional[str] = None) -> str:
+    """
+    Сильный ETag тела; у сжатого представления - с суффиксом кодировки,
+    чтобы gzip, br и несжатый ответ не выдавали себя за одни и те же байты
+    """
+    digest = hashlib.sha256(body).hexdigest()[:32]
+    return f'"{digest}-{encoding}"' if encoding else f'"{digest}"'
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Слабое сравнение, как требует RFC 9110 для If-None-Match"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    for candidate in if_none_match.split(','):
+        candidate = candidate.strip()
+        if candidate.startswith('W/'):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+def encode_response(event: Dict[str, Any], resp: Dict[str, Any]) -> Dict[str, Any]:
+    """Добавляет ETag, отвечает 304 на совпавший If-None-Match и сжимает тело"""
+    if not isinstance(resp, dict) or resp.get('isBase64Encoded') or not isinstance(resp.get('body'), str):
+        return resp
+
+    headers = dict(resp.get('headers') or {})
+    raw = resp['body'].encode('utf-8')
+
+    encoding = None
+    if len(raw) >= COMPRESS_MIN_BYTES:
+        headers['Vary'] = 'Accept-Encoding'
+        encoding = choose_encoding(_request_header(event, 'Accept-Encoding'))
+
+    if resp.get('statusCode') == 200 and event.get('httpMethod') in ('GET', 'HEAD'):
+        etag = compute_etag(raw, encoding)
+        headers['ETag'] = etag
+        if etag_matches(_request_header(event, 'If-None-Match'), etag):
+            headers.pop('Content-Type', None)
+            return {'statusCode': 304, 'headers': headers, 'body': '', 'isBase64Encoded': False}
+
+    if encoding is None:
+        return {**resp, 'headers': headers}
+
+    if encoding == 'br':
+        compressed = brotli.compress(raw, quality=BROTLI_QUALITY)
+    else:
+        compressed = gzip.compress(raw, compresslevel=GZIP_LEVEL)
+
+    headers['Content-Encoding'] = encoding
+    return {
+        **resp,
+        'headers': headers,
+        'body': base64.b64encode(compressed).decode('ascii'),
+        'isBase64Encoded': True
+    }
+
+
+def negotiate_encoding(handler: Callable) -> Callable:
+    """Декоратор для handler(event, context): применяет encode_response к его ответу"""
+    @wraps(handler)
+    def wrapper(event, context):
+        return encode_response(event, handler(event, context))
+    return wrapper
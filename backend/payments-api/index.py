@@ -1,12 +1,15 @@
 import json
 import os
+import base64
 import sys
 import jwt
-import psycopg2
 from psycopg2.extras import RealDictCursor
-from typing import Dict, Any
-from datetime import datetime
+from typing import Dict, Any, Optional, List, Tuple
+from datetime import datetime, timedelta
 from pydantic import BaseModel, Field
+from db_pool import get_connection
+from http_encoding import negotiate_encoding
+from perf import instrument, track_request
 
 SCHEMA = 't_p61788166_html_to_frontend'
 
@@ -40,7 +43,7 @@ def get_db_connection():
     dsn = os.environ.get('DATABASE_URL')
     if not dsn:
         raise ValueError('DATABASE_URL not set')
-    return psycopg2.connect(dsn)
+    return instrument(get_connection(dsn))
 
 def verify_token(event: Dict[str, Any]) -> Dict[str, Any]:
     headers = event.get('headers', {})
@@ -96,6 +99,65 @@ def is_admin_user(conn, user_id: int) -> bool:
     finally:
         cur.close()
 
+PAYMENTS_PAGE_DEFAULT = 50
+PAYMENTS_PAGE_MAX = 500
+PAYMENT_FILTER_FIELDS = ('category_id', 'legal_entity_id', 'contractor_id', 'department_id', 'service_id')
+
+def encode_payments_cursor(payment_date: datetime, payment_id: int) -> str:
+    raw = f"{payment_date.isoformat()}|{payment_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_payments_cursor(cursor: str) -> Tuple[datetime, int]:
+    raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+    date_part, id_part = raw.rsplit('|', 1)
+    return datetime.fromisoformat(date_part), int(id_part)
+
+def build_payments_query(query_params: Dict[str, Any]) -> Tuple[List[str], List[Any], Optional[int]]:
+    """
+    Условия WHERE и лимит списка платежей из query-параметров.
+    Лимит None - старый режим без пагинации. ValueError при неверных значениях.
+    """
+    conditions: List[str] = []
+    values: List[Any] = []
+    
+    status = query_params.get('status')
+    if status:
+        conditions.append("p.status = ANY(%s)")
+        values.append([s for s in status.split(',') if s])
+    
+    for field in PAYMENT_FILTER_FIELDS:
+        if query_params.get(field):
+            conditions.append(f"p.{field} = %s")
+            values.append(int(query_params[field]))
+    
+    if query_params.get('date_from'):
+        conditions.append("p.payment_date >= %s")
+        values.append(datetime.fromisoformat(query_params['date_from']))
+    
+    date_to = query_params.get('date_to')
+    if date_to:
+        # Дата без времени включает весь день
+        if len(date_to) == 10:
+            conditions.append("p.payment_date < %s")
+            values.append(datetime.fromisoformat(date_to) + timedelta(days=1))
+        else:
+            conditions.append("p.payment_date <= %s")
+            values.append(datetime.fromisoformat(date_to))
+    
+    if not query_params.get('limit') and not query_params.get('cursor'):
+        return conditions, values, None
+    
+    limit = min(max(int(query_params.get('limit') or PAYMENTS_PAGE_DEFAULT), 1), PAYMENTS_PAGE_MAX)
+    
+    if query_params.get('cursor'):
+        cursor_date, cursor_id = decode_payments_cursor(query_params['cursor'])
+        conditions.append("(p.payment_date, p.id) < (%s, %s)")
+        values.extend([cursor_date, cursor_id])
+    
+    return conditions, values, limit
+
+@track_request
+@negotiate_encoding
 def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     '''
     API для управления платежами (создание, чтение, обновление, удаление).
@@ -137,6 +199,12 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             query_params = event.get('queryStringParameters') or {}
             scope = query_params.get('scope', 'my')
             
+            try:
+                conditions, values, limit = build_payments_query(query_params)
+            except ValueError as e:
+                conn.close()
+                return response(400, {'error': f'Invalid query parameters: {str(e)}'})
+            
             if scope == 'all':
                 # Проверяем роли: администратор, CEO или утверждающий могут видеть все платежи
                 cur2 = conn.cursor(cursor_factory=RealDictCursor)
@@ -152,11 +220,15 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                 if not is_admin and not is_ceo and not is_approver_role:
                     conn.close()
                     return response(403, {'error': 'Недостаточно прав для просмотра всех платежей'})
-                where_clause = ""
-                params = tuple()
             else:
-                where_clause = "WHERE p.created_by = %s"
-                params = (payload['user_id'],)
+                conditions.insert(0, "p.created_by = %s")
+                values.insert(0, payload['user_id'])
+            
+            where_clause = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+            limit_clause = ""
+            if limit is not None:
+                limit_clause = "LIMIT %s"
+                values.append(limit + 1)
             
             cur.execute(f"""
                 SELECT 
@@ -198,10 +270,16 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                 LEFT JOIN {SCHEMA}.users u ON p.created_by = u.id
                 LEFT JOIN {SCHEMA}.services s ON p.service_id = s.id
                 {where_clause}
-                ORDER BY p.payment_date DESC
-            """, params)
+                ORDER BY p.payment_date DESC, p.id DESC
+                {limit_clause}
+            """, values)
             rows = cur.fetchall()
             payments = []
+            
+            next_cursor = None
+            if limit is not None and len(rows) > limit:
+                rows = rows[:limit]
+                next_cursor = encode_payments_cursor(rows[-1]['payment_date'], rows[-1]['id'])
 
             payment_ids = [row['id'] for row in rows]
             custom_fields_map = {}
@@ -240,6 +318,10 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             
             cur.close()
             conn.close()
+            
+            if limit is not None:
+                return response(200, {'items': payments, 'next_cursor': next_cursor, 'has_more': next_cursor is not None})
+            
             return response(200, payments)
         
         elif method == 'POST':
@@ -9,13 +9,14 @@ from datetime import datetime, timedelta
 from zoneinfo import ZoneInfo
 import psycopg2
 from psycopg2.extras import RealDictCursor
+from perf import instrument, track_request
 
 DATABASE_URL = os.environ.get('DATABASE_URL')
 SCHEMA = 't_p61788166_html_to_frontend'
 
 def get_db_connection():
     """Создание подключения к БД"""
-    return psycopg2.connect(DATABASE_URL)
+    return instrument(psycopg2.connect(DATABASE_URL))
 
 def process_scheduled_payments() -> Dict[str, Any]:
     """Обработка всех запланированных платежей, которые должны быть созданы"""
@@ -152,6 +153,7 @@ def process_scheduled_payments() -> Dict[str, Any]:
     finally:
         conn.close()
 
+@track_request
 def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     """Главный обработчик (может вызываться по расписанию или вручную)"""
     method = event.get('httpMethod', 'GET')
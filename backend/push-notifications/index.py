@@ -7,11 +7,13 @@ from datetime import datetime
 from zoneinfo import ZoneInfo
 import psycopg2
 from psycopg2.extras import RealDictCursor
+from perf import instrument, track_request
 from pywebpush import webpush, WebPushException
 
 def get_db_connection():
-    return psycopg2.connect(os.environ['DATABASE_URL'])
+    return instrument(psycopg2.connect(os.environ['DATABASE_URL']))
 
+@track_request
 def handler(event: dict, context) -> dict:
     method = event.get('httpMethod', 'GET')
     
@@ -0,0 +1,148 @@
+"""Пул соединений PostgreSQL, переживающий вызовы функции в тёплом контейнере"""
+import os
+import time
+import threading
+from typing import Dict, List, Optional, Tuple
+import psycopg2
+from psycopg2 import extensions
+
+# Сколько простаивающих соединений держим в контейнере
+POOL_MAX_IDLE = int(os.environ.get('DB_POOL_SIZE', '4'))
+# Через сколько секунд соединение пересоздаётся, даже если живое
+POOL_MAX_LIFETIME = float(os.environ.get('DB_POOL_MAX_LIFETIME', '600'))
+# После скольких секунд простоя соединение проверяется через SELECT 1
+POOL_HEALTHCHECK_AFTER = float(os.environ.get('DB_POOL_HEALTHCHECK_AFTER', '30'))
+
+
+class PooledConnection:
+    """Соединение из пула: close() возвращает его в пул вместо закрытия"""
+
+    def __init__(self, pool: 'ConnectionPool', raw, created_at: float):
+        self._pool = pool
+        self._raw = raw
+        self._created_at = created_at
+
+    def close(self):
+        # Повторный close() (а в обработчиках он встречается) ничего не делает
+        raw, self._raw = self._raw, None
+        if raw is not None:
+            self._pool.release(raw, self._created_at)
+
+    @property
+    def closed(self) -> int:
+        return 1 if self._raw is None else self._raw.closed
+
+    def __getattr__(self, name):
+        if self._raw is None:
+            raise psycopg2.InterfaceError('connection already returned to pool')
+        return getattr(self._raw, name)
+
+    def __enter__(self):
+        self._raw.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return self._raw.__exit__(exc_type, exc, tb)
+
+
+class ConnectionPool:
+    """Набор простаивающих соединений к одному DSN"""
+
+    def __init__(self, dsn: str, max_idle: int = POOL_MAX_IDLE,
+                 max_lifetime: float = POOL_MAX_LIFETIME,
+                 healthcheck_after: float = POOL_HEALTHCHECK_AFTER):
+        self.dsn = dsn
+        self.max_idle = max_idle
+        self.max_lifetime = max_lifetime
+        self.healthcheck_after = healthcheck_after
+        # (соединение, время создания, время возврата в пул)
+        self._idle: List[Tuple[object, float, float]] = []
+        self._lock = threading.Lock()
+
+    def acquire(self) -> PooledConnection:
+        while True:
+            with self._lock:
+                item = self._idle.pop() if self._idle else None
+            if item is None:
+                return PooledConnection(self, psycopg2.connect(self.dsn), time.monotonic())
+
+            raw, created_at, released_at = item
+            now = time.monotonic()
+            if raw.closed or now - created_at > self.max_lifetime:
+                _close_quietly(raw)
+                continue
+            if now - released_at > self.healthcheck_after and not _is_alive(raw):
+                _close_quietly(raw)
+                continue
+            return PooledConnection(self, raw, created_at)
+
+    def release(self, raw, created_at: float):
+        if raw.closed or time.monotonic() - created_at > self.max_lifetime:
+            _close_quietly(raw)
+            return
+        if not _reset(raw):
+            _close_quietly(raw)
+            return
+        with self._lock:
+            if len(self._idle) < self.max_idle:
+                self._idle.append((raw, created_at, time.monotonic()))
+                return
+        _close_quietly(raw)
+
+    def clear(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for raw, _, _ in idle:
+            _close_quietly(raw)
+
+
+def _reset(raw) -> bool:
+    """Возвращает соединение в чистое состояние: без открытой транзакции, autocommit выключен"""
+    try:
+        status = raw.info.transaction_status
+        if status == extensions.TRANSACTION_STATUS_UNKNOWN:
+            return False
+        if status != extensions.TRANSACTION_STATUS_IDLE:
+            raw.rollback()
+        if raw.autocommit:
+            raw.autocommit = False
+        return True
+    except psycopg2.Error:
+        return False
+
+
+def _is_alive(raw) -> bool:
+    try:
+        with raw.cursor() as cur:
+            cur.execute('SELECT 1')
+        raw.rollback()
+        return True
+    except psycopg2.Error:
+        return False
+
+
+def _close_quietly(raw):
+    try:
+        raw.close()
+    except psycopg2.Error:
+        pass
+
+
+_pools: Dict[str, ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(dsn: Optional[str] = None) -> ConnectionPool:
+    dsn = dsn or os.environ.get('DATABASE_URL')
+    if not dsn:
+        raise ValueError('DATABASE_URL not set')
+    pool = _pools.get(dsn)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.setdefault(dsn, ConnectionPool(dsn))
+    return pool
+
+
+def get_connection(dsn: Optional[str] = None) -> PooledConnection:
+    """Берёт соединение из пула модуля; conn.close() вернёт его обратно"""
+    return get_pool(dsn).acquire()
@@ -5,9 +5,11 @@ from typing import Dict, Any, Optional
 from datetime import datetime
 from zoneinfo import ZoneInfo
 import jwt
-import psycopg2
 from psycopg2.extras import RealDictCursor
 from pydantic import BaseModel, Field
+from db_pool import get_connection
+from http_encoding import negotiate_encoding
+from perf import instrument, track_request
 
 # Environment
 SCHEMA = 't_p61788166_html_to_frontend'
@@ -199,6 +201,8 @@ def handle_saving_reasons_get(event: Dict[str, Any], conn) -> Dict[str, Any]:
     
     return response(200, {'reasons': reasons})
 
+@track_request
+@negotiate_encoding
 def handler(event: dict, context) -> dict:
     """
     API для управления экономиями.
@@ -221,7 +225,7 @@ def handler(event: dict, context) -> dict:
     if method == 'OPTIONS':
         return response(200, {})
     
-    conn = psycopg2.connect(DSN)
+    conn = instrument(get_connection(DSN))
     
     try:
         # Определяем endpoint из query параметров или пути
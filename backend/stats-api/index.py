@@ -3,8 +3,10 @@ import json
 import os
 from typing import Dict, Any
 import jwt
-import psycopg2
 from psycopg2.extras import RealDictCursor
+from db_pool import get_connection
+from http_encoding import negotiate_encoding
+from perf import instrument, track_request
 
 # Environment
 SCHEMA = 't_p61788166_html_to_frontend'
@@ -47,6 +49,8 @@ def verify_token(event: Dict[str, Any], conn=None) -> tuple:
     except jwt.InvalidTokenError:
         return None, response(401, {'error': 'Invalid token'})
 
+@track_request
+@negotiate_encoding
 def handler(event: dict, context) -> dict:
     """
     API для статистики и дашбордов.
@@ -75,7 +79,7 @@ def handler(event: dict, context) -> dict:
     date_from = params.get('date_from')
     date_to = params.get('date_to')
     
-    conn = psycopg2.connect(DSN)
+    conn = instrument(get_connection(DSN))
     
     try:
         payload, error = verify_token(event, conn)
@@ -84,24 +88,24 @@ def handler(event: dict, context) -> dict:
         
         cur = conn.cursor(cursor_factory=RealDictCursor)
         
-        # Общая статистика
+        # Общая статистика (из помесячной сводки, поддерживаемой триггером на payments)
         cur.execute(f"""
             SELECT 
-                COUNT(*) as total_payments,
-                COALESCE(SUM(amount), 0) as total_amount,
-                COUNT(CASE WHEN status = 'pending_approval' THEN 1 END) as pending_count,
-                COUNT(CASE WHEN status = 'approved' THEN 1 END) as approved_count,
-                COUNT(CASE WHEN status = 'paid' THEN 1 END) as paid_count
-            FROM {SCHEMA}.payments
+                COALESCE(SUM(payment_count), 0) as total_payments,
+                COALESCE(SUM(total_amount), 0) as total_amount,
+                COALESCE(SUM(payment_count) FILTER (WHERE status = 'pending_approval'), 0) as pending_count,
+                COALESCE(SUM(payment_count) FILTER (WHERE status = 'approved'), 0) as approved_count,
+                COALESCE(SUM(payment_count) FILTER (WHERE status = 'paid'), 0) as paid_count
+            FROM {SCHEMA}.payment_monthly_stats
         """)
         
         general_stats = dict(cur.fetchone())
         
         # Топ категорий
         cur.execute(f"""
-            SELECT c.name, c.icon, COALESCE(SUM(p.amount), 0) as total_amount
+            SELECT c.name, c.icon, COALESCE(SUM(ms.total_amount), 0) as total_amount
             FROM {SCHEMA}.categories c
-            LEFT JOIN {SCHEMA}.payments p ON c.id = p.category_id
+            LEFT JOIN {SCHEMA}.payment_monthly_stats ms ON c.id = ms.category_id
             GROUP BY c.id, c.name, c.icon
             ORDER BY total_amount DESC
             LIMIT 10
@@ -169,11 +173,12 @@ def handler(event: dict, context) -> dict:
         # Динамика по месяцам
         cur.execute(f"""
             SELECT 
-                TO_CHAR(payment_date, 'YYYY-MM') as month,
-                COALESCE(SUM(amount), 0) as total_amount
-            FROM {SCHEMA}.payments
-            WHERE payment_date >= CURRENT_DATE - INTERVAL '12 months'
-            GROUP BY TO_CHAR(payment_date, 'YYYY-MM')
+                TO_CHAR(month, 'YYYY-MM') as month,
+                COALESCE(SUM(total_amount), 0) as total_amount
+            FROM {SCHEMA}.payment_monthly_stats
+            WHERE month >= date_trunc('month', CURRENT_DATE - INTERVAL '12 months')::date
+            GROUP BY month
+            HAVING SUM(payment_count) > 0
             ORDER BY month
         """)
         
@@ -0,0 +1,194 @@
+"""Метрики вызова функции: число SQL-запросов, время в БД, строки, размер ответа"""
+import json
+import os
+import re
+import sys
+import time
+from functools import wraps
+from typing import Any, Callable, Dict
+
+# Запросы дольше этого порога пишутся в лог с нормализованным SQL
+SLOW_QUERY_MS = float(os.environ.get('SLOW_QUERY_MS', '200'))
+SLOW_QUERY_MAX_LEN = 1000
+
+_LITERAL_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+_SPACE_RE = re.compile(r'\s+')
+
+
+class RequestStats:
+    """Счётчики одного вызова"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_ms = 0.0
+        self.rows = 0
+        self.slow_queries = 0
+
+
+_stats = RequestStats()
+
+
+def current() -> RequestStats:
+    return _stats
+
+
+def normalize_sql(sql: Any) -> str:
+    """SQL без литералов и лишних пробелов: одинаковые запросы дают одинаковую строку"""
+    if isinstance(sql, bytes):
+        sql = sql.decode('utf-8', 'replace')
+    sql = _LITERAL_RE.sub('?', str(sql))
+    sql = _NUMBER_RE.sub('?', sql)
+    return _SPACE_RE.sub(' ', sql).strip()[:SLOW_QUERY_MAX_LEN]
+
+
+def _log(record: Dict[str, Any]):
+    print(json.dumps(record, ensure_ascii=False, default=str), file=sys.stderr, flush=True)
+
+
+class InstrumentedCursor:
+    """Курсор, считающий запросы, время и выбранные строки"""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def _record(self, query, started: float):
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        _stats.queries += 1
+        _stats.db_ms += elapsed_ms
+        if elapsed_ms >= SLOW_QUERY_MS:
+            _stats.slow_queries += 1
+            _log({'slow_query': {'ms': round(elapsed_ms, 1), 'sql': normalize_sql(query)}})
+
+    def execute(self, query, vars=None):
+        started = time.perf_counter()
+        try:
+            return self._cursor.execute(query, vars)
+        finally:
+            self._record(query, started)
+
+    def executemany(self, query, vars_list):
+        started = time.perf_counter()
+        try:
+            return self._cursor.executemany(query, vars_list)
+        finally:
+            self._record(query, started)
+
+    def copy_expert(self, sql, file, size=8192):
+        started = time.perf_counter()
+        try:
+            return self._cursor.copy_expert(sql, file, size)
+        finally:
+            self._record(sql, started)
+
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        if row is not None:
+            _stats.rows += 1
+        return row
+
+    def fetchmany(self, size=None):
+        rows = self._cursor.fetchmany() if size is None else self._cursor.fetchmany(size)
+        _stats.rows += len(rows)
+        return rows
+
+    def fetchall(self):
+        rows = self._cursor.fetchall()
+        _stats.rows += len(rows)
+        return rows
+
+    def __iter__(self):
+        for row in self._cursor:
+            _stats.rows += 1
+            yield row
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __enter__(self):
+        self._cursor.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return self._cursor.__exit__(exc_type, exc, tb)
+
+
+class InstrumentedConnection:
+    """Соединение, чьи курсоры пишут метрики в текущий RequestStats"""
+
+    def __init__(self, conn):
+        object.__setattr__(self, '_conn', conn)
+
+    def cursor(self, *args, **kwargs):
+        return InstrumentedCursor(self._conn.cursor(*args, **kwargs))
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def __setattr__(self, name, value):
+        setattr(self._conn, name, value)
+
+    def __enter__(self):
+        self._conn.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return self._conn.__exit__(exc_type, exc, tb)
+
+
+def instrument(conn) -> InstrumentedConnection:
+    return InstrumentedConnection(conn)
+
+
+def body_bytes(resp: Dict[str, Any]) -> int:
+    """
+    Размер тела ответа на проводе: base64 (сжатый ответ) - по раскодированной
+    длине, текст - в байтах UTF-8
+    """
+    body = resp.get('body')
+    if not isinstance(body, str):
+        return 0
+    if resp.get('isBase64Encoded'):
+        return len(body) // 4 * 3 - body[-2:].count('=')
+    # Для ASCII-строки длина уже в байтах, а проверка не проходит по строке
+    return len(body) if body.isascii() else len(body.encode('utf-8'))
+
+
+def track_request(handler: Callable) -> Callable:
+    """
+    Декоратор для handler(event, context): сбрасывает счётчики, пишет одну
+    строку лога с метриками вызова и добавляет заголовок Server-Timing.
+    """
+    @wraps(handler)
+    def wrapper(event, context):
+        global _stats
+        _stats = stats = RequestStats()
+        resp = handler(event, context)
+
+        total_ms = (time.perf_counter() - stats.started) * 1000
+        params = event.get('queryStringParameters') or {}
+        record = {
+            'endpoint': params.get('endpoint') or params.get('action') or event.get('path') or '',
+            'method': event.get('httpMethod', ''),
+            'status': resp.get('statusCode') if isinstance(resp, dict) else None,
+            'queries': stats.queries,
+            'db_ms': round(stats.db_ms, 1),
+            'rows': stats.rows,
+            'bytes': body_bytes(resp) if isinstance(resp, dict) else 0,
+            'total_ms': round(total_ms, 1),
+        }
+        if stats.slow_queries:
+            record['slow_queries'] = stats.slow_queries
+        _log({'perf': record})
+
+        if isinstance(resp, dict):
+            headers = dict(resp.get('headers') or {})
+            headers['Server-Timing'] = (
+                f'db;dur={stats.db_ms:.1f};desc="{stats.queries} queries, {stats.rows} rows", '
+                f'app;dur={total_ms - stats.db_ms:.1f}, total;dur={total_ms:.1f}'
+            )
+            headers['Timing-Allow-Origin'] = '*'
+            resp = {**resp, 'headers': headers}
+        return resp
+    return wrapper
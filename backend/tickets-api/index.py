@@ -1,12 +1,15 @@
+import base64
 import json
 import os
 import sys
 import jwt
-import psycopg2
 from psycopg2.extras import RealDictCursor
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional, Tuple
 from datetime import datetime
 from zoneinfo import ZoneInfo
+from db_pool import get_connection
+from http_encoding import negotiate_encoding
+from perf import instrument, track_request
 
 SCHEMA = 't_p61788166_html_to_frontend'
 
@@ -28,7 +31,7 @@ def get_db_connection():
     dsn = os.environ.get('DATABASE_URL')
     if not dsn:
         raise ValueError('DATABASE_URL not set')
-    return psycopg2.connect(dsn)
+    return instrument(get_connection(dsn))
 
 def verify_token(event: Dict[str, Any]) -> Optional[Dict[str, Any]]:
     headers = event.get('headers', {})
@@ -60,6 +63,157 @@ def safe_date_format(date_value):
     except:
         return None
 
+TICKETS_PAGE_DEFAULT = 50
+TICKETS_PAGE_MAX = 500
+# Фильтры списка заявок: значение - id или несколько id через запятую
+TICKET_FILTER_FIELDS = ('status_id', 'priority_id', 'category_id', 'department_id', 'assigned_to', 'created_by')
+# Сколько самых новых совпадений поиска ранжируется по релевантности
+TICKETS_SEARCH_CANDIDATES = 1000
+
+def encode_tickets_cursor(sort_key: Any, ticket_id: int) -> str:
+    """Курсор по ключу сортировки: created_at или ранг релевантности при поиске"""
+    key = sort_key.isoformat() if isinstance(sort_key, datetime) else repr(sort_key)
+    raw = f"{key}|{ticket_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_tickets_cursor(cursor: str) -> Tuple[str, int]:
+    raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+    key_part, id_part = raw.rsplit('|', 1)
+    return key_part, int(id_part)
+
+def build_tickets_search(search: str, filters: List[str], filter_values: List[Any]) -> Tuple[str, List[Any], str, List[Any]]:
+    """
+    Поиск по заявкам: полнотекстовый по search_vector (заголовок весомее описания),
+    а если он ничего не нашёл - подстрочный ILIKE по заголовку, описанию и названию
+    категории, который обслуживают триграммные индексы. Ранжируются только
+    TICKETS_SEARCH_CANDIDATES самых новых совпадений, так что цена запроса не растёт
+    с их числом. filters - условия фильтров списка, они отбирают совпадения до лимита.
+    Возвращает (условие, его параметры, выражение ранга, его параметры).
+    """
+    escaped = search.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    pattern = f'%{escaped}%'
+    filter_sql = ''.join(f' AND {condition}' for condition in filters)
+    condition = f"""t.id = ANY(ARRAY(
+        WITH fts AS (
+            SELECT t.id FROM {SCHEMA}.tickets t
+            WHERE t.search_vector @@ websearch_to_tsquery('russian', %s){filter_sql}
+            ORDER BY t.created_at DESC, t.id DESC
+            LIMIT {TICKETS_SEARCH_CANDIDATES}
+        )
+        SELECT id FROM fts
+        UNION ALL
+        (
+            SELECT t.id FROM {SCHEMA}.tickets t
+            WHERE NOT EXISTS (SELECT 1 FROM fts)
+              AND (
+                  t.title ILIKE %s
+                  OR t.description ILIKE %s
+                  OR t.category_id = ANY(ARRAY(SELECT id FROM {SCHEMA}.ticket_categories WHERE name ILIKE %s))
+              ){filter_sql}
+            ORDER BY t.created_at DESC, t.id DESC
+            LIMIT {TICKETS_SEARCH_CANDIDATES}
+        )
+    ))"""
+    # Совпадение части слова в заголовке поднимает заявку над совпадениями только в описании
+    rank = """(
+        ts_rank(t.search_vector, websearch_to_tsquery('russian', %s))
+        + CASE WHEN t.title ILIKE %s THEN 0.1::real ELSE 0::real END
+    )"""
+    return condition, [search, *filter_values, pattern, pattern, pattern, *filter_values], rank, [search, pattern]
+
+def build_tickets_query(query_params: Dict[str, Any]) -> Tuple[str, List[Any], List[str], List[Any], Optional[int]]:
+    """
+    Ключ сортировки, условия WHERE и лимит списка заявок из query-параметров.
+    При search сортировка по релевантности, иначе по created_at; в обоих случаях
+    по убыванию и с t.id для однозначности.
+    Лимит None - старый режим без пагинации. ValueError при неверных значениях.
+    """
+    conditions: List[str] = []
+    values: List[Any] = []
+    sort_sql, sort_values, sort_type = 't.created_at', [], 'timestamp'
+    
+    for field in TICKET_FILTER_FIELDS:
+        if query_params.get(field):
+            conditions.append(f"t.{field} = ANY(%s)")
+            values.append([int(v) for v in str(query_params[field]).split(',') if v])
+    
+    search = (query_params.get('search') or '').strip()
+    if search:
+        condition, condition_values, sort_sql, sort_values = build_tickets_search(search, list(conditions), list(values))
+        conditions.append(condition)
+        values.extend(condition_values)
+        sort_type = 'real'
+    
+    if not query_params.get('limit') and not query_params.get('cursor'):
+        return sort_sql, sort_values, conditions, values, None
+    
+    limit = min(max(int(query_params.get('limit') or TICKETS_PAGE_DEFAULT), 1), TICKETS_PAGE_MAX)
+    
+    if query_params.get('cursor'):
+        cursor_key, cursor_id = decode_tickets_cursor(query_params['cursor'])
+        cursor_value = datetime.fromisoformat(cursor_key) if sort_type == 'timestamp' else float(cursor_key)
+        conditions.append(f"({sort_sql}, t.id) < (%s::{sort_type}, %s)")
+        values.extend(sort_values + [cursor_value, cursor_id])
+    
+    return sort_sql, sort_values, conditions, values, limit
+
+def count_unread_comments(cur, user_id: int, ticket_ids: Optional[List[int]]) -> Dict[int, int]:
+    """
+    Непрочитанные пользователем чужие комментарии по заявкам одним запросом.
+    По открытым заявкам - всё после его курсора в ticket_comment_reads, по
+    неоткрытым - по старому флагу is_read. ticket_ids None - по всем заявкам.
+    """
+    ids_values: List[Any] = [] if ticket_ids is None else [ticket_ids]
+    reads_filter = "" if ticket_ids is None else " AND r.ticket_id = ANY(%s)"
+    legacy_filter = "" if ticket_ids is None else " AND tc.ticket_id = ANY(%s)"
+    values = [user_id, user_id] + ids_values + [user_id, user_id] + ids_values
+    
+    cur.execute(f"""
+        SELECT ticket_id, COUNT(*) as unread
+        FROM (
+            SELECT tc.ticket_id
+            FROM {SCHEMA}.ticket_comment_reads r
+            JOIN {SCHEMA}.ticket_comments tc
+                ON tc.ticket_id = r.ticket_id AND tc.id > r.last_read_comment_id
+            WHERE r.user_id = %s AND tc.user_id != %s{reads_filter}
+            UNION ALL
+            SELECT tc.ticket_id
+            FROM {SCHEMA}.ticket_comments tc
+            WHERE tc.is_read = FALSE AND tc.user_id != %s
+              AND NOT EXISTS (
+                  SELECT 1 FROM {SCHEMA}.ticket_comment_reads r
+                  WHERE r.user_id = %s AND r.ticket_id = tc.ticket_id
+              ){legacy_filter}
+        ) unread
+        GROUP BY ticket_id
+    """, values)
+    return {row['ticket_id']: row['unread'] for row in cur.fetchall()}
+
+def mark_ticket_comments_read(conn, ticket_id: int, user_id: int, up_to_comment_id: int) -> None:
+    """
+    Сдвигает курсор прочтения пользователя по заявке - одна строка вместо
+    перезаписи всех комментариев. Если курсор уже дальше, записи нет.
+    Отдельная короткая транзакция без ожидания сброса WAL.
+    """
+    cur = conn.cursor()
+    try:
+        cur.execute("SET LOCAL synchronous_commit TO OFF")
+        cur.execute(f"""
+            INSERT INTO {SCHEMA}.ticket_comment_reads (user_id, ticket_id, last_read_comment_id)
+            VALUES (%s, %s, %s)
+            ON CONFLICT (user_id, ticket_id) DO UPDATE
+            SET last_read_comment_id = EXCLUDED.last_read_comment_id, updated_at = CURRENT_TIMESTAMP
+            WHERE ticket_comment_reads.last_read_comment_id < EXCLUDED.last_read_comment_id
+        """, (user_id, ticket_id, up_to_comment_id))
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        log(f"Failed to mark comments read: {e}")
+    finally:
+        cur.close()
+
+@track_request
+@negotiate_encoding
 def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     '''
     API для управления заявками (тикетами), комментариями и истории изменений.
@@ -97,27 +251,33 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         # Tickets endpoint
         if endpoint == 'tickets' or endpoint == 'tickets-api':
             if method == 'GET':
-                query_params = event.get('queryStringParameters', {})
-                search = query_params.get('search', '')
+                query_params = event.get('queryStringParameters') or {}
+                try:
+                    sort_sql, sort_values, conditions, values, limit = build_tickets_query(query_params)
+                except ValueError as e:
+                    cur.close()
+                    conn.close()
+                    return response(400, {'error': f'Invalid query parameters: {str(e)}'})
+                
+                where_clause = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+                limit_clause = ""
+                if limit is not None:
+                    limit_clause = "LIMIT %s"
+                    values.append(limit + 1)
+                # Выражение сортировки стоит в SELECT, его параметры идут раньше параметров WHERE
+                values = sort_values + values
                 
-                query = f"""
+                cur.execute(f"""
                     SELECT 
                         t.id, t.title, t.description, t.due_date,
                         t.category_id, c.name as category_name, c.icon as category_icon,
-                        t.priority_id, p.name as priority_name, p.level as priority_level, p.color as priority_color,
+                        t.priority_id, p.name as priority_name, p.color as priority_color,
                         t.status_id, s.name as status_name, s.color as status_color,
                         t.department_id, d.name as department_name,
                         t.created_by, u.username as creator_name, u.email as creator_email,
                         t.assigned_to, ua.username as assignee_name, ua.email as assignee_email,
                         t.created_at, t.updated_at,
-                        t.has_response,
-                        COALESCE((
-                            SELECT COUNT(*) 
-                            FROM {SCHEMA}.ticket_comments tc 
-                            WHERE tc.ticket_id = t.id 
-                            AND tc.is_read = FALSE 
-                            AND tc.user_id != %s
-                        ), 0) as unread_comments
+                        {sort_sql} as cursor_key
                     FROM {SCHEMA}.tickets t
                     LEFT JOIN {SCHEMA}.ticket_categories c ON t.category_id = c.id
                     LEFT JOIN {SCHEMA}.ticket_priorities p ON t.priority_id = p.id
@@ -125,20 +285,21 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                     LEFT JOIN {SCHEMA}.departments d ON t.department_id = d.id
                     LEFT JOIN {SCHEMA}.users u ON t.created_by = u.id
                     LEFT JOIN {SCHEMA}.users ua ON t.assigned_to = ua.id
-                    WHERE 1=1
-                """
+                    {where_clause}
+                    ORDER BY cursor_key DESC, t.id DESC
+                    {limit_clause}
+                """, values)
+                rows = cur.fetchall()
                 
-                params = [user_id]
-                if search:
-                    query += " AND (t.title ILIKE %s OR t.description ILIKE %s OR c.name ILIKE %s)"
-                    search_pattern = f'%{search}%'
-                    params.extend([search_pattern, search_pattern, search_pattern])
+                next_cursor = None
+                if limit is not None and len(rows) > limit:
+                    rows = rows[:limit]
+                    next_cursor = encode_tickets_cursor(rows[-1]['cursor_key'], rows[-1]['id'])
                 
-                query += " ORDER BY t.created_at DESC"
+                unread = count_unread_comments(cur, user_id, [row['id'] for row in rows] if limit is not None else None)
                 
-                cur.execute(query, params)
                 tickets = []
-                for row in cur.fetchall():
+                for row in rows:
                     tickets.append({
                         'id': row['id'],
                         'title': row['title'],
@@ -163,11 +324,13 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                         'assignee_email': row['assignee_email'],
                         'created_at': safe_date_format(row['created_at']),
                         'updated_at': safe_date_format(row['updated_at']),
-                        'unread_comments': row['unread_comments']
+                        'unread_comments': unread.get(row['id'], 0)
                     })
                 
                 cur.close()
                 conn.close()
+                if limit is not None:
+                    return response(200, {'tickets': tickets, 'next_cursor': next_cursor, 'has_more': next_cursor is not None})
                 return response(200, {'tickets': tickets})
             
             elif method == 'POST':
@@ -296,7 +459,8 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                 
                 cur.execute(f"""
                     SELECT 
-                        tc.id, tc.comment, tc.user_id, tc.created_at, tc.parent_id, tc.is_read,
+                        tc.id, tc.comment, tc.user_id, tc.created_at, tc.parent_id,
+                        (tc.user_id = %s OR COALESCE(tc.id <= r.last_read_comment_id, tc.is_read)) as is_read,
                         u.username, u.email, u.full_name,
                         COALESCE(json_agg(
                             json_build_object('url', tca.file_url, 'file_name', tca.file_name)
@@ -304,10 +468,11 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                     FROM {SCHEMA}.ticket_comments tc
                     JOIN {SCHEMA}.users u ON tc.user_id = u.id
                     LEFT JOIN {SCHEMA}.ticket_comment_attachments tca ON tca.comment_id = tc.id
+                    LEFT JOIN {SCHEMA}.ticket_comment_reads r ON r.ticket_id = tc.ticket_id AND r.user_id = %s
                     WHERE tc.ticket_id = %s
-                    GROUP BY tc.id, u.id
+                    GROUP BY tc.id, u.id, r.last_read_comment_id
                     ORDER BY tc.created_at ASC
-                """, (ticket_id,))
+                """, (user_id, user_id, ticket_id))
                 
                 comments = [dict(row) for row in cur.fetchall()]
                 
@@ -315,12 +480,10 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                     if comment.get('created_at'):
                         comment['created_at'] = comment['created_at'].isoformat()
                 
-                cur.execute(f"""
-                    UPDATE {SCHEMA}.ticket_comments 
-                    SET is_read = TRUE 
-                    WHERE ticket_id = %s AND user_id != %s
-                """, (ticket_id, user_id))
-                conn.commit()
+                # Курсор прочтения - только до уже показанных комментариев
+                if comments:
+                    conn.commit()
+                    mark_ticket_comments_read(conn, int(ticket_id), user_id, max(c['id'] for c in comments))
                 
                 cur.close()
                 conn.close()
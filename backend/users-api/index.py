@@ -5,9 +5,11 @@ from typing import Dict, Any, List
 from datetime import datetime
 from zoneinfo import ZoneInfo
 import jwt
-import psycopg2
 from psycopg2.extras import RealDictCursor
 from pydantic import BaseModel, Field
+from db_pool import get_connection
+from http_encoding import negotiate_encoding
+from perf import instrument, track_request
 
 # Environment
 SCHEMA = 't_p61788166_html_to_frontend'
@@ -448,6 +450,8 @@ def handle_permissions_endpoint(event: Dict[str, Any], conn, method: str, path:
     
     return response(405, {'error': 'Method not allowed'})
 
+@track_request
+@negotiate_encoding
 def handler(event: dict, context) -> dict:
     """
     API для управления пользователями, ролями и правами доступа.
@@ -464,7 +468,7 @@ def handler(event: dict, context) -> dict:
     if method == 'OPTIONS':
         return response(200, {})
     
-    conn = psycopg2.connect(DSN)
+    conn = instrument(get_connection(DSN))
     
     try:
         # Определяем endpoint из query параметров или пути
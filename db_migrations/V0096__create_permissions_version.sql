@@ -0,0 +1,11 @@
+-- Версия прав: повышается при любом изменении ролей, прав и пользователей,
+-- по ней backend сбрасывает кэш авторизации во всех контейнерах
+CREATE TABLE IF NOT EXISTS t_p61788166_html_to_frontend.permissions_version (
+    id INTEGER PRIMARY KEY DEFAULT 1 CHECK (id = 1),
+    version BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+INSERT INTO t_p61788166_html_to_frontend.permissions_version (id, version)
+VALUES (1, 0)
+ON CONFLICT (id) DO NOTHING;
@@ -0,0 +1,11 @@
+-- Индексы для постраничной выдачи платежей по курсору (payment_date, id)
+CREATE INDEX IF NOT EXISTS idx_payments_date_id
+    ON t_p61788166_html_to_frontend.payments (payment_date DESC, id DESC);
+
+-- Список "мои платежи" в payments-api
+CREATE INDEX IF NOT EXISTS idx_payments_created_by_date_id
+    ON t_p61788166_html_to_frontend.payments (created_by, payment_date DESC, id DESC);
+
+-- Самый частый фильтр - по статусу
+CREATE INDEX IF NOT EXISTS idx_payments_status_date_id
+    ON t_p61788166_html_to_frontend.payments (status, payment_date DESC, id DESC);
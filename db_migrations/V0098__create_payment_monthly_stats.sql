@@ -0,0 +1,77 @@
+-- Помесячные суммы платежей в разрезе категория × отдел × статус.
+-- Поддерживаются триггером на payments, дашборды читают отсюда вместо полного скана.
+-- Пустые category_id / department_id хранятся как 0, пустой статус - как ''.
+CREATE TABLE IF NOT EXISTS t_p61788166_html_to_frontend.payment_monthly_stats (
+    month DATE NOT NULL,
+    category_id INTEGER NOT NULL DEFAULT 0,
+    department_id INTEGER NOT NULL DEFAULT 0,
+    status VARCHAR(50) NOT NULL DEFAULT '',
+    total_amount DECIMAL(15, 2) NOT NULL DEFAULT 0,
+    payment_count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (month, category_id, department_id, status)
+);
+
+CREATE INDEX IF NOT EXISTS idx_payment_monthly_stats_category
+    ON t_p61788166_html_to_frontend.payment_monthly_stats(category_id);
+
+CREATE OR REPLACE FUNCTION t_p61788166_html_to_frontend.apply_payment_monthly_stats(
+    p_payment_date TIMESTAMP,
+    p_category_id INTEGER,
+    p_department_id INTEGER,
+    p_status VARCHAR,
+    p_amount DECIMAL,
+    p_count INTEGER
+) RETURNS VOID AS $$
+BEGIN
+    INSERT INTO t_p61788166_html_to_frontend.payment_monthly_stats
+        (month, category_id, department_id, status, total_amount, payment_count)
+    VALUES (
+        date_trunc('month', p_payment_date)::date,
+        COALESCE(p_category_id, 0),
+        COALESCE(p_department_id, 0),
+        COALESCE(p_status, ''),
+        p_amount,
+        p_count
+    )
+    ON CONFLICT (month, category_id, department_id, status) DO UPDATE
+    SET total_amount = t_p61788166_html_to_frontend.payment_monthly_stats.total_amount + EXCLUDED.total_amount,
+        payment_count = t_p61788166_html_to_frontend.payment_monthly_stats.payment_count + EXCLUDED.payment_count;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION t_p61788166_html_to_frontend.payments_monthly_stats_trigger()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM t_p61788166_html_to_frontend.apply_payment_monthly_stats(
+            OLD.payment_date, OLD.category_id, OLD.department_id, OLD.status, -OLD.amount, -1
+        );
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM t_p61788166_html_to_frontend.apply_payment_monthly_stats(
+            NEW.payment_date, NEW.category_id, NEW.department_id, NEW.status, NEW.amount, 1
+        );
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_payments_monthly_stats ON t_p61788166_html_to_frontend.payments;
+CREATE TRIGGER trg_payments_monthly_stats
+    AFTER INSERT OR DELETE OR UPDATE OF amount, payment_date, category_id, department_id, status
+    ON t_p61788166_html_to_frontend.payments
+    FOR EACH ROW EXECUTE FUNCTION t_p61788166_html_to_frontend.payments_monthly_stats_trigger();
+
+-- Начальное заполнение по существующим платежам
+TRUNCATE t_p61788166_html_to_frontend.payment_monthly_stats;
+INSERT INTO t_p61788166_html_to_frontend.payment_monthly_stats
+    (month, category_id, department_id, status, total_amount, payment_count)
+SELECT
+    date_trunc('month', payment_date)::date,
+    COALESCE(category_id, 0),
+    COALESCE(department_id, 0),
+    COALESCE(status, ''),
+    SUM(amount),
+    COUNT(*)
+FROM t_p61788166_html_to_frontend.payments
+GROUP BY 1, 2, 3, 4;
@@ -0,0 +1,59 @@
+-- Версия справочников: повышается триггерами при любой записи в категории,
+-- юрлица, контрагенты, подразделения, сервисы и кастомные поля. По ней backend
+-- сбрасывает закэшированный набор справочников во всех контейнерах.
+CREATE TABLE IF NOT EXISTS t_p61788166_html_to_frontend.dictionaries_version (
+    id INTEGER PRIMARY KEY DEFAULT 1 CHECK (id = 1),
+    version BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+INSERT INTO t_p61788166_html_to_frontend.dictionaries_version (id, version)
+VALUES (1, 0)
+ON CONFLICT (id) DO NOTHING;
+
+CREATE OR REPLACE FUNCTION t_p61788166_html_to_frontend.bump_dictionaries_version_trigger()
+RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE t_p61788166_html_to_frontend.dictionaries_version
+    SET version = version + 1, updated_at = CURRENT_TIMESTAMP
+    WHERE id = 1;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Один раз на оператор, а не на строку: массовая правка повышает версию на 1
+DROP TRIGGER IF EXISTS trg_categories_dictionaries_version ON t_p61788166_html_to_frontend.categories;
+CREATE TRIGGER trg_categories_dictionaries_version
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON t_p61788166_html_to_frontend.categories
+    FOR EACH STATEMENT EXECUTE FUNCTION t_p61788166_html_to_frontend.bump_dictionaries_version_trigger();
+
+DROP TRIGGER IF EXISTS trg_legal_entities_dictionaries_version ON t_p61788166_html_to_frontend.legal_entities;
+CREATE TRIGGER trg_legal_entities_dictionaries_version
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON t_p61788166_html_to_frontend.legal_entities
+    FOR EACH STATEMENT EXECUTE FUNCTION t_p61788166_html_to_frontend.bump_dictionaries_version_trigger();
+
+DROP TRIGGER IF EXISTS trg_contractors_dictionaries_version ON t_p61788166_html_to_frontend.contractors;
+CREATE TRIGGER trg_contractors_dictionaries_version
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON t_p61788166_html_to_frontend.contractors
+    FOR EACH STATEMENT EXECUTE FUNCTION t_p61788166_html_to_frontend.bump_dictionaries_version_trigger();
+
+DROP TRIGGER IF EXISTS trg_customer_departments_dictionaries_version ON t_p61788166_html_to_frontend.customer_departments;
+CREATE TRIGGER trg_customer_departments_dictionaries_version
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON t_p61788166_html_to_frontend.customer_departments
+    FOR EACH STATEMENT EXECUTE FUNCTION t_p61788166_html_to_frontend.bump_dictionaries_version_trigger();
+
+DROP TRIGGER IF EXISTS trg_services_dictionaries_version ON t_p61788166_html_to_frontend.services;
+CREATE TRIGGER trg_services_dictionaries_version
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON t_p61788166_html_to_frontend.services
+    FOR EACH STATEMENT EXECUTE FUNCTION t_p61788166_html_to_frontend.bump_dictionaries_version_trigger();
+
+DROP TRIGGER IF EXISTS trg_custom_fields_dictionaries_version ON t_p61788166_html_to_frontend.custom_fields;
+CREATE TRIGGER trg_custom_fields_dictionaries_version
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON t_p61788166_html_to_frontend.custom_fields
+    FOR EACH STATEMENT EXECUTE FUNCTION t_p61788166_html_to_frontend.bump_dictionaries_version_trigger();
+
+-- В сервисах показываются логины утверждающих
+DROP TRIGGER IF EXISTS trg_users_dictionaries_version ON t_p61788166_html_to_frontend.users;
+CREATE TRIGGER trg_users_dictionaries_version
+    AFTER UPDATE OF username OR DELETE ON t_p61788166_html_to_frontend.users
+    FOR EACH STATEMENT EXECUTE FUNCTION t_p61788166_html_to_frontend.bump_dictionaries_version_trigger();
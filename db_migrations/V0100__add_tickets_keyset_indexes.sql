@@ -0,0 +1,22 @@
+-- Индексы для постраничной выдачи заявок по курсору (created_at, id)
+CREATE INDEX IF NOT EXISTS idx_tickets_created_at_id
+    ON t_p61788166_html_to_frontend.tickets (created_at DESC, id DESC);
+
+-- Самые частые фильтры списка: статус, исполнитель, автор
+CREATE INDEX IF NOT EXISTS idx_tickets_status_created_at_id
+    ON t_p61788166_html_to_frontend.tickets (status_id, created_at DESC, id DESC);
+
+CREATE INDEX IF NOT EXISTS idx_tickets_assigned_to_created_at_id
+    ON t_p61788166_html_to_frontend.tickets (assigned_to, created_at DESC, id DESC);
+
+CREATE INDEX IF NOT EXISTS idx_tickets_created_by_created_at_id
+    ON t_p61788166_html_to_frontend.tickets (created_by, created_at DESC, id DESC);
+
+-- Комментарии заявки (до этого выбирались полным сканом)
+CREATE INDEX IF NOT EXISTS idx_ticket_comments_ticket_created_at
+    ON t_p61788166_html_to_frontend.ticket_comments (ticket_id, created_at);
+
+-- Счётчики непрочитанных: в индекс попадают только непрочитанные комментарии
+CREATE INDEX IF NOT EXISTS idx_ticket_comments_unread
+    ON t_p61788166_html_to_frontend.ticket_comments (ticket_id, user_id)
+    WHERE is_read = FALSE;
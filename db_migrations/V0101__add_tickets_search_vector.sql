@@ -0,0 +1,14 @@
+-- Полнотекстовый поиск по заявкам: заголовок (вес A) важнее описания (вес B)
+ALTER TABLE t_p61788166_html_to_frontend.tickets
+ADD COLUMN IF NOT EXISTS search_vector tsvector
+GENERATED ALWAYS AS (
+    setweight(to_tsvector('russian', COALESCE(title, '')), 'A') ||
+    setweight(to_tsvector('russian', COALESCE(description, '')), 'B')
+) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_tickets_search_vector
+    ON t_p61788166_html_to_frontend.tickets USING gin(search_vector);
+
+-- Совпадение по названию категории ищется через category_id = ANY(...)
+CREATE INDEX IF NOT EXISTS idx_tickets_category_id
+    ON t_p61788166_html_to_frontend.tickets (category_id);
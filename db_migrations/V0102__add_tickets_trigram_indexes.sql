@@ -0,0 +1,8 @@
+-- Поиск по частям слов (ILIKE '%...%') в заголовке и описании заявок
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX IF NOT EXISTS idx_tickets_title_trgm
+    ON t_p61788166_html_to_frontend.tickets USING gin(title gin_trgm_ops);
+
+CREATE INDEX IF NOT EXISTS idx_tickets_description_trgm
+    ON t_p61788166_html_to_frontend.tickets USING gin(description gin_trgm_ops);
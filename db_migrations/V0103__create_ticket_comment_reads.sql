@@ -0,0 +1,15 @@
+-- Курсор прочтения комментариев: у каждого пользователя свой по каждой заявке.
+-- Непрочитанные - чужие комментарии с id больше last_read_comment_id. Пока
+-- строки нет (заявку после перехода не открывали), действует старый общий
+-- флаг ticket_comments.is_read, который больше не обновляется.
+CREATE TABLE IF NOT EXISTS t_p61788166_html_to_frontend.ticket_comment_reads (
+    user_id INTEGER NOT NULL REFERENCES t_p61788166_html_to_frontend.users(id),
+    ticket_id INTEGER NOT NULL REFERENCES t_p61788166_html_to_frontend.tickets(id),
+    last_read_comment_id INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (user_id, ticket_id)
+);
+
+-- Подсчёт комментариев после курсора: диапазон по id внутри заявки
+CREATE INDEX IF NOT EXISTS idx_ticket_comments_ticket_id_id
+    ON t_p61788166_html_to_frontend.ticket_comments (ticket_id, id);
@@ -0,0 +1,80 @@
+-- Счётчик непрочитанных уведомлений и id последнего уведомления по пользователю.
+-- Ведётся триггерами на notifications, так что опрос уведомлений читает одну
+-- строку по ключу вместо COUNT(*) по всем уведомлениям пользователя.
+CREATE TABLE IF NOT EXISTS t_p61788166_html_to_frontend.notification_counters (
+    user_id INTEGER PRIMARY KEY,
+    unread_count INTEGER NOT NULL DEFAULT 0,
+    last_notification_id INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE OR REPLACE FUNCTION t_p61788166_html_to_frontend.notification_counters_trigger()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO t_p61788166_html_to_frontend.notification_counters (user_id, unread_count, last_notification_id)
+        SELECT user_id, COUNT(*) FILTER (WHERE NOT COALESCE(is_read, FALSE)), MAX(id)
+        FROM new_rows
+        GROUP BY user_id
+        ON CONFLICT (user_id) DO UPDATE
+        SET unread_count = notification_counters.unread_count + EXCLUDED.unread_count,
+            last_notification_id = GREATEST(notification_counters.last_notification_id, EXCLUDED.last_notification_id),
+            updated_at = CURRENT_TIMESTAMP;
+    ELSIF TG_OP = 'UPDATE' THEN
+        UPDATE t_p61788166_html_to_frontend.notification_counters c
+        SET unread_count = c.unread_count + d.delta, updated_at = CURRENT_TIMESTAMP
+        FROM (
+            SELECT n.user_id,
+                   SUM((NOT COALESCE(n.is_read, FALSE))::int - (NOT COALESCE(o.is_read, FALSE))::int) AS delta
+            FROM new_rows n
+            JOIN old_rows o ON o.id = n.id
+            GROUP BY n.user_id
+        ) d
+        WHERE c.user_id = d.user_id AND d.delta <> 0;
+    ELSIF TG_OP = 'DELETE' THEN
+        UPDATE t_p61788166_html_to_frontend.notification_counters c
+        SET unread_count = c.unread_count - d.unread, updated_at = CURRENT_TIMESTAMP
+        FROM (
+            SELECT user_id, COUNT(*) FILTER (WHERE NOT COALESCE(is_read, FALSE)) AS unread
+            FROM old_rows
+            GROUP BY user_id
+        ) d
+        WHERE c.user_id = d.user_id AND d.unread > 0;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Триггеры уровня оператора: "прочитать все" меняет счётчик один раз, а не на
+-- каждую строку. Таблицы переходов допускают только одно событие на триггер.
+DROP TRIGGER IF EXISTS trg_notifications_counters_insert ON t_p61788166_html_to_frontend.notifications;
+CREATE TRIGGER trg_notifications_counters_insert
+    AFTER INSERT ON t_p61788166_html_to_frontend.notifications
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION t_p61788166_html_to_frontend.notification_counters_trigger();
+
+DROP TRIGGER IF EXISTS trg_notifications_counters_update ON t_p61788166_html_to_frontend.notifications;
+CREATE TRIGGER trg_notifications_counters_update
+    AFTER UPDATE ON t_p61788166_html_to_frontend.notifications
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION t_p61788166_html_to_frontend.notification_counters_trigger();
+
+DROP TRIGGER IF EXISTS trg_notifications_counters_delete ON t_p61788166_html_to_frontend.notifications;
+CREATE TRIGGER trg_notifications_counters_delete
+    AFTER DELETE ON t_p61788166_html_to_frontend.notifications
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION t_p61788166_html_to_frontend.notification_counters_trigger();
+
+-- Начальные значения по уже существующим уведомлениям
+INSERT INTO t_p61788166_html_to_frontend.notification_counters (user_id, unread_count, last_notification_id)
+SELECT user_id, COUNT(*) FILTER (WHERE NOT COALESCE(is_read, FALSE)), MAX(id)
+FROM t_p61788166_html_to_frontend.notifications
+GROUP BY user_id
+ON CONFLICT (user_id) DO UPDATE
+SET unread_count = EXCLUDED.unread_count,
+    last_notification_id = EXCLUDED.last_notification_id,
+    updated_at = CURRENT_TIMESTAMP;
+
+-- Лента "новое с курсора": уведомления пользователя после заданного id
+CREATE INDEX IF NOT EXISTS idx_notifications_user_id_id
+    ON t_p61788166_html_to_frontend.notifications (user_id, id);
@@ -0,0 +1,4 @@
+-- Прогресс загрузки лога: сколько записей уже записано в log_entries.
+-- Обновляется после каждой порции COPY, пока status = 'processing'.
+ALTER TABLE t_p61788166_html_to_frontend.log_files
+    ADD COLUMN IF NOT EXISTS processed_lines INTEGER DEFAULT 0;
@@ -0,0 +1,10 @@
+-- Постраничная выдача записей лога по курсору line_number, в том числе с
+-- фильтром по уровню
+CREATE INDEX IF NOT EXISTS idx_log_entries_file_line
+    ON t_p61788166_html_to_frontend.log_entries (file_id, line_number);
+
+CREATE INDEX IF NOT EXISTS idx_log_entries_file_level_line
+    ON t_p61788166_html_to_frontend.log_entries (file_id, level, line_number);
+
+-- Покрывается idx_log_entries_file_line
+DROP INDEX IF EXISTS t_p61788166_html_to_frontend.idx_log_entries_file_id;
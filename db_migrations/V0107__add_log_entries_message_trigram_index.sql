@@ -0,0 +1,9 @@
+-- Поиск по сообщению идёт через ILIKE '%...%': его обслуживает триграммный
+-- индекс. Полнотекстовый индекс по to_tsvector('english', message) ни одним
+-- запросом не используется, а загрузку логов замедляет
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX IF NOT EXISTS idx_log_entries_message_trgm
+    ON t_p61788166_html_to_frontend.log_entries USING gin (message gin_trgm_ops);
+
+DROP INDEX IF EXISTS t_p61788166_html_to_frontend.idx_log_entries_message;
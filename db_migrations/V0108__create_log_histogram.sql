@@ -0,0 +1,21 @@
+-- Число записей лога по интервалам времени и уровням: (файл, разрешение,
+-- начало интервала, уровень) -> count. Заполняется при загрузке файла, чтобы
+-- график "ошибки по минутам" не сканировал log_entries. resolution - имя
+-- единицы для date_trunc ('minute', 'hour'); записи без timestamp не попадают.
+CREATE TABLE IF NOT EXISTS t_p61788166_html_to_frontend.log_histogram (
+    file_id INTEGER NOT NULL,
+    resolution VARCHAR(10) NOT NULL,
+    bucket_start TIMESTAMP NOT NULL,
+    level VARCHAR(20) NOT NULL,
+    count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (file_id, resolution, bucket_start, level)
+);
+
+-- Уже загруженные файлы
+INSERT INTO t_p61788166_html_to_frontend.log_histogram (file_id, resolution, bucket_start, level, count)
+SELECT e.file_id, r.resolution, date_trunc(r.resolution, e.timestamp), COALESCE(e.level, 'UNKNOWN'), COUNT(*)
+FROM t_p61788166_html_to_frontend.log_entries e
+CROSS JOIN (VALUES ('minute'), ('hour')) AS r(resolution)
+WHERE e.timestamp IS NOT NULL
+GROUP BY 1, 2, 3, 4
+ON CONFLICT (file_id, resolution, bucket_start, level) DO NOTHING;
@@ -0,0 +1,11 @@
+-- Курсоры прочтения удаляются вместе с заявкой или пользователем: иначе
+-- удаление открытой хоть раз заявки падает на внешнем ключе.
+ALTER TABLE t_p61788166_html_to_frontend.ticket_comment_reads
+    DROP CONSTRAINT IF EXISTS ticket_comment_reads_ticket_id_fkey,
+    ADD CONSTRAINT ticket_comment_reads_ticket_id_fkey
+        FOREIGN KEY (ticket_id) REFERENCES t_p61788166_html_to_frontend.tickets(id) ON DELETE CASCADE;
+
+ALTER TABLE t_p61788166_html_to_frontend.ticket_comment_reads
+    DROP CONSTRAINT IF EXISTS ticket_comment_reads_user_id_fkey,
+    ADD CONSTRAINT ticket_comment_reads_user_id_fkey
+        FOREIGN KEY (user_id) REFERENCES t_p61788166_html_to_frontend.users(id) ON DELETE CASCADE;
@@ -0,0 +1,39 @@
+-- Версию прав повышают триггеры в той же транзакции, что и правка пользователей,
+-- ролей и прав, - из какой бы функции она ни шла (main, users-api, ...).
+-- Триггеры уровня оператора: массовая правка повышает версию один раз.
+CREATE OR REPLACE FUNCTION t_p61788166_html_to_frontend.bump_permissions_version_trigger()
+RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE t_p61788166_html_to_frontend.permissions_version
+    SET version = version + 1, updated_at = CURRENT_TIMESTAMP
+    WHERE id = 1;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- У пользователей - только поля, которые попадают в кэш авторизации;
+-- last_login при каждом входе версию не трогает
+DROP TRIGGER IF EXISTS trg_users_permissions_version ON t_p61788166_html_to_frontend.users;
+CREATE TRIGGER trg_users_permissions_version
+    AFTER UPDATE OF is_active, username, email, full_name OR DELETE ON t_p61788166_html_to_frontend.users
+    FOR EACH STATEMENT EXECUTE FUNCTION t_p61788166_html_to_frontend.bump_permissions_version_trigger();
+
+DROP TRIGGER IF EXISTS trg_user_roles_permissions_version ON t_p61788166_html_to_frontend.user_roles;
+CREATE TRIGGER trg_user_roles_permissions_version
+    AFTER INSERT OR UPDATE OR DELETE ON t_p61788166_html_to_frontend.user_roles
+    FOR EACH STATEMENT EXECUTE FUNCTION t_p61788166_html_to_frontend.bump_permissions_version_trigger();
+
+DROP TRIGGER IF EXISTS trg_role_permissions_permissions_version ON t_p61788166_html_to_frontend.role_permissions;
+CREATE TRIGGER trg_role_permissions_permissions_version
+    AFTER INSERT OR UPDATE OR DELETE ON t_p61788166_html_to_frontend.role_permissions
+    FOR EACH STATEMENT EXECUTE FUNCTION t_p61788166_html_to_frontend.bump_permissions_version_trigger();
+
+DROP TRIGGER IF EXISTS trg_roles_permissions_version ON t_p61788166_html_to_frontend.roles;
+CREATE TRIGGER trg_roles_permissions_version
+    AFTER UPDATE OR DELETE ON t_p61788166_html_to_frontend.roles
+    FOR EACH STATEMENT EXECUTE FUNCTION t_p61788166_html_to_frontend.bump_permissions_version_trigger();
+
+DROP TRIGGER IF EXISTS trg_permissions_permissions_version ON t_p61788166_html_to_frontend.permissions;
+CREATE TRIGGER trg_permissions_permissions_version
+    AFTER UPDATE OR DELETE ON t_p61788166_html_to_frontend.permissions
+    FOR EACH STATEMENT EXECUTE FUNCTION t_p61788166_html_to_frontend.bump_permissions_version_trigger();
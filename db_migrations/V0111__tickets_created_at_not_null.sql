@@ -0,0 +1,10 @@
+-- Список заявок листается по курсору (created_at, id): строка с NULL в
+-- created_at ломает и курсор, и сравнение строк. Заполняем пропуски временем
+-- последнего изменения и запрещаем NULL.
+UPDATE t_p61788166_html_to_frontend.tickets
+SET created_at = COALESCE(updated_at, CURRENT_TIMESTAMP)
+WHERE created_at IS NULL;
+
+ALTER TABLE t_p61788166_html_to_frontend.tickets
+    ALTER COLUMN created_at SET DEFAULT CURRENT_TIMESTAMP,
+    ALTER COLUMN created_at SET NOT NULL;
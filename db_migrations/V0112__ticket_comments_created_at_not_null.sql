@@ -0,0 +1,9 @@
+-- Ветка комментариев листается по курсору (created_at, id), как и список
+-- заявок: заполняем пропуски и запрещаем NULL в created_at.
+UPDATE t_p61788166_html_to_frontend.ticket_comments
+SET created_at = CURRENT_TIMESTAMP
+WHERE created_at IS NULL;
+
+ALTER TABLE t_p61788166_html_to_frontend.ticket_comments
+    ALTER COLUMN created_at SET DEFAULT CURRENT_TIMESTAMP,
+    ALTER COLUMN created_at SET NOT NULL;
@@ -0,0 +1,14 @@
+-- TRUNCATE не вызывает построчные триггеры: очистка платежей (clear-all-data)
+-- оставляла в помесячных суммах старые траты. Очищаем их вместе с payments.
+CREATE OR REPLACE FUNCTION t_p61788166_html_to_frontend.payments_monthly_stats_truncate_trigger()
+RETURNS TRIGGER AS $$
+BEGIN
+    TRUNCATE t_p61788166_html_to_frontend.payment_monthly_stats;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_payments_monthly_stats_truncate ON t_p61788166_html_to_frontend.payments;
+CREATE TRIGGER trg_payments_monthly_stats_truncate
+    AFTER TRUNCATE ON t_p61788166_html_to_frontend.payments
+    FOR EACH STATEMENT EXECUTE FUNCTION t_p61788166_html_to_frontend.payments_monthly_stats_truncate_trigger();
@@ -0,0 +1,11 @@
+-- Гистограмма удаляется вместе с файлом: clear-all-data очищает log_files с
+-- RESTART IDENTITY, и новые загрузки с теми же id упирались в старые интервалы.
+DELETE FROM t_p61788166_html_to_frontend.log_histogram h
+WHERE NOT EXISTS (
+    SELECT 1 FROM t_p61788166_html_to_frontend.log_files f WHERE f.id = h.file_id
+);
+
+ALTER TABLE t_p61788166_html_to_frontend.log_histogram
+    DROP CONSTRAINT IF EXISTS log_histogram_file_id_fkey,
+    ADD CONSTRAINT log_histogram_file_id_fkey
+        FOREIGN KEY (file_id) REFERENCES t_p61788166_html_to_frontend.log_files(id) ON DELETE CASCADE;
@@ -0,0 +1,19 @@
+-- id уведомления выдаётся под блокировкой строки счётчика его пользователя:
+-- вставки для одного пользователя идут по очереди, и уведомление с меньшим id
+-- фиксируется раньше большего. Иначе уведомление, вставленное раньше, но
+-- закоммиченное позже соседнего, оказывалось под курсором ?since и терялось.
+CREATE OR REPLACE FUNCTION t_p61788166_html_to_frontend.notifications_ordered_id_trigger()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO t_p61788166_html_to_frontend.notification_counters (user_id)
+    VALUES (NEW.user_id)
+    ON CONFLICT (user_id) DO UPDATE SET updated_at = CURRENT_TIMESTAMP;
+    NEW.id := nextval('t_p61788166_html_to_frontend.notifications_id_seq');
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_notifications_ordered_id ON t_p61788166_html_to_frontend.notifications;
+CREATE TRIGGER trg_notifications_ordered_id
+    BEFORE INSERT ON t_p61788166_html_to_frontend.notifications
+    FOR EACH ROW EXECUTE FUNCTION t_p61788166_html_to_frontend.notifications_ordered_id_trigger();
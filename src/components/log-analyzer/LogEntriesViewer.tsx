@@ -17,6 +17,8 @@ interface LogEntriesViewerProps {
   entries: LogEntry[];
   loading: boolean;
   total: number;
+  totalCapped: boolean;
+  hasMore: boolean;
   offset: number;
   limit: number;
   onRefresh: () => void;
@@ -31,6 +33,8 @@ const LogEntriesViewer = ({
   entries,
   loading,
   total,
+  totalCapped,
+  hasMore,
   offset,
   limit,
   onRefresh,
@@ -40,12 +44,13 @@ const LogEntriesViewer = ({
   getLevelColor,
   getLevelBadgeVariant,
 }: LogEntriesViewerProps) => {
+  const totalLabel = totalCapped ? `${total}+` : `${total}`;
   return (
     <Card>
       <CardHeader>
         <div className="flex justify-between items-center">
           <CardTitle>
-            Логи ({total} записей)
+            Логи ({totalLabel} записей)
           </CardTitle>
           <Button variant="outline" size="sm" onClick={onRefresh}>
             <Icon name="RefreshCw" size={16} className="mr-2" />
@@ -98,14 +103,14 @@ const LogEntriesViewer = ({
               </Button>
 
               <span className="text-sm text-muted-foreground">
-                {offset + 1} - {Math.min(offset + limit, total)} из {total}
+                {offset + 1} - {offset + entries.length} из {totalLabel}
               </span>
 
               <Button
                 variant="outline"
                 size="sm"
                 onClick={onNextPage}
-                disabled={offset + limit >= total}
+                disabled={!hasMore}
               >
                 Вперёд
                 <Icon name="ChevronRight" size={16} className="ml-2" />
@@ -44,8 +44,13 @@ const LogAnalyzer = () => {
   const [searchQuery, setSearchQuery] = useState('');
   const [levelFilter, setLevelFilter] = useState<string>('');
   const [total, setTotal] = useState(0);
-  const [offset, setOffset] = useState(0);
+  // line_number, после которого начинается каждая открытая страница
+  const [cursors, setCursors] = useState<number[]>([0]);
+  const [nextCursor, setNextCursor] = useState<number | null>(null);
+  const [hasMore, setHasMore] = useState(false);
+  const [totalCapped, setTotalCapped] = useState(false);
   const limit = 100;
+  const offset = (cursors.length - 1) * limit;
   const { toast } = useToast();
 
   const {
@@ -64,7 +69,7 @@ const LogAnalyzer = () => {
     if (selectedFile) {
       loadEntries();
     }
-  }, [selectedFile, levelFilter, searchQuery, offset]);
+  }, [selectedFile, levelFilter, searchQuery, cursors]);
 
   const loadFiles = async () => {
     setLoading(true);
@@ -94,9 +99,9 @@ const LogAnalyzer = () => {
         action: 'entries',
         file_id: selectedFile.id.toString(),
         limit: limit.toString(),
-        offset: offset.toString(),
       });
       
+      if (cursors.length > 1) params.append('after', cursors[cursors.length - 1].toString());
       if (levelFilter) params.append('level', levelFilter);
       if (searchQuery) params.append('search', searchQuery);
       
@@ -106,6 +111,9 @@ const LogAnalyzer = () => {
       const data = await response.json();
       setEntries(data.entries);
       setTotal(data.total);
+      setTotalCapped(Boolean(data.total_capped));
+      setHasMore(Boolean(data.has_more));
+      setNextCursor(data.next_cursor ?? null);
     } catch (error) {
       console.error('Failed to load entries:', error);
       toast({
@@ -242,25 +250,25 @@ const LogAnalyzer = () => {
 
   const handleSelectFile = (file: LogFile) => {
     setSelectedFile(file);
-    setOffset(0);
+    setCursors([0]);
   };
 
   const handleSearchChange = (query: string) => {
     setSearchQuery(query);
-    setOffset(0);
+    setCursors([0]);
   };
 
   const handleLevelChange = (level: string) => {
     setLevelFilter(level);
-    setOffset(0);
+    setCursors([0]);
   };
 
   const handlePrevPage = () => {
-    setOffset(Math.max(0, offset - limit));
+    if (cursors.length > 1) setCursors(cursors.slice(0, -1));
   };
 
   const handleNextPage = () => {
-    setOffset(offset + limit);
+    if (nextCursor !== null) setCursors([...cursors, nextCursor]);
   };
 
   return (
@@ -331,6 +339,8 @@ const LogAnalyzer = () => {
                   entries={entries}
                   loading={loading}
                   total={total}
+                  totalCapped={totalCapped}
+                  hasMore={hasMore}
                   offset={offset}
                   limit={limit}
                   onRefresh={loadEntries}